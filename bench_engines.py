@@ -0,0 +1,162 @@
+# Benchmark comparing the synthesis engines on the same text
+#
+# Each engine runs in its own process so peak memory is its own. Per engine
+# the text is split into the chunks the reader synthesizes and each chunk is
+# measured: time to first audio (until the engine yields its first block),
+# real-time factor (synthesis seconds per second of audio), CPU seconds per
+# minute of audio, and peak memory of the engine's processes and of the
+# benchmark process (in-process engines such as "tone" only show in the
+# latter). Engines that are not installed are skipped:
+#     python bench_engines.py [--engines piper,espeak-ng,tone] [--voice-model voice.onnx]
+#                             [--text-file book.txt] [--warm-models 1] [--json results.json]
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.tts_engines import ENGINES, create_engine
+from services.resource_policy import ResourcePolicy, process_cpu_seconds
+from utils.text_processing import split_text_by_sentences, split_text_into_spans, sanitize_for_tts
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+SAMPLE_TEXT = (
+    "The station was quiet when the last train pulled in. A conductor stepped down, looked along the "
+    "empty platform, and checked his watch twice. Somewhere beyond the yard a dog was barking. "
+    "\"You're late,\" said the woman by the ticket office, folding her newspaper. He shrugged and "
+    "said the signals had failed again near the river. She laughed, because they always failed near "
+    "the river, and everyone in town knew it. Then the lights flickered, hummed, and went out. "
+    "For a moment nobody moved; the only sound was rain on the iron roof."
+)
+
+
+def peak_rss_mb(who):
+    """Peak resident memory of this process or of its finished children, in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_engine(name, text, voice_model, warm_models):
+    """Measure one engine in this process and return its results"""
+    engine = create_engine(name, ResourcePolicy(), warm_models=warm_models)
+    # Sentence by sentence, as the reader synthesizes them
+    chunks = [chunk for sentence, _, _ in split_text_into_spans(text)
+              for chunk in split_text_by_sentences(sanitize_for_tts(sentence)) if chunk.strip()]
+    cpu_start = process_cpu_seconds()
+
+    started = time.perf_counter()
+    warming = engine.warm_up(voice_model, 1.0)
+    if warming is not None:
+        warming.join()
+    warm_up_seconds = time.perf_counter() - started
+
+    first_audio = []
+    synthesis_seconds = 0.0
+    audio_seconds = 0.0
+    engine_peak = 0
+    for chunk in chunks:
+        started = time.perf_counter()
+        blocks = engine.synthesize(chunk, voice_model, 1.0)
+        pcm_bytes = 0
+        for index, block in enumerate(blocks):
+            if index == 0:
+                first_audio.append(time.perf_counter() - started)
+            pcm_bytes += len(block.pcm)
+            bytes_per_second = block.sample_rate * block.channels * 2
+        synthesis_seconds += time.perf_counter() - started
+        audio_seconds += pcm_bytes / bytes_per_second
+        engine_peak = max(engine_peak, engine.memory_bytes())
+
+    cpu_seconds = process_cpu_seconds() + engine.cpu_seconds() - cpu_start
+    engine.close()
+    children_peak = peak_rss_mb(resource.RUSAGE_CHILDREN) if resource is not None else None
+    return {
+        "engine": name,
+        "chunks": len(chunks),
+        "audio_seconds": round(audio_seconds, 3),
+        "warm_up_seconds": round(warm_up_seconds, 3),
+        "first_chunk_ttfa_seconds": round(first_audio[0], 4),
+        "median_ttfa_seconds": round(statistics.median(first_audio), 4),
+        "real_time_factor": round(synthesis_seconds / audio_seconds, 4),
+        "cpu_seconds_per_audio_minute": round(cpu_seconds / (audio_seconds / 60.0), 3),
+        "engine_peak_mb": round(max(engine_peak / (1024 * 1024), children_peak or 0.0), 1),
+        "process_peak_mb": round(peak_rss_mb(resource.RUSAGE_SELF), 1) if resource is not None else None,
+    }
+
+
+def skip_reason(name, voice_model):
+    engine = create_engine(name)
+    if not engine.available():
+        return "not installed"
+    if name == "piper" and not voice_model:
+        return "needs --voice-model"
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare real-time factor, time to first audio and memory of TTS engines")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="Comma-separated engine names")
+    parser.add_argument("--voice-model", help="Piper voice model (.onnx); an eSpeak voice name is used as such")
+    parser.add_argument("--text-file", help="Text to synthesize (default: a built-in paragraph)")
+    parser.add_argument("--warm-models", type=int, default=1, help="Warm Piper workers (0 = Piper per chunk)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    text = SAMPLE_TEXT
+    if args.text_file:
+        with open(args.text_file, 'r', encoding='utf-8') as f:
+            text = f.read()
+
+    if args.child:
+        print(json.dumps(run_engine(args.child, text, args.voice_model, args.warm_models)))
+        return
+
+    results = []
+    for name in [name.strip() for name in args.engines.split(",") if name.strip()]:
+        reason = skip_reason(name, args.voice_model)
+        if reason:
+            print(f"{name}: skipped ({reason})")
+            continue
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", name, "--warm-models", str(args.warm_models)]
+        if args.voice_model:
+            cmd += ["--voice-model", args.voice_model]
+        if args.text_file:
+            cmd += ["--text-file", args.text_file]
+        child = subprocess.run(cmd, capture_output=True, text=True)
+        if child.returncode != 0:
+            print(f"{name}: failed\n{child.stderr.strip()}")
+            continue
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    if not results:
+        print("No engine could be measured.")
+        sys.exit(1)
+
+    columns = [("engine", "engine", "{}"), ("audio s", "audio_seconds", "{:.1f}"),
+               ("warm-up s", "warm_up_seconds", "{:.2f}"), ("TTFA first s", "first_chunk_ttfa_seconds", "{:.3f}"),
+               ("TTFA median s", "median_ttfa_seconds", "{:.3f}"), ("RTF", "real_time_factor", "{:.3f}"),
+               ("CPU s/audio min", "cpu_seconds_per_audio_minute", "{:.2f}"),
+               ("engine peak MB", "engine_peak_mb", "{}"), ("process peak MB", "process_peak_mb", "{}")]
+    print(f"{results[0]['chunks']} chunks per engine")
+    print("  ".join(f"{title:>15}" for title, _, _ in columns))
+    for result in results:
+        print("  ".join(f"{fmt.format(result[key]):>15}" for _, key, fmt in columns))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# Benchmark of the library catalog on a large synthetic collection
+#
+# Writes --files small text files into nested directories, then measures a
+# first scan (every file read), a rescan with nothing changed (directory
+# walk only), a rescan after touching --touched files, and how long listing
+# the whole catalog takes, which is what opening the library view costs:
+#     python bench_library.py [--files 50000] [--touched 100] [--workers 4] [--keep DIR]
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.config_service import ConfigService
+from services.library_service import LibraryService
+
+
+WORDS = ("the", "station", "was", "quiet", "when", "last", "train", "pulled", "in", "rain", "roof",
+         "conductor", "platform", "signals", "river", "lights", "laughed", "newspaper")
+
+
+def write_collection(root, count, per_directory=500):
+    """count text files of a few hundred words each, per_directory to a directory"""
+    rng = random.Random(7)
+    paths = []
+    for index in range(count):
+        directory = os.path.join(root, f"shelf-{index // per_directory:04d}")
+        if index % per_directory == 0:
+            os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"book-{index:06d}.txt")
+        sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 15))).capitalize() + "."
+                     for _ in range(rng.randint(10, 40))]
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(" ".join(sentences) + "\n")
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure library catalog scans and listing on many files")
+    parser.add_argument("--files", type=int, default=50000, help="Files in the collection")
+    parser.add_argument("--touched", type=int, default=100, help="Files changed before the last rescan")
+    parser.add_argument("--workers", type=int, default=4, help="Scan thread pool size")
+    parser.add_argument("--keep", help="Build the collection here and keep it (default: a temporary directory)")
+    args = parser.parse_args(argv)
+
+    work_dir = args.keep or tempfile.mkdtemp(prefix="library-bench-")
+    try:
+        collection = os.path.join(work_dir, "library")
+        started = time.perf_counter()
+        paths = write_collection(collection, args.files)
+        print(f"Wrote {len(paths)} files in {time.perf_counter() - started:.1f}s")
+
+        config_service = ConfigService(os.path.join(work_dir, "config", "app_config.json"))
+        db_path = os.path.join(work_dir, "config", "library.sqlite3")
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        library = LibraryService(config_service, db_path=db_path,
+                                 index_dir=os.path.join(work_dir, "config", "indexes"), workers=args.workers)
+
+        first = library.scan([collection])
+        unchanged = library.scan([collection])
+        for path in random.Random(11).sample(paths, min(args.touched, len(paths))):
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write("One more sentence.\n")
+        touched = library.scan([collection])
+
+        started = time.perf_counter()
+        entries = library.entries()
+        listed = time.perf_counter() - started
+        totals = library.totals()
+
+        print(f"{'first scan':>22}: {first['seconds']:8.2f}s  ({first['read']} files read)")
+        print(f"{'rescan, no changes':>22}: {unchanged['seconds']:8.2f}s  ({unchanged['read']} files read)")
+        print(f"{'rescan, some changed':>22}: {touched['seconds']:8.2f}s  ({touched['read']} files read)")
+        print(f"{'list catalog':>22}: {listed * 1000:8.1f}ms ({len(entries)} entries)")
+        print(f"{'catalog size':>22}: {os.path.getsize(db_path) / (1024 * 1024):8.1f}MB "
+              f"({totals['words']} words, {totals['reading_seconds'] / 3600:.0f} h of reading)")
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Benchmark of sentence segmentation on Chinese, Japanese and English text
+#
+# Compares the old ASCII-only splitter with the current script-aware one:
+# chunk counts and sizes (smaller chunks mean faster time to first audio,
+# since Piper synthesizes a whole chunk before any of it plays) and
+# segmentation throughput. Corpora are generated, or pass text files:
+#     python bench_segmentation.py [book.txt ...]
+import random
+import re
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from utils.text_processing import split_text_by_sentences, split_text_into_spans, detect_script
+
+
+CHINESE_CLAUSES = ["今天的天气非常好", "我们一起去公园散步", "他说这本书很有意思", "远处的山上还有积雪",
+                   "城市的灯光渐渐亮了起来", "她没有回答这个问题", "时间过得真快"]
+JAPANESE_CLAUSES = ["今日はとても良い天気です", "私たちは公園を散歩しました", "この本はとても面白いと彼は言った",
+                    "遠くの山にはまだ雪が残っている", "町の明かりが少しずつ灯り始めた", "彼女は何も答えなかった"]
+ENGLISH_CLAUSES = ["the weather was very good today", "we walked through the park together",
+                   "he said the book was interesting", "there was still snow on the distant hills",
+                   "the lights of the city slowly came on", "she did not answer the question"]
+
+
+def generate_corpus(clauses, clause_mark, terminators, target_bytes=200_000, seed=1):
+    """Paragraphs of random sentences built from clauses, 1-4 clauses each"""
+    rng = random.Random(seed)
+    paragraphs = []
+    size = 0
+    while size < target_bytes:
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            sentence = clause_mark.join(rng.choice(clauses) for _ in range(rng.randint(1, 4)))
+            if rng.random() < 0.1:
+                sentence = f"「{sentence}{terminators[0]}」" if clause_mark != ", " else f'"{sentence}."'
+            else:
+                sentence += rng.choice(terminators)
+            sentences.append(sentence)
+        paragraph = ("" if clause_mark != ", " else " ").join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph.encode('utf-8'))
+    return "\n\n".join(paragraphs)
+
+
+def legacy_split_text_by_sentences(text, max_chunk_size=2048):
+    """The splitter before CJK support: ASCII terminators, then words, then halving"""
+    sentences = re.split(r'[.!?]+\s+', text)
+    chunks = []
+    current_chunk = ""
+    for sentence in sentences:
+        if len(current_chunk.encode('utf-8')) + len(sentence.encode('utf-8')) + 1 <= max_chunk_size:
+            current_chunk = current_chunk + " " + sentence if current_chunk else sentence
+            continue
+        if current_chunk:
+            chunks.append(current_chunk)
+        current_chunk = sentence
+        if len(sentence.encode('utf-8')) > max_chunk_size:
+            current_chunk = ""
+            for word in sentence.split():
+                if len(current_chunk.encode('utf-8')) + len(word.encode('utf-8')) + 1 <= max_chunk_size:
+                    current_chunk = current_chunk + " " + word if current_chunk else word
+                    continue
+                if current_chunk:
+                    chunks.append(current_chunk)
+                    current_chunk = word
+                    continue
+                while len(word.encode('utf-8')) > max_chunk_size:
+                    substring = word[:len(word)//2]
+                    while len(substring.encode('utf-8')) > max_chunk_size and len(substring) > 1:
+                        substring = substring[:-1]
+                    chunks.append(substring)
+                    word = word[len(substring):]
+                current_chunk = word
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+
+def measure(name, splitter, text, repeats=3):
+    """Run a splitter and report chunk statistics and throughput"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        chunks = splitter(text)
+        best = min(best, time.perf_counter() - start)
+
+    sizes = [len(chunk.encode('utf-8')) for chunk in chunks if chunk.strip()]
+    text_mb = len(text.encode('utf-8')) / (1024 * 1024)
+    print(f"  {name:<22} chunks={len(sizes):>6}  max={max(sizes):>6} B  mean={sum(sizes) / len(sizes):>7.0f} B"
+          f"  first={sizes[0]:>6} B  {text_mb / best:>6.1f} MB/s")
+    return sizes
+
+
+def bench(label, text):
+    print(f"{label} ({len(text.encode('utf-8')) // 1024} KB, script: {detect_script(text)})")
+    measure("legacy sentences", legacy_split_text_by_sentences, text)
+    measure("split_text_by_sentences", split_text_by_sentences, text)
+    measure("split_text_into_spans", lambda t: [span[0] for span in split_text_into_spans(t)], text)
+    print()
+
+
+def main():
+    if len(sys.argv) > 1:
+        for path in sys.argv[1:]:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                bench(path, f.read())
+        return
+
+    bench("Chinese", generate_corpus(CHINESE_CLAUSES, "，", ["。", "！", "？"]))
+    bench("Japanese", generate_corpus(JAPANESE_CLAUSES, "、", ["。", "！", "？"]))
+    bench("English", generate_corpus(ENGLISH_CLAUSES, ", ", [".", "!", "?"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Benchmark of launch-to-audio time with and without a session snapshot
+#
+# Runs the headless parts of a launch (config, TTS service with mixer,
+# controller, file load) and measures the time until the first sentence is
+# heard, once cold and once restored from a session snapshot. Synthesis is
+# done by the soak test's stub Piper with delays standing in for model
+# loading and synthesis, so the numbers show the structure of the saving
+# rather than a real voice's speed:
+#     python bench_warm_restart.py [--load-delay 1.0] [--synthesis-delay 0.3]
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from soak_playback import NullSinkTTSService, install_stub_piper, write_book
+
+from services.file_service import FileService
+from services.config_service import ConfigService
+from services.session_service import SessionService
+from controllers.main_controller import MainController
+from services import playback_scheduler
+
+
+def launch(work_dir, book, restore):
+    """Start the services like TTSApp does and return (seconds to first audio, restored chunks)"""
+    started = time.monotonic()
+    config_service = ConfigService(os.path.join(work_dir, "config", "app_config.json"))
+    audio_settings = config_service.get_audio_settings()
+    tts = NullSinkTTSService(100.0, memory_budget_mb=audio_settings.get('memory_budget_mb', 64),
+                             cache_mb=audio_settings.get('cache_mb', 32))
+    tts.configure_audio(**audio_settings)
+    tts.configure_voices(**config_service.get_voice_settings())
+    tts.set_parameters(voice_model=os.path.join(work_dir, "stub-voice.onnx"))
+    controller = MainController(FileService(index_dir=os.path.join(work_dir, "config", "indexes")),
+                                tts, config_service)
+    session_service = SessionService(os.path.join(work_dir, "config", "session"))
+
+    heard = threading.Event()
+    controller.scheduler.add_listener(lambda old, new: new == playback_scheduler.PLAYING and heard.set())
+
+    restored = 0
+    snapshot = session_service.load() if restore else None
+    if snapshot is not None:
+        restored = session_service.restore_audio(tts, snapshot)
+        position = snapshot["position"]
+    else:
+        position = config_service.get_last_position(book) or 0
+    controller.load_file(book)
+    controller.start_playback(position)
+    heard.wait(60)
+    seconds = time.monotonic() - started
+
+    # Listen a little with one periodic snapshot, then exit the way on_closing does
+    session_service.save(controller, synthesize=True)
+    time.sleep(0.2)
+    session_service.save(controller, playing=True)
+    controller.pause()
+    tts.scheduler.close()
+    tts.close_voices()
+    return seconds, restored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure launch-to-audio time, cold and warm")
+    parser.add_argument("--load-delay", type=float, default=1.0, help="Stub voice model load time (s)")
+    parser.add_argument("--synthesis-delay", type=float, default=0.3, help="Stub synthesis time per chunk (s)")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="text-reader-restart-")
+    try:
+        os.makedirs(os.path.join(work_dir, "bin"))
+        install_stub_piper(os.path.join(work_dir, "bin"))
+        os.environ["STUB_PIPER_LOAD_DELAY"] = str(args.load_delay)
+        os.environ["STUB_PIPER_DELAY"] = str(args.synthesis_delay)
+        book = os.path.join(work_dir, "book.txt")
+        write_book(book, random.Random(1), 50_000)
+
+        cold, warm = [], []
+        for _ in range(args.runs):
+            seconds, _ = launch(work_dir, book, restore=False)
+            cold.append(seconds)
+            seconds, restored = launch(work_dir, book, restore=True)
+            warm.append(seconds)
+            print(f"cold {cold[-1]:.3f}s   warm {warm[-1]:.3f}s ({restored} chunks restored)")
+        print(f"Median launch to audio: cold {sorted(cold)[len(cold) // 2]:.3f}s, "
+              f"warm {sorted(warm)[len(warm) // 2]:.3f}s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,7 @@ featuring position tracking and adjustable parameters.
 """
 
 import sys
+import argparse
 import subprocess
 from pathlib import Path
 
@@ -23,7 +24,69 @@ def check_piper_tts():
         return False
 
 
+def parse_args(argv=None):
+    """Parse command line arguments (no command starts the GUI)"""
+    parser = argparse.ArgumentParser(description="Text-to-Speech Reader Application")
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve_parser = subparsers.add_parser("serve", help="Stream audio over HTTP on the local network")
+    serve_parser.add_argument("--host", help="Interface to listen on (default from config)")
+    serve_parser.add_argument("--port", type=int, help="Port to listen on (default from config)")
+    serve_parser.add_argument("--config", default="config/app_config.json", help="Configuration file")
+
+    export_parser = subparsers.add_parser("export", help="Render part of a file into one audio clip")
+    export_parser.add_argument("file", help="Text file to read from")
+    export_parser.add_argument("output", help="Clip to write (.wav, or any format ffmpeg can encode)")
+    export_parser.add_argument("--start", type=int, default=0, help="First byte of the range")
+    export_parser.add_argument("--end", type=int, help="Byte the range ends at (default: end of file)")
+    export_parser.add_argument("--chapter", type=int, help="Export this chapter (0-based) instead of a byte range")
+    export_parser.add_argument("--search", help="Export the passage around a search hit instead of a byte range")
+    export_parser.add_argument("--hit", type=int, default=0, help="Which search hit to export (0-based)")
+    export_parser.add_argument("--regex", action="store_true", help="Treat --search as a regular expression")
+    export_parser.add_argument("--config", default="config/app_config.json", help="Configuration file")
+
+    library_parser = subparsers.add_parser("library", help="Update the library catalog and list it")
+    library_parser.add_argument("dirs", nargs="*", help="Directories to catalog (default: library dirs from config)")
+    library_parser.add_argument("--config", default="config/app_config.json", help="Configuration file")
+
+    return parser.parse_args(argv)
+
+
 def main():
+    args = parse_args()
+
+    # Add the src directory to the path
+    src_path = Path(__file__).parent / "src"
+    sys.path.insert(0, str(src_path))
+
+    if args.command == "serve":
+        if not check_piper_tts():
+            print("Warning: Piper TTS not found. Streams will fail until it is installed.")
+        from server.audio_stream_server import run_server
+        run_server(args.config, host=args.host, port=args.port)
+        return
+
+    if args.command == "export":
+        if not check_piper_tts():
+            print("Warning: Piper TTS not found. Uncached sentences can't be rendered.")
+        from services.export_service import run_export
+        try:
+            run_export(args.file, args.output, args.config, start=args.start, end=args.end,
+                       chapter=args.chapter, search=args.search, hit_index=args.hit, regex=args.regex)
+        except (RuntimeError, ValueError) as e:
+            print(f"\nExport failed: {e}")
+            sys.exit(1)
+        return
+
+    if args.command == "library":
+        from services.library_service import run_scan
+        try:
+            run_scan(args.dirs, args.config)
+        except ValueError as e:
+            print(f"Library scan failed: {e}")
+            sys.exit(1)
+        return
+
     # Check if Piper TTS is available
     if not check_piper_tts():
         print("Warning: Piper TTS not found.")
@@ -31,10 +94,6 @@ def main():
         print("The application will run but TTS functionality will not work.")
         input("Press Enter to continue anyway...")
     
-    # Add the src directory to the path
-    src_path = Path(__file__).parent / "src"
-    sys.path.insert(0, str(src_path))
-    
     try:
         from main import main as run_app
         run_app()
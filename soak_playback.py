@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# Soak test for memory, file descriptor, thread and temp file leaks during long playback
+#
+# Simulates hours of listening in accelerated time: a stub Piper writes
+# tone WAVs instead of speech, audio goes to SDL's dummy driver (a null
+# sink) and every wait is shortened by --speedup. The run randomly starts,
+# pauses, seeks, changes rate, plays playlists and uses the in-memory and
+# streaming APIs, sampling RSS, open file descriptors, threads, leased
+# audio buffers and temp-dir entries. It exits with status 1 when any of
+# them grows past its threshold between the warmed-up baseline and the end.
+#     python soak_playback.py --hours 4 --speedup 200 --report soak.json
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+
+# A null audio sink: pygame plays into SDL's dummy driver
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+from services.config_service import ConfigService
+from services.tts_service import TTSService
+from controllers.main_controller import MainController
+
+
+# Stand-in for the piper executable: one-shot (--output_file) and worker
+# (--json-input --output_dir) modes, writing a tone as long as the text at
+# --length-scale. Like Piper, it ignores any rate in a JSON request.
+STUB_PIPER = r'''#!{python}
+import array, json, math, os, sys, time, wave
+
+RATE = 22050
+SECONDS_PER_CHAR = 0.06
+PERIOD = array.array('h', (int(8000 * math.sin(2 * math.pi * i / 100)) for i in range(100)))
+
+def write_wav(path, text, length_scale=1.0):
+    frames = max(1, int(len(text) * SECONDS_PER_CHAR * length_scale * RATE) // 100)
+    silence = array.array('h', bytes(2 * RATE // 10))
+    time.sleep(float(os.environ.get("STUB_PIPER_DELAY", "0")))
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(RATE)
+        out.writeframes(silence.tobytes() + (PERIOD * frames).tobytes() + silence.tobytes())
+
+args = sys.argv[1:]
+scale = float(args[args.index("--length-scale") + 1]) if "--length-scale" in args else 1.0
+time.sleep(float(os.environ.get("STUB_PIPER_LOAD_DELAY", "0")))  # Model load
+if "--version" in args:
+    print("stub-piper 1.0")
+elif "--json-input" in args:
+    output_dir = args[args.index("--output_dir") + 1]
+    for number, line in enumerate(sys.stdin):
+        path = os.path.join(output_dir, "%d.wav" % number)
+        write_wav(path, json.loads(line)["text"], scale)
+        print(path, flush=True)
+else:
+    write_wav(args[args.index("--output_file") + 1], sys.stdin.read(), scale)
+'''
+
+WORDS = ("the quiet river ran past old stone houses while lanterns swayed in the evening wind "
+         "and travellers spoke of distant cities markets and storms at sea").split()
+
+
+class NullSinkTTSService(TTSService):
+    """TTSService whose playback and pauses run speedup times faster than real time"""
+
+    def __init__(self, speedup, **kwargs):
+        super().__init__(**kwargs)
+        self.speedup = speedup
+        self.simulated_seconds = 0.0
+        self._simulated_lock = threading.Lock()
+
+    def _simulate(self, seconds):
+        with self._simulated_lock:
+            self.simulated_seconds += seconds
+
+    def _play_raw_pcm(self, pcm_view, sample_rate, channels):
+        # Same mixer calls as real playback, so leaked Sound objects still show up
+        self._ensure_mixer(sample_rate, channels)
+        import pygame
+        sound = pygame.mixer.Sound(buffer=pcm_view)
+        sound.play()
+        length = sound.get_length()
+        started = time.monotonic()
+        if self.stop_signal.wait(length / self.speedup):
+            sound.stop()
+        self._simulate(min(length, (time.monotonic() - started) * self.speedup))
+
+    def _wait_sentence_gap(self):
+        if self.trim_silence and self.sentence_gap_ms > 0:
+            self.stop_signal.wait(self.sentence_gap_ms / 1000.0 / self.speedup)
+            self._simulate(self.sentence_gap_ms / 1000.0)
+
+
+def write_book(path, rng, size_bytes):
+    """A text file of random sentences"""
+    with open(path, 'w', encoding='utf-8') as f:
+        written = 0
+        while written < size_bytes:
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 18))).capitalize()
+            sentence += rng.choice([". ", "! ", "? ", ".\n\n"])
+            f.write(sentence)
+            written += len(sentence)
+
+
+def install_stub_piper(bin_dir):
+    """Put the stub piper first on PATH"""
+    path = os.path.join(bin_dir, "piper")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(STUB_PIPER.replace("{python}", sys.executable, 1))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+
+
+def rss_mb():
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        import resource  # Peak rather than current RSS, still catches steady growth
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def open_fds():
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(fd_dir))
+        except OSError:
+            continue
+    return 0
+
+
+def temp_entries(temp_dir):
+    return sum(len(dirs) + len(files) for _, dirs, files in os.walk(temp_dir))
+
+
+class SoakRun:
+    METRICS = ("rss_mb", "open_fds", "threads", "temp_entries", "leased_buffers")
+
+    def __init__(self, work_dir, hours, speedup, seed):
+        self.rng = random.Random(seed)
+        self.hours = hours
+        self.speedup = speedup
+        self.temp_dir = os.path.join(work_dir, "tmp")
+        os.makedirs(self.temp_dir)
+        # Temp files from synthesis (and Piper worker dirs) land where they can be counted
+        tempfile.tempdir = self.temp_dir
+        os.environ["TMPDIR"] = self.temp_dir
+
+        self.books = []
+        for name in ("first.txt", "second.txt", "third.txt"):
+            path = os.path.join(work_dir, name)
+            write_book(path, self.rng, self.rng.randint(20_000, 120_000))
+            self.books.append(path)
+
+        config_service = ConfigService(os.path.join(work_dir, "config", "app_config.json"))
+        self.tts = NullSinkTTSService(speedup, memory_budget_mb=16, cache_mb=4)
+        self.tts.configure_audio(**config_service.get_audio_settings())
+        self.tts.configure_voices(**config_service.get_voice_settings())
+        self.tts.set_parameters(voice_model=os.path.join(work_dir, "stub-voice.onnx"))
+        file_service = FileService(index_dir=os.path.join(work_dir, "config", "indexes"))
+        self.controller = MainController(file_service, self.tts, config_service)
+        self.samples = []
+        self.late_workers = 0  # pause() returned while the playback job was still running
+
+    def sample(self):
+        gc.collect()
+        pool = self.tts.buffer_pool.stats()
+        cache = self.tts.synthesis_cache.stats()
+        values = {
+            "simulated_hours": round(self.tts.simulated_seconds / 3600, 3),
+            "rss_mb": round(rss_mb(), 2),
+            "open_fds": open_fds(),
+            "threads": threading.active_count(),
+            "temp_entries": temp_entries(self.temp_dir),
+            # Buffers leased from the pool that the synthesis cache does not account for
+            "leased_buffers": pool["buffers_in_use"] - cache["entries"],
+        }
+        self.samples.append(values)
+        return values
+
+    def _listen(self, low, high):
+        """Let playback run for a while (real seconds)"""
+        time.sleep(self.rng.uniform(low, high))
+
+    def _pause(self):
+        self.controller.pause()
+        if not self.controller.scheduler.wait(0):
+            self.late_workers += 1
+
+    def _random_position(self):
+        file_service = self.controller.file_service
+        return file_service.find_sentence_start(self.rng.randrange(max(1, file_service.get_file_size())))
+
+    def step(self):
+        """One random listening action"""
+        controller = self.controller
+        action = self.rng.choices(
+            ["play", "seek", "rate", "playlist", "memory", "stream"],
+            weights=[5, 4, 2, 1, 1, 1]
+        )[0]
+
+        if action in ("play", "seek", "rate"):
+            if controller.file_service.file_path is None or self.rng.random() < 0.1:
+                controller.load_file(self.rng.choice(self.books))
+            if action == "play":
+                controller.start_playback(controller.get_current_position() or 0)
+            else:
+                controller.jump_to(self._random_position())
+            self._listen(0.05, 0.4)
+            if action == "rate":
+                self.tts.set_parameters(rate=self.rng.choice([0.8, 1.0, 1.25, 1.5]))
+                self._listen(0.05, 0.3)
+            self._pause()
+        elif action == "playlist":
+            controller.set_playlist(self.rng.sample(self.books, 2))
+            # Start close to the end so the next file is preloaded and played
+            controller.config_service.set_last_position(
+                controller.playlist[0], max(0, os.path.getsize(controller.playlist[0]) - 600))
+            controller.start_playlist(0)
+            self._listen(0.2, 0.6)
+            self._pause()
+            controller.clear_playlist()
+        elif action == "memory":
+            sentence = " ".join(self.rng.choice(WORDS) for _ in range(8)) + "."
+            self.tts.stop_signal.clear()
+            self.tts.play_audio_from_memory(self.tts.synthesize_text_to_memory(sentence))
+        else:
+            sentences = [" ".join(self.rng.choice(WORDS) for _ in range(10)) + "." for _ in range(20)]
+            self.tts.start_streaming_speech(iter(sentences))
+            self._listen(0.05, 0.3)
+            self.tts.stop_speech()
+
+    def run(self, warmup_fraction=0.1, sample_every=25):
+        target_seconds = self.hours * 3600
+        baseline = None
+        steps = 0
+        while self.tts.simulated_seconds < target_seconds:
+            self.step()
+            steps += 1
+            if baseline is None and self.tts.simulated_seconds >= target_seconds * warmup_fraction:
+                # Caches, pools and warm voices are full by now; growth is measured from here
+                baseline = self.sample()
+                print(f"Baseline: {baseline}")
+            elif steps % sample_every == 0:
+                print(self.sample())
+
+        self.controller.stop()
+        self.controller.clear_playlist()
+        self.tts.stop_speech()
+        final = self._settled_sample(baseline)
+        print(f"Final: {final}")
+        return steps, baseline or self.samples[0], final
+
+    def _settled_sample(self, baseline, timeout=10.0):
+        """Sample once short-lived background threads (preloads, resynthesis) have exited"""
+        deadline = time.monotonic() + timeout
+        while True:
+            values = self.sample()
+            if baseline is None or values["threads"] <= baseline["threads"] or time.monotonic() > deadline:
+                return values
+            time.sleep(0.5)
+
+    def close(self):
+        self.tts.close_voices()
+
+
+def check_growth(baseline, final, thresholds):
+    """Metrics whose growth from baseline to final exceeds its threshold"""
+    failures = []
+    for metric, limit in thresholds.items():
+        growth = final[metric] - baseline[metric]
+        if growth > limit:
+            failures.append(f"{metric} grew by {growth:g} (limit {limit:g})")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Soak test playback for resource leaks")
+    parser.add_argument("--hours", type=float, default=2.0, help="Simulated listening time")
+    parser.add_argument("--speedup", type=float, default=200.0, help="How much faster than real time to play")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=48.0)
+    parser.add_argument("--max-fd-growth", type=int, default=4)
+    parser.add_argument("--max-thread-growth", type=int, default=2)
+    parser.add_argument("--max-temp-growth", type=int, default=2)
+    parser.add_argument("--max-leased-buffers", type=int, default=0)
+    parser.add_argument("--report", help="Write the samples and verdict as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    work_dir = tempfile.mkdtemp(prefix="text-reader-soak-")
+    bin_dir = os.path.join(work_dir, "bin")
+    os.makedirs(bin_dir)
+    install_stub_piper(bin_dir)
+
+    run = SoakRun(work_dir, args.hours, args.speedup, args.seed)
+    started = time.monotonic()
+    try:
+        steps, baseline, final = run.run()
+    finally:
+        run.close()
+        tempfile.tempdir = None
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    failures = check_growth(baseline, final, {
+        "rss_mb": args.max_rss_growth_mb,
+        "open_fds": args.max_fd_growth,
+        "threads": args.max_thread_growth,
+        "temp_entries": args.max_temp_growth,
+        "leased_buffers": args.max_leased_buffers,
+    })
+    print(f"{steps} actions, {final['simulated_hours']:.2f} simulated hours in "
+          f"{time.monotonic() - started:.0f} s; pause() returned before the job ended {run.late_workers} times")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({"baseline": baseline, "final": final, "samples": run.samples,
+                       "late_workers": run.late_workers, "failures": failures}, f, indent=2)
+
+    if failures:
+        print("SOAK TEST FAILED:\n  " + "\n  ".join(failures))
+        return 1
+    print("Soak test passed.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
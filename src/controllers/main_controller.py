@@ -1,112 +1,380 @@
 # Main controller for coordinating the text-to-speech application
+import asyncio
 import threading
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 
 # Add the src directory to the path to enable imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.text_processing import split_text_by_sentences
+from services.file_service import FileService
 
 
 class MainController:
-    def __init__(self, file_service, tts_service, config_service):
+    PRELOAD_BYTES = 8192  # Start preparing the next playlist file this close to the end
+    PRELOAD_SENTENCES = 2  # Sentences of the next file synthesized ahead of time
+
+    def __init__(self, file_service, tts_service, config_service, profiler=None):
         self.file_service = file_service
         self.tts_service = tts_service
         self.config_service = config_service
-        self.playback_thread = None
-        self.is_playing_flag = False
-        self.stop_playback_event = threading.Event()
+        self.profiler = profiler  # Optional PlaybackProfiler
+        # Single playback worker and state machine, shared with the TTS service
+        self.scheduler = tts_service.scheduler
+        # Running play_async tasks (task -> its loop), stopped by pause/stop/set_position
+        self._async_tasks = {}
+        self.async_position = None  # Where the last play_async session stopped
+
+        # Files played back to back; the loaded file is playlist[playlist_index]
+        self.playlist = []
+        self.playlist_index = -1
+        self.on_file_changed = None  # Called as (file_path, position) from the playback thread
+        self._preload = None
+        self._preload_lock = threading.Lock()
+        # Keep reading appended text at the end of a plain text file (logs, live transcripts)
+        self.follow_mode = False
     
     def load_file(self, file_path):
-        """Load a text file through the file service"""
+        """Load a text file through the file service, stopping playback of the previous one"""
+        # Wait for the worker to let go of the file service before swapping files
+        self.scheduler.stop(timeout=None)
+        self._discard_preload()
         self.file_service.load_file(file_path)
     
     def is_playing(self):
         """Check if the application is currently playing audio"""
-        return self.is_playing_flag
+        return self.scheduler.is_active() or bool(self._async_tasks)
+
+    def get_state(self):
+        """Playback state: idle, buffering, playing, paused or seeking"""
+        return self.scheduler.state
     
-    def start_playback(self, start_position=0):
-        """Start playback from a specific position"""
+    def start_playback(self, start_position=0, seeking=False):
+        """Start playback from a specific position, replacing any ongoing playback"""
         if not self.file_service.is_file_loaded():
             raise ValueError("No file is currently loaded")
-        
-        # Stop any ongoing playback
-        self.pause()
-        
-        # Set up threading event
-        self.stop_playback_event.clear()
-        self.is_playing_flag = True
-        
-        # Start playback in a separate thread
-        self.playback_thread = threading.Thread(
-            target=self._playback_worker,
-            args=(start_position,)
-        )
-        self.playback_thread.daemon = True
-        self.playback_thread.start()
+
+        self._discard_preload()
+        job = lambda session: self._playback_worker(start_position, session)
+        if seeking:
+            self.scheduler.seek(job)
+        else:
+            self.scheduler.play(job)
+
+    def set_follow_mode(self, enabled):
+        """
+        Follow the loaded file as it grows: at its end, playback waits for
+        more text instead of stopping or moving on through the playlist.
+        Takes effect the next time playback reaches the end of the file.
+        """
+        self.follow_mode = bool(enabled)
+
+    def wait_until_done(self, timeout=None):
+        """Block until playback ends (headless use); returns False on timeout"""
+        return self.scheduler.wait(timeout)
     
-    def _playback_worker(self, start_position):
-        """Worker thread for handling audio playback"""
+    def iter_sentence_spans(self, start_position=0, chunk_size=4096, file_service=None):
+        """
+        Yield (sentence, span_start, span_end) from start_position to the end of
+        the loaded file (or of file_service); see FileService.iter_sentence_spans
+        """
+        return (file_service or self.file_service).iter_sentence_spans(start_position, chunk_size)
+
+    def upcoming_sentences(self, position, count):
+        """
+        The first count non-blank sentences of the loaded file from position,
+        read through a separate FileService so playback is not disturbed
+        """
+        with self.file_service.lock:
+            file_path = self.file_service.file_path
+        if file_path is None:
+            return []
+        reader = FileService(index_dir=self.file_service.index_dir,
+                             checkpoint_mb=self.file_service.checkpoint_bytes / (1024 * 1024))
+        sentences = []
         try:
-            # Start from the specified position
-            current_pos = start_position
-            chunk_size = 4096  # Read in 4KB chunks
+            reader.load_file(file_path)
+            for sentence, _, _ in self.iter_sentence_spans(position, file_service=reader):
+                if len(sentences) >= count:
+                    break
+                if sentence.strip():
+                    sentences.append(sentence)
+        finally:
+            reader.close_file()
+        return sentences
 
-            while not self.stop_playback_event.is_set():
-                # Read a chunk of text from the current position
-                text_chunk = self.file_service.read_chunk_at_position(current_pos, chunk_size)
+    def _playback_worker(self, start_position, session):
+        """Playback job run by the scheduler's worker thread"""
+        with self.profiler.session("playback") if self.profiler is not None else nullcontext():
+            self._play_from(start_position, session)
 
-                # If we've reached the end of the file, exit
-                if not text_chunk:
-                    break
+    def _play_from(self, start_position, session):
+        """Read from start_position, then on through the playlist, until the end or a stop request"""
+        self.tts_service.reset_timing()
+        position = start_position
+        while self._read_to_end(position, session):
+            position = self._advance_playlist(session)
+            if position is None:
+                break
+
+    def _sentence_spans(self, start_position, session):
+        """The sentences _read_to_end reads, and whether it follows the file as it grows"""
+        if not (self.follow_mode and self.file_service.can_follow()):
+            return self.iter_sentence_spans(start_position), False
+        file_settings = self.config_service.get_file_settings()
+        spans = self.file_service.follow_sentence_spans(
+            start_position,
+            should_stop=lambda: session.cancelled or not self.follow_mode,
+            poll_interval=file_settings.get('follow_poll_interval_s', 0.25),
+            idle_flush_s=file_settings.get('follow_idle_flush_s', 2.0)
+        )
+        return spans, True
 
-                # Split the chunk into sentences for more natural reading
-                sentence_chunks = split_text_by_sentences(text_chunk)
+    def _read_to_end(self, start_position, session):
+        """Read the loaded file aloud; returns True if its end was reached"""
+        preload_from = self.file_service.get_file_size() - self.PRELOAD_BYTES
+        spans, following = self._sentence_spans(start_position, session)
+        for sentence_chunk, span_start, span_end in spans:
+            if session.cancelled:
+                return False
 
-                for sentence_chunk in sentence_chunks:
-                    if self.stop_playback_event.is_set():
-                        break
+            # A followed file has no end to preload the next playlist file for
+            if not following and span_end >= preload_from:
+                self._start_preload()
 
-                    if sentence_chunk.strip():
-                        # Calculate the new position after processing this sentence
-                        sentence_bytes = len(sentence_chunk.encode('utf-8'))
+            if sentence_chunk.strip():
+                # Speak the sentence chunk with sync playback to ensure position updates correctly
+                current_file = self.file_service.file_path
+                self.tts_service.speak_text(
+                    sentence_chunk,
+                    source_file_path=current_file,
+                    sync_playback=True,
+                    byte_span=(span_start, span_end)
+                )
 
-                        # Speak the sentence chunk with sync playback to ensure position updates correctly
-                        self.tts_service.speak_text(sentence_chunk, sync_playback=True)
+                # An interrupted sentence is read again from its start next time
+                if session.cancelled:
+                    return False
 
-                        # Update position for next iteration after the audio has played
-                        current_pos += sentence_bytes
+                # Update the last known position in config service after audio playback
+                if current_file:
+                    self.config_service.set_last_position(current_file, span_end)
+                self._release_preloaded_audio()
 
-                        # Update the last known position in config service after audio playback
-                        current_file = self.file_service.file_path
-                        if current_file:
-                            self.config_service.set_last_position(current_file, current_pos)
+        return not session.cancelled
 
-                # Check if playback should stop
-                if self.stop_playback_event.is_set():
-                    break
+    # Playlist
+
+    def set_playlist(self, file_paths, start_index=0):
+        """Replace the playlist; playlist_index points at the entry to play first"""
+        self._discard_preload()
+        self.playlist = [str(path) for path in file_paths]
+        self.playlist_index = min(start_index, len(self.playlist) - 1)
+
+    def add_to_playlist(self, file_path):
+        """Append a file to the playlist"""
+        self.playlist.append(str(file_path))
+
+    def clear_playlist(self):
+        self._discard_preload()
+        self.playlist = []
+        self.playlist_index = -1
+
+    def start_playlist(self, index=None):
+        """Load a playlist entry and read from its saved position onwards through the playlist"""
+        if index is not None:
+            self.playlist_index = index
+        if not 0 <= self.playlist_index < len(self.playlist):
+            raise ValueError("The playlist has no such entry")
+
+        file_path = self.playlist[self.playlist_index]
+        self.load_file(file_path)
+        position = self._resume_position(file_path, self.file_service.get_file_size())
+        if self.on_file_changed:
+            self.on_file_changed(file_path, position)
+        self.start_playback(position)
+        return position
+
+    def _resume_position(self, file_path, file_size):
+        """Saved position of a file; a finished file starts over"""
+        position = self.config_service.get_last_position(file_path) or 0
+        return position if position < file_size else 0
 
+    def _next_playlist_file(self):
+        """The file after the loaded one, if the loaded file is the current playlist entry"""
+        if not 0 <= self.playlist_index < len(self.playlist) - 1:
+            return None
+        if self.playlist[self.playlist_index] != self.file_service.file_path:
+            return None  # A file opened outside the playlist
+        return self.playlist[self.playlist_index + 1]
+
+    def _start_preload(self):
+        """
+        Prepare the next playlist file in the background: open it (building
+        any compressed/document index), find its saved position and
+        synthesize its first sentences into the synthesis cache
+        """
+        file_path = self._next_playlist_file()
+        with self._preload_lock:
+            if file_path is None or self._preload is not None:
+                return
+            preload = self._preload = {"path": file_path, "position": None, "audio": [], "cancelled": False}
+        preload["thread"] = threading.Thread(target=self._preload_worker, args=(preload,), daemon=True)
+        preload["thread"].start()
+
+    def _preload_worker(self, preload):
+        reader = FileService(index_dir=self.file_service.index_dir,
+                             checkpoint_mb=self.file_service.checkpoint_bytes / (1024 * 1024))
+        audio = []
+        try:
+            reader.load_file(preload["path"])
+            position = self._resume_position(preload["path"], reader.get_file_size())
+            for sentence_chunk, _, _ in self.iter_sentence_spans(position, file_service=reader):
+                if len(audio) >= self.PRELOAD_SENTENCES or preload["cancelled"]:
+                    break
+                if sentence_chunk.strip():
+                    audio.extend(self.tts_service.presynthesize(sentence_chunk, preload["path"]))
+            preload["position"] = position
         except Exception as e:
-            print(f"Playback error: {e}")
+            print(f"Preloading {preload['path']} failed: {e}")
         finally:
-            self.is_playing_flag = False
-    
+            reader.close_file()
+            with self._preload_lock:
+                if preload["cancelled"]:
+                    for buffer in audio:
+                        buffer.release()
+                else:
+                    preload["audio"] = audio
+
+    def _advance_playlist(self, session):
+        """
+        Switch to the next playlist file once the current one has been read.
+        Returns the position to continue from, or None at the end of the playlist.
+        """
+        file_path = self._next_playlist_file()
+        if file_path is None:
+            return None
+
+        self._start_preload()  # No-op unless the file was too short to trigger it
+        preload = self._preload
+        if preload is None:
+            return None
+        # Wait for the preload, but give up at once if playback is stopped meanwhile
+        while preload["thread"].is_alive() and not session.cancelled:
+            preload["thread"].join(0.05)
+
+        # The index files and first sentences are ready, so this is quick. UI
+        # readers (text view, search, upcoming sentences) wait on the file
+        # service lock, so they see the old file or the new one, never a mix
+        with self.file_service.lock:
+            if session.cancelled or preload["cancelled"]:
+                return None
+            self.file_service.load_file(file_path)
+            self.playlist_index += 1
+            position = preload["position"]
+            if position is None:
+                position = self._resume_position(file_path, self.file_service.get_file_size())
+        self.tts_service.reset_timing()
+        if self.on_file_changed:
+            self.on_file_changed(file_path, position)
+        return position
+
+    def _release_preloaded_audio(self):
+        """Unpin the pre-synthesized audio once playback of the next file has begun"""
+        with self._preload_lock:
+            preload = self._preload
+            if preload is None or preload["path"] != self.file_service.file_path:
+                return
+            self._preload = None
+        for buffer in preload["audio"]:
+            buffer.release()
+
+    def _discard_preload(self):
+        """Drop a preload that will not be used"""
+        with self._preload_lock:
+            preload = self._preload
+            self._preload = None
+            if preload is None:
+                return
+            preload["cancelled"] = True
+            audio, preload["audio"] = preload["audio"], []
+        for buffer in audio:
+            buffer.release()
+
+    async def play_async(self, start_position=0, lookahead=2):
+        """
+        Read the loaded file aloud from start_position on the running event loop
+        and return the position reached. Synthesis of the next sentences
+        overlaps playback. Cancelling the awaiting task (or pause(), stop() and
+        set_position()) stops immediately; the task is cancelled as usual, and
+        async_position holds the start of the interrupted sentence, which is
+        where reading picks up next time.
+        """
+        if not self.file_service.is_file_loaded():
+            raise ValueError("No file is currently loaded")
+
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        current_file = self.file_service.file_path
+        position = start_position
+        self.tts_service.reset_timing()
+        self._async_tasks[task] = loop
+        speech = self.tts_service.stream(
+            self.iter_sentence_spans(start_position),
+            source_file_path=current_file,
+            lookahead=lookahead
+        )
+        try:
+            async for chunk in speech:
+                position = chunk.byte_start
+                await self.tts_service.play_async(chunk.audio, chunk.unit)
+                position = chunk.byte_end
+                if current_file:
+                    await loop.run_in_executor(None, self.config_service.set_last_position, current_file, position)
+        finally:
+            self.async_position = position
+            self._async_tasks.pop(task, None)
+            # Cancel look-ahead synthesis right away instead of at garbage collection
+            await speech.aclose()
+        return position
+
+    def start_playback_async(self, start_position=0):
+        """Start play_async as a task on the running loop; cancel the task to stop"""
+        return asyncio.ensure_future(self.play_async(start_position))
+
+    def _cancel_async_playback(self):
+        """Cancel running play_async tasks, from their loop's thread or any other"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for task, loop in list(self._async_tasks.items()):
+            if loop is running:
+                task.cancel()
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(task.cancel)
+
     def pause(self):
-        """Pause ongoing playback"""
-        if self.is_playing_flag:
-            self.stop_playback_event.set()
-            
-            if self.playback_thread and self.playback_thread.is_alive():
-                self.playback_thread.join(timeout=2)
-            
-            self.is_playing_flag = False
+        """Pause ongoing playback (the sentence playing right now is cut short)"""
+        if self.scheduler.is_active():
+            self.scheduler.pause()
+        self._cancel_async_playback()
+        self._discard_preload()
+        self.config_service.flush_positions()
     
+    def jump_to(self, position, start_playing=True):
+        """Move the reading position (e.g. to a chapter) and optionally start reading there"""
+        self.set_position(position)
+        if start_playing:
+            self.start_playback(position, seeking=True)
+
     def stop(self):
         """Stop ongoing playback completely"""
-        self.pause()
-        # Reset the stop event for future playback
-        self.stop_playback_event.clear()
+        self.scheduler.stop()
+        self._cancel_async_playback()
+        self._discard_preload()
+        self.config_service.flush_positions()
     
     def get_current_position(self):
         """Get the current reading position"""
@@ -123,7 +391,7 @@ class MainController:
             raise ValueError("No file is currently loaded")
         
         # Pause current playback if active
-        if self.is_playing_flag:
+        if self.is_playing():
             self.pause()
         
         # Update position in config service
@@ -1,7 +1,11 @@
 # Main application entry point for the Text-to-Speech Reader Application
+import time
+LAUNCH_STARTED = time.monotonic()  # For measuring launch-to-audio time
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
+import queue
 import json
 import os
 from pathlib import Path
@@ -10,10 +14,19 @@ from pathlib import Path
 from services.file_service import FileService
 from services.tts_service import TTSService
 from services.config_service import ConfigService
+from services.chapter_service import ChapterService
+from services.search_service import SearchService
+from services.session_service import SessionService
+from services.library_service import create_library_service
+from services import playback_scheduler
 from controllers.main_controller import MainController
+from views.text_viewer import VirtualTextView
+from utils.profiling import PlaybackProfiler, profiling_enabled
 
 
 class TTSApp:
+    HIGHLIGHT_INTERVAL_MS = 50  # UI frame interval for sentence highlighting
+
     def __init__(self, root):
         self.root = root
         self.root.title("Text-to-Speech Reader")
@@ -21,21 +34,79 @@ class TTSApp:
         
         # Initialize services
         self.config_service = ConfigService()
-        self.file_service = FileService()
-        self.tts_service = TTSService()
+        file_settings = self.config_service.get_file_settings()
+        self.file_service = FileService(
+            index_dir=self.config_service.config_dir / "indexes",
+            checkpoint_mb=file_settings.get('compressed_checkpoint_mb', 1)
+        )
+        audio_settings = self.config_service.get_audio_settings()
+        self.tts_service = TTSService(
+            memory_budget_mb=audio_settings.get('memory_budget_mb', 64),
+            cache_mb=audio_settings.get('cache_mb', 32)
+        )
+        self.tts_service.configure_audio(**audio_settings)
+        self.tts_service.configure_resources(**self.config_service.get_resource_settings())
+        self.tts_service.configure_voices(**self.config_service.get_voice_settings())
+
+        chapter_settings = self.config_service.get_chapter_settings()
+        self.chapter_service = ChapterService(
+            self.file_service,
+            index_dir=self.config_service.config_dir / "indexes",
+            patterns=chapter_settings.get('patterns', []),
+            layout_heuristics=chapter_settings.get('layout_heuristics', True)
+        )
+        self.chapters = []
+        self.search_service = SearchService(self.file_service)
+        self._search_cancel = None
+        self.library_service = create_library_service(self.config_service)
+        self._library_scan = None  # Thread updating the catalog
+
+        # Opt-in profiling of the playback path (config "profiling" or TEXT_READER_PROFILE=1)
+        profiler = None
+        profiling_settings = self.config_service.get_profiling_settings()
+        if profiling_enabled(profiling_settings):
+            profiler = PlaybackProfiler(
+                output_dir=profiling_settings.get('output_dir') or self.config_service.config_dir / "profiles",
+                max_sessions=profiling_settings.get('max_sessions', 10),
+                trace_allocations=profiling_settings.get('trace_allocations', True)
+            )
+            self.tts_service.profiler = profiler
 
         # Initialize controller
         self.controller = MainController(
             self.file_service,
             self.tts_service,
-            self.config_service
+            self.config_service,
+            profiler=profiler
         )
+        self.controller.on_file_changed = self._on_playlist_file_changed
+        self.controller.scheduler.add_listener(self._on_playback_state_changed)
         
+        self._highlighted_unit = None
+
         # Setup UI
         self.setup_ui()
         
         # Load saved configuration
         self.load_configuration()
+
+        # Continue the last session (needs the voice settings loaded above)
+        session_settings = self.config_service.get_session_settings()
+        self.session_service = None
+        self._restored_chunks = 0
+        self._launch_measured = True  # Only a resumed session has a launch-to-audio time
+        if session_settings.get('enabled', True):
+            self.session_service = SessionService(
+                self.config_service.config_dir / "session",
+                max_chunks=session_settings.get('snapshot_chunks', 3)
+            )
+            self.restore_session(resume_playback=session_settings.get('resume_playback', True))
+            self._snapshot_interval_ms = int(session_settings.get('snapshot_interval_s', 30) * 1000)
+            self._snapshot_thread = None
+            self.root.after(self._snapshot_interval_ms, self._snapshot_periodically)
+
+        # Start the highlighting frame loop
+        self.root.after(self.HIGHLIGHT_INTERVAL_MS, self.update_highlight)
     
     def setup_ui(self):
         # Create main frame
@@ -147,11 +218,40 @@ class TTSApp:
         
         self.play_button = ttk.Button(ctrl_frame, text="Play", command=self.toggle_playback)
         self.play_button.grid(row=0, column=0, padx=5)
+
+        self.chapters_button = ttk.Button(ctrl_frame, text="Chapters", command=self.show_chapters)
+        self.chapters_button.grid(row=0, column=1, padx=5)
+
+        self.search_button = ttk.Button(ctrl_frame, text="Search", command=self.show_search)
+        self.search_button.grid(row=0, column=2, padx=5)
+
+        self.playlist_button = ttk.Button(ctrl_frame, text="Playlist", command=self.select_playlist)
+        self.playlist_button.grid(row=0, column=3, padx=5)
+
+        self.library_button = ttk.Button(ctrl_frame, text="Library", command=self.show_library)
+        self.library_button.grid(row=0, column=4, padx=5)
+
+        # Keep reading as the file grows (logs, live transcripts)
+        self.follow_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            ctrl_frame, text="Follow", variable=self.follow_var,
+            command=lambda: self.controller.set_follow_mode(self.follow_var.get())
+        ).grid(row=0, column=5, padx=5)
+        
+        # Text view showing only a window of the file around the reading position
+        text_frame = ttk.LabelFrame(main_frame, text="Text", padding="5")
+        text_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=5)
+        text_frame.columnconfigure(0, weight=1)
+        text_frame.rowconfigure(0, weight=1)
+        main_frame.rowconfigure(4, weight=1)
+
+        self.text_view = VirtualTextView(text_frame, self.file_service, on_position_selected=self.on_text_clicked)
+        self.text_view.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Status bar
         self.status_var = tk.StringVar(value="Ready")
         status_bar = ttk.Label(main_frame, textvariable=self.status_var, relief=tk.SUNKEN)
-        status_bar.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        status_bar.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
     
     def load_configuration(self):
         """Load saved configuration"""
@@ -189,33 +289,424 @@ class TTSApp:
         }
         self.config_service.save_config(config)
     
+    def restore_session(self, resume_playback=True):
+        """Reopen the last session's file at its exact position, with its next sentences already synthesized"""
+        snapshot = self.session_service.load()
+        if snapshot is None or not snapshot.get("file_path"):
+            return
+        try:
+            self._restored_chunks = self.session_service.restore_audio(self.tts_service, snapshot)
+            if snapshot["playlist"]:
+                self.controller.set_playlist(snapshot["playlist"], max(0, snapshot["playlist_index"]))
+            file_path = snapshot["file_path"]
+            self.controller.load_file(file_path)
+            self._show_loaded_file(file_path, snapshot["position"])
+            if snapshot["playing"] and resume_playback:
+                self._launch_measured = False
+                self.controller.start_playback(snapshot["position"])
+        except Exception as e:
+            print(f"Could not restore the last session: {e}")
+
+    def _record_launch(self):
+        """Log how long this launch took to start speaking (warm when chunks were restored)"""
+        seconds = time.monotonic() - LAUNCH_STARTED
+        kind = f"warm, {self._restored_chunks} chunks restored" if self._restored_chunks else "cold"
+        print(f"Launch to audio: {seconds:.2f}s ({kind})")
+        try:
+            self.session_service.record_launch(seconds, self._restored_chunks)
+        except OSError as e:
+            print(f"Could not record launch time: {e}")
+
+    def save_session(self, playing=None, synthesize=False):
+        """Write a session snapshot now"""
+        if self.session_service is None:
+            return
+        try:
+            self.session_service.save(self.controller, playing=playing, synthesize=synthesize)
+        except Exception as e:
+            print(f"Could not save the session: {e}")
+
+    def _snapshot_periodically(self):
+        """Timer: snapshot the session in the background while reading"""
+        if self.controller.is_playing() and (self._snapshot_thread is None or not self._snapshot_thread.is_alive()):
+            self._snapshot_thread = threading.Thread(target=self.save_session, kwargs={"synthesize": True},
+                                                     daemon=True)
+            self._snapshot_thread.start()
+        self.root.after(self._snapshot_interval_ms, self._snapshot_periodically)
+
     def select_file(self):
         """Open file dialog to select a text file"""
         file_path = filedialog.askopenfilename(
             title="Select a text file",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+            filetypes=[
+                ("Text files", "*.txt"),
+                ("Documents", "*.epub *.html *.htm *.xhtml *.md *.markdown"),
+                ("Compressed text", "*.txt.gz *.gz *.bz2 *.zst"),
+                ("All files", "*.*")
+            ]
         )
         
         if file_path:
             try:
                 self.controller.load_file(file_path)
-                self.file_path_var.set(file_path)
-                
-                # Update position slider range based on file size
-                file_size = self.file_service.get_file_size()
-                self.position_slider.configure(to=file_size)
-                
-                # Restore last reading position if available
-                last_pos = self.config_service.get_last_position(file_path)
-                if last_pos is not None:
-                    self.position_var.set(last_pos)
-                    self.position_entry_var.set(str(last_pos))
-                    self.on_position_change(last_pos)
-                
-                self.status_var.set(f"Loaded: {os.path.basename(file_path)}")
+                self._show_loaded_file(file_path, self.config_service.get_last_position(file_path))
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load file: {str(e)}")
+
+    def _show_loaded_file(self, file_path, last_pos):
+        """Refresh the UI for a newly loaded file"""
+        self.file_path_var.set(file_path)
+
+        # Update position slider range based on file size
+        file_size = self.file_service.get_file_size()
+        self.position_slider.configure(to=file_size)
+
+        # Restore last reading position if available
+        if last_pos is not None:
+            self.position_var.set(last_pos)
+            self.position_entry_var.set(str(last_pos))
+            self.on_position_change(last_pos)
+
+        self.text_view.show_position(last_pos or 0)
+
+        # Build (or load) the chapter index without blocking the UI
+        self.chapters = []
+        threading.Thread(target=self._index_chapters, args=(file_path,), daemon=True).start()
+
+        self.status_var.set(f"Loaded: {os.path.basename(file_path)}")
+
+    def select_playlist(self):
+        """Pick several files and read them back to back"""
+        file_paths = filedialog.askopenfilenames(
+            title="Select files to play in order",
+            filetypes=[
+                ("Text files", "*.txt"),
+                ("Documents", "*.epub *.html *.htm *.xhtml *.md *.markdown"),
+                ("Compressed text", "*.txt.gz *.gz *.bz2 *.zst"),
+                ("All files", "*.*")
+            ]
+        )
+        if not file_paths:
+            return
+        try:
+            self.controller.set_playlist(sorted(file_paths))
+            self.controller.start_playlist(0)
+            self.play_button.config(text="Pause")
+            self.status_var.set(f"Playing 1 of {len(file_paths)}: {os.path.basename(self.file_service.file_path)}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to start playlist: {str(e)}")
+
+    def _on_playback_state_changed(self, old_state, new_state):
+        """Playback state changed (called from whichever thread changed it)"""
+        if new_state == playback_scheduler.PLAYING and not self._launch_measured:
+            self._launch_measured = True
+            self._record_launch()
+        self.root.after(0, self._show_playback_state, new_state)
+
+    def _show_playback_state(self, state):
+        if state != self.controller.get_state():
+            return  # Superseded by a later transition
+        if state in playback_scheduler.ACTIVE_STATES:
+            self.play_button.config(text="Pause")
+            if state == playback_scheduler.BUFFERING:
+                self.status_var.set("Buffering...")
+            elif state == playback_scheduler.SEEKING:
+                self.status_var.set("Seeking...")
+            elif self.controller.playlist:
+                self.status_var.set(f"Playing {self.controller.playlist_index + 1} of {len(self.controller.playlist)}: "
+                                    f"{os.path.basename(self.file_service.file_path)}")
+            else:
+                self.status_var.set("Playing...")
+        else:
+            self.play_button.config(text="Play")
+
+    def _on_playlist_file_changed(self, file_path, position):
+        """Playback moved on to another playlist file (called from the playback thread)"""
+        self.root.after(0, self._show_playlist_file, file_path, position)
+
+    def _show_playlist_file(self, file_path, position):
+        self._highlighted_unit = None
+        self._show_loaded_file(file_path, position)
+        index = self.controller.playlist_index + 1
+        self.status_var.set(f"Playing {index} of {len(self.controller.playlist)}: {os.path.basename(file_path)}")
     
+    def _index_chapters(self, file_path):
+        """Background thread: scan the file for chapter headings"""
+        try:
+            chapters = self.chapter_service.get_chapters()
+        except Exception as e:
+            print(f"Chapter indexing failed: {e}")
+            return
+        self.root.after(0, self._on_chapters_ready, file_path, chapters)
+
+    def _on_chapters_ready(self, file_path, chapters):
+        """Store the chapter list if the file is still the one loaded"""
+        if file_path == self.file_service.file_path:
+            self.chapters = chapters
+            self.status_var.set(f"Loaded: {os.path.basename(file_path)} ({len(chapters)} chapters)")
+
+    def show_chapters(self):
+        """Open the table of contents for the loaded file"""
+        if not self.file_service.is_file_loaded():
+            messagebox.showwarning("No File", "Please select a text file first")
+            return
+        if not self.chapters:
+            messagebox.showinfo("Chapters", "No chapters found (yet) in this file")
+            return
+
+        toc = tk.Toplevel(self.root)
+        toc.title("Chapters")
+        toc.geometry("400x500")
+        toc.columnconfigure(0, weight=1)
+        toc.rowconfigure(0, weight=1)
+
+        listbox = tk.Listbox(toc, activestyle=tk.DOTBOX)
+        listbox.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(toc, orient=tk.VERTICAL, command=listbox.yview)
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        listbox.configure(yscrollcommand=scrollbar.set)
+
+        for chapter in self.chapters:
+            listbox.insert(tk.END, chapter["title"])
+
+        # Highlight the chapter we are currently in
+        current = self.chapter_service.chapter_at(self.position_var.get())
+        if current >= 0:
+            listbox.selection_set(current)
+            listbox.see(current)
+
+        def on_select(event):
+            selection = listbox.curselection()
+            if selection:
+                self.jump_to_position(self.chapters[selection[0]]["offset"])
+
+        listbox.bind("<Double-Button-1>", on_select)
+        listbox.bind("<Return>", on_select)
+
+    def show_search(self):
+        """Open the search window; hits stream in while the file is scanned"""
+        if not self.file_service.is_file_loaded():
+            messagebox.showwarning("No File", "Please select a text file first")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Search")
+        window.geometry("500x500")
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(1, weight=1)
+
+        query_var = tk.StringVar()
+        regex_var = tk.BooleanVar(value=False)
+        status_var = tk.StringVar(value="")
+        hits = []
+        current = {"queue": None}  # Queue of the search whose hits are shown
+
+        query_frame = ttk.Frame(window, padding="5")
+        query_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        query_frame.columnconfigure(0, weight=1)
+        query_entry = ttk.Entry(query_frame, textvariable=query_var)
+        query_entry.grid(row=0, column=0, sticky=(tk.W, tk.E), padx=5)
+        ttk.Checkbutton(query_frame, text="Regex", variable=regex_var).grid(row=0, column=1, padx=5)
+
+        listbox = tk.Listbox(window)
+        listbox.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=listbox.yview)
+        scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        listbox.configure(yscrollcommand=scrollbar.set)
+        ttk.Label(window, textvariable=status_var).grid(row=2, column=0, columnspan=2, sticky=tk.W)
+
+        def drain_hits(hit_queue):
+            # Move hits found by the worker thread into the list, a batch per frame
+            if not window.winfo_exists() or current["queue"] is not hit_queue:
+                return
+            for _ in range(500):
+                try:
+                    item = hit_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, tuple) and item and item[0] == "done":
+                    _, count, error = item
+                    status_var.set(f"Error: {error}" if error else f"{count} hits")
+                    return
+                hits.append(item)
+                listbox.insert(tk.END, item.snippet)
+            status_var.set(f"Searching... {len(hits)} hits")
+            window.after(30, drain_hits, hit_queue)
+
+        def run_search(event=None):
+            if self._search_cancel is not None:
+                self._search_cancel.set()
+            hits.clear()
+            listbox.delete(0, tk.END)
+            try:
+                self.search_service.compile_query(query_var.get(), regex_var.get())
+            except ValueError as e:
+                status_var.set(str(e))
+                return
+            hit_queue = queue.Queue()
+            current["queue"] = hit_queue
+            self._search_cancel = self.search_service.search_async(
+                query_var.get(),
+                on_hit=hit_queue.put,
+                on_done=lambda count, error: hit_queue.put(("done", count, error)),
+                regex=regex_var.get()
+            )
+            drain_hits(hit_queue)
+
+        def on_select(event):
+            selection = listbox.curselection()
+            if selection:
+                hit = hits[selection[0]]
+                self.jump_to_position(self.file_service.find_sentence_start(hit.offset))
+
+        def on_close():
+            if self._search_cancel is not None:
+                self._search_cancel.set()
+            window.destroy()
+
+        ttk.Button(query_frame, text="Find", command=run_search).grid(row=0, column=2, padx=5)
+        query_entry.bind("<Return>", run_search)
+        listbox.bind("<Double-Button-1>", on_select)
+        listbox.bind("<Return>", on_select)
+        window.protocol("WM_DELETE_WINDOW", on_close)
+        query_entry.focus_set()
+
+    def show_library(self):
+        """
+        Open the library view. It is filled from the catalog straight away;
+        the catalog is then brought up to date in the background and the
+        view refreshed if anything changed.
+        """
+        window = tk.Toplevel(self.root)
+        window.title("Library")
+        window.geometry("800x500")
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(1, weight=1)
+
+        status_var = tk.StringVar(value="")
+        columns = ("folder", "size", "words", "time", "read")
+        headings = {"#0": "File", "folder": "Folder", "size": "Size", "words": "Words",
+                    "time": "Reading time", "read": "Read"}
+
+        button_frame = ttk.Frame(window, padding="5")
+        button_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E))
+
+        tree = ttk.Treeview(window, columns=columns)
+        for column, title in headings.items():
+            tree.heading(column, text=title)
+        tree.column("#0", width=220)
+        tree.column("folder", width=220)
+        for column in ("size", "words", "time", "read"):
+            tree.column(column, width=80, anchor=tk.E)
+        tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
+        scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        tree.configure(yscrollcommand=scrollbar.set)
+        ttk.Label(window, textvariable=status_var).grid(row=2, column=0, columnspan=2, sticky=tk.W)
+        current = {"fill": None}  # Entries being inserted; a refresh abandons older ones
+
+        def show_entries():
+            # Insert a batch per frame so tens of thousands of rows never block the UI
+            tree.delete(*tree.get_children())
+            entries = self.library_service.entries()
+            current["fill"] = entries
+
+            def insert_batch(start):
+                if not window.winfo_exists() or current["fill"] is not entries:
+                    return
+                for entry in entries[start:start + 1000]:
+                    folder, name = os.path.split(entry["path"])
+                    if entry["error"]:
+                        values = (folder, f"{entry['size'] / 1024:.0f} KB", "", "", entry["error"])
+                    else:
+                        values = (folder, f"{entry['size'] / 1024:.0f} KB", entry["words"],
+                                  f"{entry['reading_seconds'] // 3600}:{entry['reading_seconds'] // 60 % 60:02d}",
+                                  f"{entry['progress'] * 100:.0f}%")
+                    tree.insert("", tk.END, iid=entry["path"], text=name, values=values)
+                if start + 1000 < len(entries):
+                    window.after(1, insert_batch, start + 1000)
+
+            insert_batch(0)
+            status_var.set(f"{len(entries)} files")
+
+        def rescan():
+            if self._library_scan is not None and self._library_scan.is_alive():
+                return
+            directories = self.config_service.get_library_settings().get('dirs', [])
+            if not directories:
+                status_var.set("Add a folder to build the library")
+                return
+            results = queue.Queue()
+            status_var.set("Updating the library...")
+
+            def scan():
+                try:
+                    results.put(self.library_service.scan(
+                        directories,
+                        on_progress=lambda done, total: results.put(("progress", done, total))
+                    ))
+                except Exception as e:
+                    results.put(e)
+
+            def drain():
+                if not window.winfo_exists():
+                    return
+                while True:
+                    try:
+                        item = results.get_nowait()
+                    except queue.Empty:
+                        window.after(100, drain)
+                        return
+                    if isinstance(item, tuple):
+                        status_var.set(f"Updating the library... {item[1]}/{item[2]} files read")
+                    elif isinstance(item, Exception):
+                        status_var.set(f"Error: {item}")
+                        return
+                    else:
+                        if item["read"] or item["removed"] or item["positions_updated"]:
+                            show_entries()
+                        status_var.set(f"{item['files']} files ({item['read']} new or changed)")
+                        return
+
+            self._library_scan = threading.Thread(target=scan, daemon=True)
+            self._library_scan.start()
+            drain()
+
+        def add_folder():
+            directory = filedialog.askdirectory(title="Add a folder to the library", parent=window)
+            if directory:
+                self.config_service.add_library_dir(directory)
+                rescan()
+
+        def on_select(event):
+            selection = tree.selection()
+            if not selection:
+                return
+            file_path = selection[0]
+            try:
+                self.controller.load_file(file_path)
+                self._show_loaded_file(file_path, self.config_service.get_last_position(file_path))
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to load file: {str(e)}", parent=window)
+
+        ttk.Button(button_frame, text="Add Folder", command=add_folder).grid(row=0, column=0, padx=5)
+        ttk.Button(button_frame, text="Rescan", command=rescan).grid(row=0, column=1, padx=5)
+        tree.bind("<Double-Button-1>", on_select)
+        tree.bind("<Return>", on_select)
+
+        show_entries()
+        rescan()
+
+    def jump_to_position(self, position):
+        """Move the reading position to a byte offset and start reading from there"""
+        self.position_var.set(position)
+        self.on_position_change(position)
+        self.text_view.show_position(position)
+        self._highlighted_unit = None
+        self.controller.jump_to(position)
+        self.play_button.config(text="Pause")
+        self.status_var.set("Playing...")
+
     def on_position_change(self, value):
         """Handle position slider change"""
         pos = int(float(value))
@@ -270,12 +761,42 @@ class TTSApp:
             voice_model=self.voice_model_var.get()
         )
     
+    def on_text_clicked(self, position):
+        """Move the reading position to a line clicked in the text view"""
+        self.position_var.set(position)
+        self.on_position_change(position)
+        self._highlighted_unit = None
+
+        # Jump immediately if we are already reading
+        if self.controller.is_playing():
+            self.controller.start_playback(position, seeking=True)
+
+    def update_highlight(self):
+        """Frame loop: highlight the sentence that is currently audible"""
+        try:
+            if self.controller.is_playing():
+                # O(1) lookup in the timing map built during synthesis
+                unit = self.tts_service.get_current_unit()
+                if unit is not None and unit != self._highlighted_unit:
+                    self.text_view.highlight(unit.byte_start, unit.byte_end)
+                    self._highlighted_unit = unit
+                    self.position_label.config(text=f"Position: {unit.byte_start}")
+                # A followed file grows while it is read
+                if self.controller.follow_mode:
+                    self.position_slider.configure(to=self.file_service.get_file_size())
+        finally:
+            self.root.after(self.HIGHLIGHT_INTERVAL_MS, self.update_highlight)
+
     def toggle_playback(self):
         """Toggle between play and pause states"""
         if self.controller.is_playing():
             self.controller.pause()
             self.play_button.config(text="Play")
-            self.status_var.set("Paused")
+            report = self.tts_service.get_silence_report(self.file_service.file_path)
+            if report["saved_seconds"] > 0:
+                self.status_var.set(f"Paused (silence trimming saved {report['saved_seconds']:.1f}s)")
+            else:
+                self.status_var.set("Paused")
         else:
             if self.file_service.is_file_loaded():
                 # Start playback from current position
@@ -294,6 +815,10 @@ def main():
     # Save configuration when closing
     def on_closing():
         app.save_configuration()
+        app.save_session(playing=app.controller.is_playing())
+        app.controller.pause()
+        app.tts_service.scheduler.close()
+        app.tts_service.close_voices()
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -0,0 +1,332 @@
+# Streaming server for listening to any file and offset over HTTP on the local network
+import asyncio
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+# Add the src directory to the path to enable imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.file_service import FileService
+from services.tts_service import TTSService
+from services.config_service import ConfigService
+from utils.text_processing import split_text_into_spans, sanitize_for_tts
+from utils.wav_io import wav_header
+
+
+# WAV data size announced for a stream whose length is not known up front
+STREAMING_DATA_SIZE = 0xFFFFFFFF - 36
+
+
+class AudioStreamServer:
+    """
+    Minimal asyncio HTTP server that streams synthesized speech as WAV.
+
+    GET /stream?file=<path>[&offset=<byte>][&save=1]
+        Streams audio from offset (or the saved position) to the end of the file.
+        With save=1 the position store is updated as audio is sent.
+    GET /stats
+        Buffer pool, synthesis cache, CPU cost and listener statistics as JSON.
+
+    All listeners share the TTSService synthesis cache and one worker pool.
+    Identical chunks requested at the same time are synthesized once, and
+    each listener only synthesizes lookahead_chunks ahead of what its socket
+    has accepted, so a slow client stalls its own producer instead of
+    growing memory.
+    """
+
+    def __init__(self, tts_service, config_service, host="0.0.0.0", port=8765, library_dirs=None,
+                 workers=2, lookahead_chunks=4, index_dir="config/indexes"):
+        self.tts_service = tts_service
+        self.config_service = config_service
+        self.host = host
+        self.port = port
+        self.library_dirs = [Path(directory).resolve() for directory in (library_dirs or [])]
+        self.lookahead_chunks = max(1, lookahead_chunks)
+        self.index_dir = index_dir
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="synthesis")
+        self._inflight = {}  # cache key -> Future of the synthesis running for it
+        self._listeners = 0
+        self._deduplicated = 0
+        self._server = None
+
+    async def start(self):
+        """Start accepting connections"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        return self._server
+
+    async def serve_forever(self):
+        """Start the server and run until cancelled"""
+        server = await self.start()
+        print(f"Streaming server listening on http://{self.host}:{self.port}/stream?file=<path>")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """Stop accepting connections and shut down the worker pool"""
+        if self._server is not None:
+            self._server.close()
+        self._executor.shutdown(wait=False)
+        self.config_service.flush_positions()
+
+    def resolve_file(self, requested_path):
+        """
+        Map a requested path to a readable file.
+        Only files inside library_dirs are served; without library_dirs, only
+        files the reader has opened before (those in the position store).
+        """
+        path = Path(requested_path).resolve()
+        if self.library_dirs:
+            allowed = any(directory == path or directory in path.parents for directory in self.library_dirs)
+        else:
+            allowed = self.config_service.get_last_position(path) is not None
+        if not allowed or not path.is_file():
+            raise PermissionError(f"File is not available for streaming: {requested_path}")
+        return path
+
+    async def _handle_client(self, reader, writer):
+        """Parse one HTTP request and dispatch it"""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=10)
+            while True:
+                header = await asyncio.wait_for(reader.readline(), timeout=10)
+                if header in (b'\r\n', b'\n', b''):
+                    break
+
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            url = urlsplit(target)
+            params = parse_qs(url.query)
+
+            if method != 'GET':
+                await self._send_response(writer, 405, "text/plain", b"Only GET is supported\n")
+            elif url.path == '/stream':
+                await self._stream(writer, params)
+            elif url.path == '/stats':
+                body = json.dumps(self.stats(), indent=2).encode('utf-8')
+                await self._send_response(writer, 200, "application/json", body)
+            else:
+                await self._send_response(writer, 404, "text/plain", b"Use /stream?file=<path>&offset=<byte>\n")
+        except (asyncio.TimeoutError, ConnectionError, ValueError):
+            pass
+        except Exception as e:
+            # Never leave an unhandled task exception behind; the client just gets cut off
+            print(f"Streaming request failed: {e}")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _send_response(self, writer, status, content_type, body):
+        reasons = {200: "OK", 204: "No Content", 400: "Bad Request", 403: "Forbidden",
+                   404: "Not Found", 405: "Method Not Allowed", 415: "Unsupported Media Type",
+                   500: "Internal Server Error"}
+        writer.write(
+            f"HTTP/1.1 {status} {reasons.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+
+    async def _stream(self, writer, params):
+        """Stream audio for a file from an offset until the end or disconnect"""
+        try:
+            file_path = self.resolve_file(params['file'][0])
+            offset = params.get('offset', [None])[0]
+            offset = int(offset) if offset is not None else (self.config_service.get_last_position(file_path) or 0)
+        except (KeyError, ValueError):
+            await self._send_response(writer, 400, "text/plain", b"Missing or invalid file/offset\n")
+            return
+        except PermissionError as e:
+            await self._send_response(writer, 403, "text/plain", f"{e}\n".encode('utf-8'))
+            return
+        save_position = params.get('save', ['0'])[0] == '1'
+
+        loop = asyncio.get_running_loop()
+        file_service = FileService(index_dir=self.index_dir)
+        try:
+            await loop.run_in_executor(None, file_service.load_file, str(file_path))
+        except UnicodeError as e:
+            file_service.close_file()
+            await self._send_response(writer, 415, "text/plain", f"File is not readable text: {e}\n".encode('utf-8'))
+            return
+        except Exception as e:
+            # Unreadable file, broken compressed stream or document
+            file_service.close_file()
+            await self._send_response(writer, 500, "text/plain", f"Could not open file: {e}\n".encode('utf-8'))
+            return
+
+        # Just-in-time mode sizes the queue from the measured synthesis speed
+        queue = asyncio.Queue(maxsize=self.tts_service.resource_policy.lookahead(self.lookahead_chunks))
+        producer = asyncio.create_task(self._produce(file_service, offset, queue))
+        self._listeners += 1
+        headers_sent = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    if not headers_sent:
+                        await self._send_response(writer, 500, "text/plain", f"{item}\n".encode('utf-8'))
+                    return
+
+                buffer, span_end = item
+                try:
+                    if not headers_sent:
+                        writer.write(
+                            b"HTTP/1.1 200 OK\r\nContent-Type: audio/wav\r\n"
+                            b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n" +
+                            wav_header(buffer.sample_rate, buffer.channels, 2, STREAMING_DATA_SIZE)
+                        )
+                        headers_sent = True
+                        gap = bytes(int(buffer.sample_rate * self.tts_service.sentence_gap_ms / 1000)
+                                    * buffer.channels * 2)
+                    # A copy: the transport may keep what it is given queued past drain(),
+                    # while the pooled block is handed out again as soon as it is released
+                    writer.write(bytes(buffer.data))
+                finally:
+                    buffer.release()
+                if self.tts_service.trim_silence:
+                    writer.write(gap)
+
+                # Backpressure: wait until the client has taken the data
+                await writer.drain()
+
+                if save_position:
+                    await loop.run_in_executor(None, self.config_service.set_last_position, file_path, span_end)
+
+            if not headers_sent:
+                await self._send_response(writer, 204, "text/plain", b"")
+        finally:
+            self._listeners -= 1
+            producer.cancel()
+            try:
+                await producer
+            except (asyncio.CancelledError, Exception):
+                pass
+            # Return audio that was synthesized but never sent
+            while not queue.empty():
+                item = queue.get_nowait()
+                if isinstance(item, tuple):
+                    item[0].release()
+            file_service.close_file()
+
+    async def _produce(self, file_service, position, queue):
+        """Synthesize sentences from position onwards into the listener's queue"""
+        try:
+            chunk_size = 4096
+            file_size = file_service.get_file_size()
+            while position < file_size:
+                text, chunk_start, chunk_end = file_service.read_text_window(position, chunk_size)
+                if not text:
+                    break
+
+                spans = split_text_into_spans(text, base_offset=chunk_start)
+                if chunk_end < file_size and len(spans) > 1:
+                    spans = spans[:-1]  # The last sentence may continue in the next chunk
+
+                for sentence, _, span_end in spans:
+                    if sentence.strip():
+                        buffer = await self._synthesize(sanitize_for_tts(sentence))
+                        try:
+                            await queue.put((buffer, span_end))
+                        except asyncio.CancelledError:
+                            buffer.release()
+                            raise
+                    position = span_end
+            await queue.put(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+
+    async def _synthesize(self, text):
+        """Get audio for a chunk, sharing one synthesis among concurrent requests"""
+        key = self.tts_service.cache_key(text)
+        loop = asyncio.get_running_loop()
+        cached = self.tts_service.synthesis_cache.get(key)
+        if cached is not None:
+            if self.tts_service.matches_rate(cached):
+                return cached
+            # Made at an earlier rate: let prepare_audio stretch it (and queue resynthesis)
+            cached.release()
+            return await loop.run_in_executor(self._executor, self.tts_service.prepare_audio, text)
+
+        future = self._inflight.get(key)
+        if future is not None:
+            # Someone is already synthesizing this chunk; wait and take it from the cache
+            self._deduplicated += 1
+            await asyncio.shield(future)
+            return await loop.run_in_executor(self._executor, self.tts_service.prepare_audio, text)
+
+        future = loop.run_in_executor(self._executor, self.tts_service.prepare_audio, text)
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # The listener left; release the audio once synthesis finishes
+            future.add_done_callback(_release_result)
+            raise
+
+    def stats(self):
+        """Server, buffer pool and cache statistics"""
+        return {
+            "listeners": self._listeners,
+            "inflight_syntheses": len(self._inflight),
+            "deduplicated_requests": self._deduplicated,
+            "audio": self.tts_service.get_audio_memory_stats(),
+            "cpu": self.tts_service.get_cpu_report(),
+        }
+
+
+def _release_result(future):
+    """Done-callback that releases audio nobody is waiting for anymore"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().release()
+
+
+def run_server(config_file_path="config/app_config.json", host=None, port=None):
+    """Build the services from the configuration and serve until interrupted"""
+    config_service = ConfigService(config_file_path)
+    server_settings = config_service.get_server_settings()
+    audio_settings = config_service.get_audio_settings()
+    params = config_service.get_tts_params()
+
+    tts_service = TTSService(
+        memory_budget_mb=audio_settings.get('memory_budget_mb', 64),
+        cache_mb=audio_settings.get('cache_mb', 32),
+        init_audio=False
+    )
+    tts_service.configure_audio(**audio_settings)
+    tts_service.configure_resources(**config_service.get_resource_settings())
+    tts_service.configure_voices(**config_service.get_voice_settings())
+    tts_service.set_parameters(
+        rate=params.get('rate', 1.0),
+        pitch=params.get('pitch', 1.0),
+        volume=params.get('volume', 1.0),
+        voice_model=params.get('voice_model') or None
+    )
+
+    server = AudioStreamServer(
+        tts_service,
+        config_service,
+        host=host or server_settings.get('host', '0.0.0.0'),
+        port=port or server_settings.get('port', 8765),
+        library_dirs=server_settings.get('library_dirs', []),
+        workers=server_settings.get('workers', 2),
+        lookahead_chunks=server_settings.get('lookahead_chunks', 4),
+        index_dir=config_service.config_dir / "indexes"
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        tts_service.close_voices()
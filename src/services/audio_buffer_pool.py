@@ -0,0 +1,208 @@
+# Audio buffer pool for keeping synthesized PCM audio in a bounded amount of memory
+import threading
+import time
+
+
+class PCMBuffer:
+    """
+    A block of 16-bit PCM audio leased from an AudioBufferPool.
+    The underlying bytearray is reused once the buffer is released, so callers
+    must not keep views into it after calling release().
+    """
+
+    sample_width = 2  # int16
+
+    def __init__(self, pool, block, nbytes, sample_rate, channels):
+        self._pool = pool
+        self._block = block
+        self.nbytes = nbytes
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.speech_rate = None  # Speaking rate the audio was synthesized at, if known
+        self.trimmed_seconds = 0.0  # Edge silence trimmed off after synthesis
+
+    @property
+    def capacity(self):
+        """Size of the underlying block in bytes"""
+        return len(self._block) if self._block is not None else 0
+
+    @property
+    def data(self):
+        """Writable memoryview over the valid PCM bytes"""
+        if self._block is None:
+            raise RuntimeError("PCM buffer has already been released")
+        return memoryview(self._block)[:self.nbytes]
+
+    def samples(self):
+        """Writable int16 view over the valid PCM samples"""
+        return self.data.cast('h')
+
+    @property
+    def num_frames(self):
+        """Number of sample frames (samples per channel)"""
+        return self.nbytes // (self.sample_width * self.channels)
+
+    @property
+    def duration(self):
+        """Duration of the audio in seconds"""
+        if not self.sample_rate:
+            return 0.0
+        return self.num_frames / self.sample_rate
+
+    def resize(self, nbytes):
+        """Change the number of valid bytes without reallocating"""
+        if nbytes < 0 or nbytes > self.capacity:
+            raise ValueError(f"Cannot resize PCM buffer to {nbytes} bytes (capacity {self.capacity})")
+        self.nbytes = nbytes
+
+    def release(self):
+        """Return the underlying block to the pool"""
+        if self._block is not None:
+            block = self._block
+            self._block = None
+            self._pool._return_block(block)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class AudioBufferPool:
+    """
+    Pool of reusable bytearray blocks for PCM audio.
+    All blocks, leased or idle, count against a global memory budget. When the
+    budget is exhausted, acquire() first drops idle blocks and then waits for
+    leased buffers to be released, which gives natural backpressure to any
+    look-ahead or caching built on top of the pool.
+    """
+
+    MIN_BLOCK_SIZE = 64 * 1024  # 64KB, roughly 1.5s of 22kHz mono audio
+
+    def __init__(self, budget_bytes=64 * 1024 * 1024, preallocate_bytes=0):
+        self.budget_bytes = budget_bytes
+        self._free_blocks = {}  # block size -> list of idle bytearrays
+        self._allocated_bytes = 0
+        self._in_use_bytes = 0
+        self._in_use_count = 0
+        self._peak_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._condition = threading.Condition()
+
+        # Preallocate a run of minimum-size blocks to avoid allocations during playback
+        with self._condition:
+            while self._allocated_bytes + self.MIN_BLOCK_SIZE <= min(preallocate_bytes, budget_bytes):
+                self._free_blocks.setdefault(self.MIN_BLOCK_SIZE, []).append(bytearray(self.MIN_BLOCK_SIZE))
+                self._allocated_bytes += self.MIN_BLOCK_SIZE
+            self._peak_bytes = self._allocated_bytes
+
+    def _block_size_for(self, nbytes):
+        """Round a request up to its power-of-two size class"""
+        size = self.MIN_BLOCK_SIZE
+        while size < nbytes:
+            size *= 2
+        return size
+
+    def acquire(self, nbytes, sample_rate=22050, channels=1, timeout=None):
+        """
+        Lease a PCM buffer able to hold nbytes of audio.
+        Blocks until enough budget is available; raises MemoryError if the
+        request can never fit or the timeout expires.
+        """
+        block_size = self._block_size_for(nbytes)
+        if block_size > self.budget_bytes:
+            raise MemoryError(
+                f"Audio chunk of {nbytes} bytes exceeds the audio memory budget of {self.budget_bytes} bytes"
+            )
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                block = self._take_block(block_size)
+                if block is not None:
+                    break
+
+                # Nothing fits right now, wait for a buffer to come back
+                self._waits += 1
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise MemoryError("Timed out waiting for audio memory budget")
+                self._condition.wait(remaining)
+
+            self._in_use_bytes += block_size
+            self._in_use_count += 1
+
+        return PCMBuffer(self, block, nbytes, sample_rate, channels)
+
+    def _take_block(self, block_size):
+        """Reuse an idle block or allocate a new one within the budget (lock held)"""
+        free_list = self._free_blocks.get(block_size)
+        if free_list:
+            self._hits += 1
+            return free_list.pop()
+
+        # Drop idle blocks of other sizes until the new block fits
+        while self._allocated_bytes + block_size > self.budget_bytes:
+            if not self._drop_idle_block():
+                return None
+
+        self._misses += 1
+        self._allocated_bytes += block_size
+        self._peak_bytes = max(self._peak_bytes, self._allocated_bytes)
+        return bytearray(block_size)
+
+    def _drop_idle_block(self):
+        """Free the largest idle block (lock held). Returns False if none are idle"""
+        sizes = [size for size, blocks in self._free_blocks.items() if blocks]
+        if not sizes:
+            return False
+        size = max(sizes)
+        self._free_blocks[size].pop()
+        self._allocated_bytes -= size
+        return True
+
+    def _return_block(self, block):
+        """Put a released block back on its free list"""
+        with self._condition:
+            size = len(block)
+            self._in_use_bytes -= size
+            self._in_use_count -= 1
+            if self._allocated_bytes > self.budget_bytes:
+                # Budget was lowered while the block was leased
+                self._allocated_bytes -= size
+            else:
+                self._free_blocks.setdefault(size, []).append(block)
+            self._condition.notify_all()
+
+    def set_budget(self, budget_bytes):
+        """Change the memory budget, dropping idle blocks that no longer fit"""
+        with self._condition:
+            self.budget_bytes = budget_bytes
+            while self._allocated_bytes > self.budget_bytes and self._drop_idle_block():
+                pass
+            self._condition.notify_all()
+
+    def trim(self):
+        """Release all idle blocks back to the interpreter"""
+        with self._condition:
+            while self._drop_idle_block():
+                pass
+
+    def stats(self):
+        """Get a snapshot of pool usage"""
+        with self._condition:
+            idle_bytes = sum(size * len(blocks) for size, blocks in self._free_blocks.items())
+            return {
+                "budget_bytes": self.budget_bytes,
+                "allocated_bytes": self._allocated_bytes,
+                "in_use_bytes": self._in_use_bytes,
+                "idle_bytes": idle_bytes,
+                "peak_bytes": self._peak_bytes,
+                "buffers_in_use": self._in_use_count,
+                "hits": self._hits,
+                "misses": self._misses,
+                "waits": self._waits,
+            }
@@ -0,0 +1,236 @@
+# Chapter service for detecting headings and keeping a persisted table of contents
+import bisect
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+
+# "Chapter 12", "PART IV", "Book three"; roman numerals only in capitals, since
+# lowercase ones are ordinary words ("mix", "civil", "did")
+_NUMBERED = (
+    r'^\s*(?i:chapter|part|book)\s+([0-9]+|[IVXLCDM]+|(?i:one|two|three|four|five|six|seven|eight|nine|ten'
+    r'|eleven|twelve|thirteen|fourteen|fifteen|sixteen|seventeen|eighteen|nineteen|twenty))'
+)
+
+# Headings recognised out of the box; user patterns from the config are added to these
+DEFAULT_CHAPTER_PATTERNS = [
+    # The number ends the line, or is followed by ":", "." or a dash and an optional title
+    _NUMBERED + r'\s*(?:[:.—–-].*)?$',
+    r'(?i)^\s*(prologue|epilogue|preface|foreword|introduction|afterword)\s*$',
+    r'^\s*第\s*[0-9０-９零〇一二三四五六七八九十百千万两]+\s*[章回节卷部篇集]',
+    r'^\s*(序章|序言|楔子|尾声|后记|番外)',
+]
+
+# A number followed by more words ("Chapter 4 The Return") could also start a
+# hard-wrapped line of prose ("Part I was ..."); it counts only on a line of its
+# own that looks like a heading
+LOOSE_CHAPTER_PATTERN = _NUMBERED + r'\s+\S'
+
+MAX_HEADING_BYTES = 200  # Longer lines (surrounding whitespace included) are never treated as headings
+
+
+class ChapterService:
+    """
+    Scans the loaded file once, as a stream of lines, for chapter headings and
+    stores their byte offsets in an index file next to the configuration.
+    The index is reused until the file's size or mtime (or the patterns) change.
+    """
+
+    def __init__(self, file_service, index_dir="config/indexes", patterns=None, layout_heuristics=True):
+        self.file_service = file_service
+        self.index_dir = Path(index_dir)
+        self.layout_heuristics = layout_heuristics
+        self.patterns = list(DEFAULT_CHAPTER_PATTERNS) + list(patterns or [])
+        # The defaults say where case matters; user patterns ignore case
+        self._compiled = ([re.compile(pattern) for pattern in DEFAULT_CHAPTER_PATTERNS] +
+                          [re.compile(pattern, re.IGNORECASE) for pattern in patterns or []])
+        self._loose = re.compile(LOOSE_CHAPTER_PATTERN)
+        self._chapters = []
+        self._offsets = []
+        self._indexed_path = None
+
+    def _index_path(self, file_path):
+        """Location of the persisted index for a file"""
+        digest = hashlib.sha1(str(Path(file_path).resolve()).encode('utf-8')).hexdigest()
+        return self.index_dir / f"{digest}.chapters.json"
+
+    def _signature(self, file_path):
+        """Values that must match for a persisted index to be reused"""
+        stat = os.stat(file_path)
+        patterns_hash = hashlib.sha1(
+            json.dumps([self.patterns, LOOSE_CHAPTER_PATTERN, self.layout_heuristics]).encode('utf-8')
+        ).hexdigest()
+        return {"file_size": stat.st_size, "mtime": stat.st_mtime, "patterns": patterns_hash}
+
+    def get_chapters(self, rebuild=False):
+        """
+        Get the chapters of the loaded file as a list of {"title", "offset"} dicts,
+        loading the persisted index or scanning the file if needed
+        """
+        file_path = self.file_service.file_path
+        if not file_path:
+            return []
+
+        if not rebuild and self._indexed_path == file_path:
+            return self._chapters
+
+        signature = self._signature(file_path)
+        chapters = None if rebuild else self._load_index(file_path, signature)
+        if chapters is None:
+            chapters = self.scan()
+            self._save_index(file_path, signature, chapters)
+
+        self._set_chapters(file_path, chapters)
+        return self._chapters
+
+    def _set_chapters(self, file_path, chapters):
+        self._chapters = chapters
+        self._offsets = [chapter["offset"] for chapter in chapters]
+        self._indexed_path = file_path
+
+    def _load_index(self, file_path, signature):
+        """Read a persisted index if it is still valid"""
+        index_path = self._index_path(file_path)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (IOError, ValueError):
+            return None
+
+        if any(data.get(key) != value for key, value in signature.items()):
+            return None
+        return data.get("chapters", [])
+
+    def _save_index(self, file_path, signature, chapters):
+        """Persist the index (failures only cost a rescan next time)"""
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            data = dict(signature, file_path=str(Path(file_path).resolve()), chapters=chapters)
+            with open(self._index_path(file_path), 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        except IOError as e:
+            print(f"Could not save chapter index: {e}")
+
+    def iter_lines(self, block_size=1024 * 1024, max_line_bytes=None):
+        """
+        Stream (byte_offset, line_bytes) pairs over the loaded file. Lines
+        longer than max_line_bytes are not held in memory: they are skipped
+        to the next newline and yielded as None (b"" if only whitespace).
+        """
+        position = 0
+        carry = b""  # Start of a line that continues in the next block
+        line_offset = 0  # Where that line (or the overlong line being skipped) starts
+        skipping = False
+        visible = False  # Whether the skipped line has more than whitespace
+        file_size = self.file_service.get_file_size()
+
+        while position < file_size:
+            block = self.file_service.read_bytes(position, block_size)
+            if not block:
+                break
+            if skipping:
+                data, data_start = block, position
+            else:
+                data, data_start = carry + block, position - len(carry)
+            position += len(block)
+
+            line_start = 0
+            if skipping:
+                newline = data.find(b'\n')
+                visible = visible or bool(data[:newline if newline >= 0 else len(data)].strip())
+                if newline < 0:
+                    continue
+                yield line_offset, None if visible else b""
+                skipping = False
+                line_start = newline + 1
+
+            while True:
+                newline = data.find(b'\n', line_start)
+                if newline < 0:
+                    break
+                line = data[line_start:newline]
+                if max_line_bytes is not None and len(line) > max_line_bytes:
+                    line = None if line.strip() else b""
+                yield data_start + line_start, line
+                line_start = newline + 1
+
+            line_offset = data_start + line_start
+            carry = data[line_start:]
+            if max_line_bytes is not None and len(carry) > max_line_bytes:
+                skipping, visible, carry = True, bool(carry.strip()), b""
+
+        if skipping:
+            yield line_offset, None if visible else b""
+        elif carry:
+            yield line_offset, carry
+
+    def scan(self):
+        """One pass over the file, returning detected headings in order"""
+        chapters = []
+        blank_run = 2  # The start of the file counts as a break
+        candidate = None  # Layout heading waiting for a blank line after it
+
+        for offset, raw_line in self.iter_lines(max_line_bytes=MAX_HEADING_BYTES):
+            if raw_line is None:
+                # Too long for a heading: ordinary text
+                candidate = None
+                blank_run = 0
+                continue
+            stripped = raw_line.strip()
+            if not stripped:
+                if candidate is not None:
+                    chapters.append(candidate)
+                    candidate = None
+                blank_run += 1
+                continue
+
+            candidate = None
+            if len(stripped) <= MAX_HEADING_BYTES:
+                title = stripped.decode('utf-8', errors='replace')
+                if self._matches_pattern(title):
+                    chapters.append({"title": title, "offset": offset})
+                elif blank_run >= 1 and self._loose.search(title) and self._looks_like_heading(title):
+                    # Confirmed only if a blank line follows
+                    candidate = {"title": title, "offset": offset}
+                elif self.layout_heuristics and blank_run >= 2 and self._looks_like_heading(title):
+                    # Confirmed only if a blank line follows
+                    candidate = {"title": title, "offset": offset}
+            blank_run = 0
+
+        if candidate is not None:
+            chapters.append(candidate)
+        return chapters
+
+    def _matches_pattern(self, title):
+        return any(pattern.search(title) for pattern in self._compiled)
+
+    @staticmethod
+    def _looks_like_heading(title):
+        """Short, isolated line without sentence punctuation"""
+        if len(title) > 60 or title[-1] in '.,;:!?。，；：！？"”\'':
+            return False
+        words = title.split()
+        if len(words) > 8:
+            return False
+        letters = [c for c in title if c.isalpha()]
+        # Title case or all caps for Latin scripts; any short line for other scripts
+        if letters and all(c.isascii() for c in letters):
+            return title.isupper() or all(word[0].isupper() or not word[0].isalpha() for word in words)
+        return True
+
+    def chapter_at(self, position):
+        """Index of the chapter containing a byte position, or -1 before the first"""
+        self.get_chapters()
+        return bisect.bisect_right(self._offsets, position) - 1
+
+    def chapter_ranges(self):
+        """(title, start, end) byte ranges for each chapter, e.g. to split batch output"""
+        chapters = self.get_chapters()
+        file_size = self.file_service.get_file_size()
+        ranges = []
+        for index, chapter in enumerate(chapters):
+            end = chapters[index + 1]["offset"] if index + 1 < len(chapters) else file_size
+            ranges.append((chapter["title"], chapter["offset"], end))
+        return ranges
@@ -0,0 +1,244 @@
+# Random-access reading of compressed text files (gzip, bz2, zstd)
+import bisect
+import bz2
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+
+try:
+    import zstandard  # Optional: only needed for .zst files
+except ImportError:
+    zstandard = None
+
+
+# Magic numbers at the start of each supported container
+COMPRESSION_MAGIC = [
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'bz2'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+]
+
+
+def detect_compression(file_path):
+    """Get the compression format of a file ('gzip', 'bz2', 'zstd') or None"""
+    try:
+        with open(file_path, 'rb') as f:
+            head = f.read(4)
+    except IOError:
+        return None
+    for magic, name in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_decompressed_stream(file_path, compression):
+    """Open a sequential decompressing stream over a compressed file"""
+    if compression == 'gzip':
+        return gzip.open(file_path, 'rb')
+    if compression == 'bz2':
+        return bz2.open(file_path, 'rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Reading .zst files requires the 'zstandard' package (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(open(file_path, 'rb'), closefd=True)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+class CompressedIndex:
+    """
+    Sparse seek-point index over a compressed file.
+    gzip/bz2/zstd decoder state cannot be saved and restored from Python, so
+    each checkpoint is stored as an independently decodable segment: on the
+    first open the file is decompressed once, and every checkpoint_bytes of
+    output is re-compressed with fast zlib into a sidecar file. Reading any
+    offset afterwards only inflates the one segment that contains it.
+    """
+
+    def __init__(self, file_path, index_dir="config/indexes", checkpoint_bytes=1024 * 1024):
+        self.file_path = str(file_path)
+        self.index_dir = Path(index_dir)
+        self.checkpoint_bytes = checkpoint_bytes
+        self.compression = detect_compression(file_path)
+        if self.compression is None:
+            raise ValueError(f"Not a supported compressed file: {file_path}")
+
+        digest = hashlib.sha1(str(Path(file_path).resolve()).encode('utf-8')).hexdigest()
+        self.sidecar_path = self.index_dir / f"{digest}.seek"
+        self.meta_path = self.index_dir / f"{digest}.seek.json"
+
+        self.total_size = 0
+        self.segments = []  # [decompressed_offset, sidecar_offset, sidecar_length]
+        if not self._load():
+            self._build()
+        self._starts = [segment[0] for segment in self.segments]
+
+    def _signature(self):
+        stat = os.stat(self.file_path)
+        return {"source_size": stat.st_size, "mtime": stat.st_mtime, "checkpoint_bytes": self.checkpoint_bytes}
+
+    def _load(self):
+        """Reuse a persisted index if it matches the source file"""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (IOError, ValueError):
+            return False
+        if any(meta.get(key) != value for key, value in self._signature().items()):
+            return False
+        try:
+            total_size = meta["total_size"]
+            segments = meta["segments"]
+            sidecar_size = self.sidecar_path.stat().st_size
+        except (KeyError, OSError):
+            return False
+        # The sidecar must still end where the last segment does
+        if segments and sum(segments[-1][1:]) != sidecar_size:
+            return False
+        self.total_size = total_size
+        self.segments = segments
+        return True
+
+    def _build(self):
+        """Decompress the file once, writing one checkpoint segment per checkpoint_bytes"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        segments = []
+        total = 0
+        temp_sidecar = self.sidecar_path.with_suffix('.seek.tmp')
+
+        with open_decompressed_stream(self.file_path, self.compression) as stream, \
+                open(temp_sidecar, 'wb') as sidecar:
+            while True:
+                data = _read_full(stream, self.checkpoint_bytes)
+                if not data:
+                    break
+                packed = zlib.compress(data, 1)
+                segments.append([total, sidecar.tell(), len(packed)])
+                sidecar.write(packed)
+                total += len(data)
+
+        os.replace(temp_sidecar, self.sidecar_path)
+        self.total_size = total
+        self.segments = segments
+
+        meta = dict(self._signature(), total_size=total, segments=segments,
+                    compression=self.compression, file_path=self.file_path)
+        self._write_meta(meta)
+
+    def _write_meta(self, meta):
+        """Atomically replace the meta file, so a crash never leaves a half-written index"""
+        fd, temp_path = tempfile.mkstemp(prefix=self.meta_path.name, suffix=".tmp", dir=self.index_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.meta_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def segment_for(self, offset):
+        """Index of the segment containing a decompressed offset"""
+        return max(0, bisect.bisect_right(self._starts, offset) - 1)
+
+
+class SeekableDecompressedFile(io.RawIOBase):
+    """Seekable, read-only view of the decompressed text backed by a CompressedIndex"""
+
+    def __init__(self, index, cache_segments=2):
+        super().__init__()
+        self.index = index
+        self._sidecar = open(index.sidecar_path, 'rb')
+        self._position = 0
+        self._cache = {}  # segment number -> decompressed bytes
+        self._cache_order = []
+        self._cache_segments = cache_segments
+        self._lock = threading.Lock()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.index.total_size
+        self._position = max(0, offset)
+        return self._position
+
+    def _segment(self, number):
+        """Decompressed bytes of a segment, with a small LRU cache (lock held)"""
+        if number in self._cache:
+            self._cache_order.remove(number)
+            self._cache_order.append(number)
+            return self._cache[number]
+
+        _, sidecar_offset, length = self.index.segments[number]
+        self._sidecar.seek(sidecar_offset)
+        data = zlib.decompress(self._sidecar.read(length))
+
+        self._cache[number] = data
+        self._cache_order.append(number)
+        if len(self._cache_order) > self._cache_segments:
+            del self._cache[self._cache_order.pop(0)]
+        return data
+
+    def read_at(self, offset, size):
+        """Read up to size decompressed bytes at offset without moving the position"""
+        if offset >= self.index.total_size or size <= 0 or not self.index.segments:
+            return b""
+
+        parts = []
+        with self._lock:
+            number = self.index.segment_for(offset)
+            while size > 0 and number < len(self.index.segments):
+                segment_start = self.index.segments[number][0]
+                data = self._segment(number)
+                piece = data[offset - segment_start:offset - segment_start + size]
+                if not piece:
+                    break
+                parts.append(piece)
+                offset += len(piece)
+                size -= len(piece)
+                number += 1
+        return b"".join(parts)
+
+    def readinto(self, buffer):
+        data = self.read_at(self._position, len(buffer))
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._sidecar.close()
+        super().close()
+
+
+def _read_full(stream, size):
+    """Read exactly size bytes unless the stream ends first"""
+    parts = []
+    remaining = size
+    while remaining > 0:
+        data = stream.read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b"".join(parts)
@@ -1,14 +1,54 @@
 # Configuration service for managing app settings
+import atexit
+import copy
 import json
 import os
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from pathlib import Path
 
+try:
+    import fcntl  # POSIX advisory locks
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt  # Windows byte-range locks
+except ImportError:
+    msvcrt = None
+
 
 class ConfigService:
+    """
+    Reads and writes the JSON configuration.
+    Reads are served from an in-memory copy that is re-parsed only when the
+    file's mtime or size changes. Writes take an advisory lock on a sidecar
+    lock file, re-read the current file, apply the change and atomically
+    replace the file, so several threads and processes (the GUI, the
+    streaming server, a second instance) can share one configuration without
+    losing each other's updates.
+
+    Reading positions change with every sentence, so they are batched: this
+    instance sees a new position at once, but it is written at most every
+    POSITION_WRITE_INTERVAL seconds (with any other write, by
+    flush_positions(), or at interpreter exit).
+    """
+
+    POSITION_WRITE_INTERVAL = 5.0
+
     def __init__(self, config_file_path="config/app_config.json"):
         self.config_file_path = Path(config_file_path)
         self.config_dir = self.config_file_path.parent
         self.config_dir.mkdir(exist_ok=True)
+        self.lock_file_path = self.config_file_path.with_name(self.config_file_path.name + ".lock")
+        self._cache = None
+        self._cache_signature = None
+        self._lock = threading.RLock()
+        self._pending_positions = {}  # Positions not written yet; see set_last_position
+        self._position_timer = None
+        self._last_position_write = 0.0
         
         # Initialize with default values
         self.default_config = {
@@ -18,77 +58,310 @@ class ConfigService:
                 "volume": 1.0,
                 "voice_model": ""  # Default to empty, user needs to specify
             },
+            "audio": {
+                "memory_budget_mb": 64,  # Budget for queued and cached PCM audio
+                "cache_mb": 32,  # Share of the budget kept as reusable synthesized audio
+                "normalize_loudness": False,
+                "target_loudness_dbfs": -20.0,
+                "trim_silence": True,  # Trim Piper's edge silence on every chunk
+                "silence_threshold_db": -45.0,
+                "sentence_gap_ms": 120,  # Pause inserted between trimmed chunks
+                "instant_rate_changes": True,  # Time-stretch existing audio when the speed changes
+                "resynthesize_after_rate_change": True  # Then re-run Piper at the new speed in the background
+            },
+            "voices": {
+                "engine": "piper",  # Synthesis engine: piper, espeak-ng or tone (a test tone per word)
+                "espeak_voice": "en",  # Voice for the espeak-ng engine
+                "warm_models": 2,  # Piper voice models kept loaded (0 = start Piper per chunk)
+                "warm_memory_mb": 512,  # Memory budget for the loaded models
+                "dialogue_voice_model": "",  # Second voice for quoted text
+                "route_quotes": False  # Read quoted text with the dialogue voice
+            },
+            "resources": {
+                "nice": 0,  # Lower Piper's CPU priority (0-19; 10 suits laptops and shared servers)
+                "ionice_class": "",  # Linux I/O class for Piper: "idle", "best-effort" or "" to leave it
+                "ionice_level": 7,  # Best-effort I/O priority (0 highest - 7 lowest)
+                "onnx_threads": 0,  # Threads per Piper process (0 = one per core)
+                "max_concurrent_jobs": 0,  # Piper runs at once across the app (0 = unlimited)
+                "just_in_time": False  # Synthesize only as far ahead as needed to avoid gaps
+            },
+            "server": {
+                "host": "0.0.0.0",
+                "port": 8765,
+                "library_dirs": [],  # Directories listeners may stream from
+                "workers": 2,  # Concurrent synthesis jobs shared by all listeners
+                "lookahead_chunks": 4  # Chunks synthesized ahead of each listener
+            },
+            "files": {
+                "compressed_checkpoint_mb": 1,  # Seek-point spacing for gzip/bz2/zstd input
+                # Follow mode: stat polling interval where inotify is unavailable, and how
+                # long an unfinished last sentence waits for more text before it is read
+                "follow_poll_interval_s": 0.25,
+                "follow_idle_flush_s": 2.0
+            },
+            "library": {
+                "dirs": [],  # Directories listed in the library view
+                "workers": 4,  # Files read at once when the catalog is updated
+                "words_per_minute": 150  # For estimated reading times
+            },
+            "chapters": {
+                "patterns": [],  # Extra heading regexes on top of the built-in ones
+                "layout_heuristics": True  # Detect isolated short lines as headings
+            },
+            "profiling": {
+                "enabled": False,  # Or set TEXT_READER_PROFILE=1
+                "output_dir": "",  # Defaults to profiles/ next to this file
+                "max_sessions": 10,  # Older profiles are deleted
+                "trace_allocations": True
+            },
+            "session": {
+                "enabled": True,  # Snapshot the session on exit and periodically for a warm restart
+                "snapshot_interval_s": 30,
+                "snapshot_chunks": 3,  # Sentences of synthesized audio kept with the snapshot
+                "resume_playback": True  # Keep reading on launch if the last session was reading
+            },
             "last_positions": {}
         }
     
     def load_config(self):
-        """Load configuration from file"""
-        if self.config_file_path.exists():
-            try:
-                with open(self.config_file_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    # Merge with defaults to ensure all keys exist
-                    return self._merge_defaults(config)
-            except (json.JSONDecodeError, IOError):
-                # Return default config if file is corrupted
-                return self.default_config.copy()
-        else:
-            # Return default config if file doesn't exist
-            return self.default_config.copy()
-    
-    def save_config(self, config_data):
-        """Save configuration to file"""
+        """Load configuration from file (a copy the caller may modify)"""
+        with self._lock:
+            config = copy.deepcopy(self._read())
+            config["last_positions"].update(self._pending_positions)
+        return config
+
+    def _signature(self):
+        """Identifies the file contents cheaply (atomic replaces also change the inode)"""
         try:
-            # Create directory if it doesn't exist
+            stat = os.stat(self.config_file_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _read(self):
+        """The current configuration, re-parsed only if the file changed (do not modify)"""
+        with self._lock:
+            signature = self._signature()
+            if self._cache is not None and signature == self._cache_signature:
+                return self._cache
+
+            config = None
+            if signature is not None:
+                try:
+                    with open(self.config_file_path, 'r', encoding='utf-8') as f:
+                        # Merge with defaults to ensure all keys exist
+                        config = self._merge_defaults(json.load(f))
+                except (json.JSONDecodeError, IOError):
+                    # Fall back to the default config if the file is corrupted
+                    config = None
+            if config is None:
+                # Default config if the file doesn't exist
+                config = copy.deepcopy(self.default_config)
+
+            self._cache = config
+            self._cache_signature = signature
+            return config
+
+    @contextmanager
+    def _file_lock(self):
+        """Hold the advisory inter-process lock for the configuration file"""
+        with self._lock:
             self.config_dir.mkdir(parents=True, exist_ok=True)
-            
-            with open(self.config_file_path, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
+            with open(self.lock_file_path, 'a+b') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                elif msvcrt is not None:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                    elif msvcrt is not None:
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def update_config(self, update):
+        """
+        Read-modify-write the configuration under the file lock.
+        update(config) changes the freshly read config in place.
+        """
+        try:
+            with self._file_lock():
+                config = copy.deepcopy(self._read())
+                # Batched reading positions go out with any write
+                config["last_positions"].update(self._pending_positions)
+                update(config)
+                self._write(config)
+                self._pending_positions = {}
+                self._last_position_write = time.monotonic()
         except IOError as e:
             raise IOError(f"Could not save configuration: {e}")
-    
+
+    def _write(self, config_data):
+        """Atomically replace the configuration file (file lock held)"""
+        fd, temp_path = tempfile.mkstemp(prefix=self.config_file_path.name, suffix=".tmp", dir=self.config_dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(config_data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.config_file_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self._cache = config_data
+        self._cache_signature = self._signature()
+
+    def save_config(self, config_data):
+        """
+        Save configuration to file.
+        Sections in config_data are merged into the stored configuration, so
+        settings written meanwhile by others are kept. last_positions is left
+        out: a copy from load_config() goes stale as soon as playback moves on,
+        so positions are only written through set_last_position and
+        remove_last_position.
+        """
+        def merge(config):
+            for key, value in config_data.items():
+                if key == "last_positions":
+                    continue
+                if isinstance(config.get(key), dict) and isinstance(value, dict):
+                    config[key].update(copy.deepcopy(value))
+                else:
+                    config[key] = copy.deepcopy(value)
+
+        self.update_config(merge)
+
     def _merge_defaults(self, config):
         """Merge loaded config with defaults to ensure all keys exist"""
-        merged = self.default_config.copy()
-        
-        # Merge TTS params
-        if "tts_params" in config:
-            merged["tts_params"].update(config["tts_params"])
+        merged = copy.deepcopy(self.default_config)
         
-        # Merge last positions
-        if "last_positions" in config:
-            merged["last_positions"].update(config["last_positions"])
+        # Merge dictionary sections (TTS params, audio settings, last positions)
+        for key, value in config.items():
+            if isinstance(merged.get(key), dict) and isinstance(value, dict):
+                merged[key].update(value)
+            else:
+                merged[key] = value
         
         return merged
     
     def get_last_position(self, file_path):
         """Get the last reading position for a specific file"""
-        config = self.load_config()
         file_path_str = str(Path(file_path).resolve())
-        return config.get("last_positions", {}).get(file_path_str)
+        with self._lock:
+            if file_path_str in self._pending_positions:
+                return self._pending_positions[file_path_str]
+            return self._read().get("last_positions", {}).get(file_path_str)
     
     def set_last_position(self, file_path, position):
-        """Set the last reading position for a specific file"""
-        config = self.load_config()
+        """
+        Set the last reading position for a specific file. Playback calls this
+        for every sentence, so the write is deferred until POSITION_WRITE_INTERVAL
+        has passed since the last one (see flush_positions).
+        """
         file_path_str = str(Path(file_path).resolve())
-        config["last_positions"][file_path_str] = position
-        self.save_config(config)
+        with self._lock:
+            self._pending_positions[file_path_str] = position
+            _unflushed.add(self)
+            wait = self._last_position_write + self.POSITION_WRITE_INTERVAL - time.monotonic()
+            if wait <= 0:
+                self.flush_positions()
+            elif self._position_timer is None:
+                self._position_timer = threading.Timer(wait, self._flush_positions_later)
+                self._position_timer.daemon = True
+                self._position_timer.start()
+
+    def flush_positions(self):
+        """Write batched reading positions now (e.g. when playback pauses or stops)"""
+        with self._lock:
+            if self._position_timer is not None:
+                self._position_timer.cancel()
+                self._position_timer = None
+            if self._pending_positions:
+                self.update_config(lambda config: None)
+
+    def _flush_positions_later(self):
+        try:
+            self.flush_positions()
+        except IOError as e:
+            print(f"Could not save reading positions: {e}")
     
     def remove_last_position(self, file_path):
         """Remove the last reading position for a specific file"""
-        config = self.load_config()
         file_path_str = str(Path(file_path).resolve())
-        if file_path_str in config.get("last_positions", {}):
-            del config["last_positions"][file_path_str]
-            self.save_config(config)
+        with self._lock:
+            pending = self._pending_positions.pop(file_path_str, None) is not None
+            if pending or file_path_str in self._read().get("last_positions", {}):
+                self.update_config(lambda config: config["last_positions"].pop(file_path_str, None))
     
     def update_tts_params(self, **params):
         """Update TTS parameters"""
-        config = self.load_config()
-        config["tts_params"].update(params)
-        self.save_config(config)
+        self.update_config(lambda config: config["tts_params"].update(params))
     
     def get_tts_params(self):
         """Get current TTS parameters"""
-        config = self.load_config()
-        return config.get("tts_params", {})
\ No newline at end of file
+        return copy.deepcopy(self._read().get("tts_params", {}))
+
+    def get_audio_settings(self):
+        """Get audio pipeline settings (memory budget, etc.)"""
+        return copy.deepcopy(self._read().get("audio", {}))
+
+    def get_voice_settings(self):
+        """Get the synthesis engine, warm voice model and dialogue voice settings"""
+        return copy.deepcopy(self._read().get("voices", {}))
+
+    def get_profiling_settings(self):
+        """Get settings for the opt-in playback profiler"""
+        return copy.deepcopy(self._read().get("profiling", {}))
+
+    def get_file_settings(self):
+        """Get file handling settings (compressed input checkpoints, follow mode)"""
+        return copy.deepcopy(self._read().get("files", {}))
+
+    def get_library_settings(self):
+        """Get the library catalog settings (directories, scan workers)"""
+        return copy.deepcopy(self._read().get("library", {}))
+
+    def add_library_dir(self, directory):
+        """Add a directory to the library (stored resolved, once)"""
+        directory_str = str(Path(directory).resolve())
+
+        def add(config):
+            dirs = config.setdefault("library", {}).setdefault("dirs", [])
+            if directory_str not in dirs:
+                dirs.append(directory_str)
+        self.update_config(add)
+
+    def get_resource_settings(self):
+        """Get the synthesis resource policy (priority, threads, concurrency)"""
+        return copy.deepcopy(self._read().get("resources", {}))
+
+    def get_server_settings(self):
+        """Get settings for the streaming server"""
+        return copy.deepcopy(self._read().get("server", {}))
+
+    def get_session_settings(self):
+        """Get session snapshot (warm restart) settings"""
+        return copy.deepcopy(self._read().get("session", {}))
+
+    def get_chapter_settings(self):
+        """Get chapter detection settings (extra patterns, heuristics)"""
+        return copy.deepcopy(self._read().get("chapters", {}))
+
+
+# Instances that may hold batched positions, flushed when the interpreter exits
+_unflushed = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all_positions():
+    for config_service in list(_unflushed):
+        try:
+            config_service.flush_positions()
+        except IOError as e:
+            print(f"Could not save reading positions: {e}")
@@ -0,0 +1,300 @@
+# Streaming extraction of readable text from EPUB, HTML and Markdown files
+import bisect
+import codecs
+import hashlib
+import json
+import os
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote
+
+
+# Bump when extraction changes so cached text is rebuilt
+EXTRACTOR_VERSION = 1
+
+DOCUMENT_FORMATS = {
+    '.epub': 'epub',
+    '.html': 'html',
+    '.htm': 'html',
+    '.xhtml': 'html',
+    '.md': 'markdown',
+    '.markdown': 'markdown',
+}
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def detect_document_format(file_path):
+    """Get the document format of a file ('epub', 'html', 'markdown') or None for plain text"""
+    return DOCUMENT_FORMATS.get(Path(file_path).suffix.lower())
+
+
+class _TextSink:
+    """
+    Writes extracted text to a file as it is produced, collapsing whitespace
+    and separating blocks, and records where each block came from as
+    [text_offset, part, line] (part is the EPUB member, line the source line).
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.offset = 0
+        self.spans = []
+        self._pending_breaks = 0
+        self._block_start = True
+        self._space = False
+
+    def block_break(self, newlines=2):
+        """End the current block; the next text starts after newlines line breaks"""
+        self._pending_breaks = max(self._pending_breaks, newlines)
+        self._block_start = True
+        self._space = False
+
+    def text(self, data, part, line):
+        """Add running text (whitespace is collapsed)"""
+        words = data.split()
+        if not words:
+            if data and not self._block_start:
+                self._space = True
+            return
+
+        if self._block_start:
+            if self.offset:
+                self._write("\n" * self._pending_breaks)
+            self.spans.append([self.offset, part, line])
+            self._block_start = False
+            self._pending_breaks = 0
+        elif self._space or data[0].isspace():
+            self._write(" ")
+        self._write(" ".join(words))
+        self._space = data[-1].isspace()
+
+    def _write(self, text):
+        data = text.encode('utf-8')
+        self.out.write(data)
+        self.offset += len(data)
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Incremental HTML/XHTML to text converter feeding a _TextSink"""
+
+    SKIP_TAGS = {'script', 'style', 'head', 'nav', 'svg', 'math', 'template', 'noscript'}
+    BLOCK_TAGS = {'p', 'div', 'section', 'article', 'aside', 'blockquote', 'pre', 'li', 'ul', 'ol',
+                  'dl', 'dt', 'dd', 'table', 'tr', 'figure', 'figcaption', 'header', 'footer',
+                  'body', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+    LINE_TAGS = {'br', 'td', 'th'}
+
+    def __init__(self, sink, part=""):
+        super().__init__(convert_charrefs=True)
+        self.sink = sink
+        self.part = part
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.sink.block_break(2)
+        elif tag in self.LINE_TAGS:
+            self.sink.block_break(1)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in self.BLOCK_TAGS:
+            self.sink.block_break(2)
+        elif tag in self.LINE_TAGS:
+            self.sink.block_break(1)
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.sink.block_break(2)
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.sink.text(data, self.part, self.getpos()[0])
+
+
+# Markdown constructs that are markup rather than something to read aloud
+MD_FENCE = re.compile(r'^\s*(```|~~~)')
+MD_HEADING = re.compile(r'^\s{0,3}#{1,6}\s+(.*?)\s*#*\s*$')
+MD_RULE = re.compile(r'^\s{0,3}([-*_=])(\s*\1){2,}\s*$')
+MD_LIST_ITEM = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+')
+MD_QUOTE = re.compile(r'^\s*(?:>\s?)+')
+MD_LINK_DEFINITION = re.compile(r'^\s{0,3}\[[^\]]+\]:\s*\S+')
+MD_TABLE_SEPARATOR = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+MD_INLINE = [
+    (re.compile(r'!\[([^\]]*)\]\([^)]*\)'), r'\1'),  # images -> alt text
+    (re.compile(r'\[([^\]]+)\]\([^)]*\)'), r'\1'),  # links -> link text
+    (re.compile(r'\[([^\]]+)\]\[[^\]]*\]'), r'\1'),  # reference links
+    (re.compile(r'<(?:https?|mailto):[^>]+>'), ''),  # autolinks
+    (re.compile(r'<[^>]+>'), ''),  # inline HTML tags
+    (re.compile(r'`+([^`]*)`+'), r'\1'),  # inline code
+    (re.compile(r'(\*\*|__|~~)(.+?)\1'), r'\2'),  # strong, strikethrough
+    (re.compile(r'(?<!\w)[*_](?!\s)(.+?)(?<!\s)[*_](?!\w)'), r'\1'),  # emphasis
+]
+
+
+def _extract_markdown(stream, sink):
+    """Convert Markdown to text line by line"""
+    in_fence = False
+    for line_number, line in enumerate(stream, start=1):
+        if MD_FENCE.match(line):
+            in_fence = not in_fence
+            sink.block_break(2)
+            continue
+        if in_fence or MD_LINK_DEFINITION.match(line):
+            continue
+        if not line.strip() or MD_RULE.match(line):
+            sink.block_break(2)
+            continue
+
+        heading = MD_HEADING.match(line)
+        if heading:
+            line = heading.group(1)
+            sink.block_break(2)
+        else:
+            line = MD_QUOTE.sub('', line)
+            if MD_LIST_ITEM.match(line):
+                line = MD_LIST_ITEM.sub('', line)
+                sink.block_break(1)
+            elif line.strip().startswith('|') or line.strip().endswith('|'):
+                if MD_TABLE_SEPARATOR.match(line):
+                    continue
+                line = ", ".join(cell.strip() for cell in line.strip().strip('|').split('|'))
+                sink.block_break(1)
+
+        for pattern, replacement in MD_INLINE:
+            line = pattern.sub(replacement, line)
+        sink.text(line + " ", "", line_number)
+        if heading:
+            sink.block_break(2)
+
+
+def _feed_html(binary_stream, sink, part=""):
+    """Feed an HTML byte stream to the extractor in blocks"""
+    parser = _HTMLTextExtractor(sink, part)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        block = binary_stream.read(READ_BLOCK_SIZE)
+        if not block:
+            break
+        parser.feed(decoder.decode(block))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    sink.block_break(2)
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def epub_spine(archive):
+    """Member names of an EPUB's content documents in reading order"""
+    container = ET.fromstring(archive.read('META-INF/container.xml'))
+    rootfile = next(el for el in container.iter() if _local_name(el.tag) == 'rootfile')
+    opf_path = rootfile.get('full-path')
+    opf_dir = posixpath.dirname(opf_path)
+    package = ET.fromstring(archive.read(opf_path))
+
+    manifest = {}
+    spine = []
+    for element in package.iter():
+        name = _local_name(element.tag)
+        if name == 'item':
+            href = posixpath.normpath(posixpath.join(opf_dir, unquote(element.get('href', ''))))
+            manifest[element.get('id')] = (href, element.get('media-type', ''))
+        elif name == 'itemref' and element.get('linear', 'yes') != 'no':
+            spine.append(element.get('idref'))
+
+    members = []
+    for idref in spine:
+        href, media_type = manifest.get(idref, (None, ''))
+        if href and ('html' in media_type or href.endswith(('.html', '.htm', '.xhtml'))):
+            members.append(href)
+    return members
+
+
+class DocumentIndex:
+    """
+    Plain-text rendition of a structured document, built once by streaming
+    the source through a format adapter and cached next to the other
+    indexes. Reading positions are byte offsets into the extracted text, so
+    they stay valid until the source changes; source_location() maps an
+    offset back to the EPUB member and line it came from.
+    """
+
+    def __init__(self, file_path, index_dir="config/indexes"):
+        self.file_path = str(file_path)
+        self.index_dir = Path(index_dir)
+        self.format = detect_document_format(file_path)
+        if self.format is None:
+            raise ValueError(f"Not a supported document: {file_path}")
+
+        digest = hashlib.sha1(str(Path(file_path).resolve()).encode('utf-8')).hexdigest()
+        self.text_path = self.index_dir / f"{digest}.text"
+        self.meta_path = self.index_dir / f"{digest}.text.json"
+
+        self.spans = []  # [text_offset, part, line] at the start of every block
+        if not self._load():
+            self._build()
+        self._starts = [span[0] for span in self.spans]
+
+    def _signature(self):
+        stat = os.stat(self.file_path)
+        return {"source_size": stat.st_size, "mtime": stat.st_mtime, "version": EXTRACTOR_VERSION}
+
+    def _load(self):
+        """Reuse previously extracted text if it matches the source file"""
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (IOError, ValueError):
+            return False
+        if any(meta.get(key) != value for key, value in self._signature().items()):
+            return False
+        if not self.text_path.exists():
+            return False
+        self.spans = meta["spans"]
+        return True
+
+    def _build(self):
+        """Stream the document through its adapter into the text file"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        temp_text = self.text_path.with_suffix('.text.tmp')
+
+        with open(temp_text, 'wb') as out:
+            sink = _TextSink(out)
+            if self.format == 'epub':
+                with zipfile.ZipFile(self.file_path) as archive:
+                    for member in epub_spine(archive):
+                        try:
+                            with archive.open(member) as stream:
+                                _feed_html(stream, sink, part=member)
+                        except KeyError:
+                            continue  # listed in the spine but missing from the archive
+            elif self.format == 'html':
+                with open(self.file_path, 'rb') as stream:
+                    _feed_html(stream, sink)
+            else:
+                with open(self.file_path, 'r', encoding='utf-8', errors='replace') as stream:
+                    _extract_markdown(stream, sink)
+            if sink.offset:
+                out.write(b"\n")
+
+        os.replace(temp_text, self.text_path)
+        self.spans = sink.spans
+        with open(self.meta_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self._signature(), format=self.format, file_path=self.file_path, spans=sink.spans), f)
+
+    def source_location(self, offset):
+        """The source part (EPUB member) and line of the block containing a text offset"""
+        index = bisect.bisect_right(self._starts, offset) - 1
+        if index < 0:
+            return None
+        _, part, line = self.spans[index]
+        return {"part": part, "line": line}
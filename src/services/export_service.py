@@ -0,0 +1,331 @@
+# Export service for rendering a range of a file into a single audio clip
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the src directory to the path to enable imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.file_service import FileService
+from services.chapter_service import ChapterService
+from services.search_service import SearchService
+from services.tts_service import TTSService
+from services.config_service import ConfigService
+from utils.audio_dsp import pcm_as_array, convert_pcm
+from utils.wav_io import wav_header
+
+
+# What export_range() wrote: the snapped byte range, the number of speech
+# chunks rendered and the length of the clip
+ExportResult = namedtuple('ExportResult', ['output_path', 'start', 'end', 'chunks', 'seconds'])
+
+# Largest PCM payload a RIFF header can describe
+MAX_WAV_DATA_SIZE = 0xFFFFFFFF - 36
+
+
+class ExportError(RuntimeError):
+    """Raised when a clip cannot be rendered or encoded"""
+
+
+class ExportService:
+    """
+    Renders a byte range of a file (or a chapter, or the passage around a
+    search hit) into one audio clip. The range is widened to whole sentences,
+    the sentences are synthesized through TTSService.prepare_audio (so cached
+    audio is reused and warm voice workers are used) on a small worker pool,
+    and the audio is written to the output in reading order as it is ready.
+    At most lookahead_chunks rendered chunks are held at a time, so the size
+    of the range does not affect memory use.
+    .wav clips are written directly; other formats (.mp3, .ogg, .opus, .flac,
+    .m4a...) are encoded by piping the PCM into ffmpeg.
+    """
+
+    def __init__(self, tts_service, index_dir="config/indexes", workers=2, lookahead_chunks=4,
+                 chapter_patterns=None):
+        self.tts_service = tts_service
+        self.index_dir = index_dir
+        self.workers = max(1, workers)
+        self.lookahead_chunks = max(1, lookahead_chunks)
+        self.chapter_patterns = chapter_patterns or []
+
+    def _open(self, file_path):
+        file_service = FileService(index_dir=self.index_dir)
+        file_service.load_file(str(file_path))
+        return file_service
+
+    def export_range(self, file_path, start, end, output_path, on_progress=None, stop_event=None):
+        """
+        Render bytes start..end of file_path, widened to whole sentences, into
+        output_path; end=None means the end of the file. on_progress(position,
+        end) is called after each chunk is written.
+        Setting stop_event cancels the export; nothing is left at output_path.
+        """
+        file_service = self._open(file_path)
+        try:
+            if end is None:
+                end = file_service.get_file_size()
+            start, end = file_service.snap_to_sentences(start, end)
+            if start >= end:
+                raise ExportError("The range contains no text")
+            sentences = self._sentences(file_service, start, end)
+            chunks, seconds = self._render(sentences, str(file_path), output_path, on_progress, end, stop_event)
+        finally:
+            file_service.close_file()
+        return ExportResult(str(output_path), start, end, chunks, seconds)
+
+    def export_chapter(self, file_path, chapter_index, output_path, **kwargs):
+        """Render one chapter (an index into ChapterService.chapter_ranges())"""
+        file_service = self._open(file_path)
+        try:
+            ranges = ChapterService(file_service, index_dir=self.index_dir,
+                                    patterns=self.chapter_patterns).chapter_ranges()
+        finally:
+            file_service.close_file()
+        if not 0 <= chapter_index < len(ranges):
+            raise ExportError(f"Chapter {chapter_index} not found ({len(ranges)} chapters)")
+        _, start, end = ranges[chapter_index]
+        return self.export_range(file_path, start, end, output_path, **kwargs)
+
+    def export_search_hit(self, file_path, query, output_path, hit_index=0, regex=False, **kwargs):
+        """Render the sentences containing the hit_index-th match of query"""
+        file_service = self._open(file_path)
+        try:
+            hits = list(SearchService(file_service).iter_search(query, regex=regex, max_hits=hit_index + 1))
+        finally:
+            file_service.close_file()
+        if hit_index >= len(hits):
+            raise ExportError(f"Search hit {hit_index} not found ({len(hits)} hits for {query!r})")
+        hit = hits[hit_index]
+        return self.export_range(file_path, hit.offset, hit.end, output_path, **kwargs)
+
+    def _sentences(self, file_service, start, end):
+        """Yield (speech chunk, span_end) for the sentences in start..end"""
+        for sentence, span_start, span_end in file_service.iter_sentence_spans(start):
+            if span_start >= end:
+                return
+            for chunk in self.tts_service._speech_chunks(sentence):
+                if chunk.strip():
+                    yield chunk, span_end
+
+    def _render(self, sentences, source_file_path, output_path, on_progress, end, stop_event):
+        """Synthesize ahead on the worker pool and write chunks in order"""
+        stop_event = stop_event or threading.Event()
+        writer = None
+        pending = deque()
+        chunks = 0
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export")
+        try:
+            while True:
+                # Keep the pool busy without holding more than lookahead_chunks of audio
+                while len(pending) < self.lookahead_chunks:
+                    item = next(sentences, None)
+                    if item is None:
+                        break
+                    chunk, span_end = item
+                    pending.append((executor.submit(self.tts_service.prepare_audio, chunk, source_file_path),
+                                    span_end))
+                if not pending or stop_event.is_set():
+                    break
+
+                future, span_end = pending.popleft()
+                buffer = future.result()
+                try:
+                    if writer is None:
+                        writer = open_clip_writer(output_path, buffer.sample_rate, buffer.channels)
+                    self._write_chunk(writer, buffer)
+                finally:
+                    buffer.release()
+                chunks += 1
+                if on_progress is not None:
+                    on_progress(span_end, end)
+
+            if stop_event.is_set():
+                raise ExportError("Export cancelled")
+            if writer is None:
+                raise ExportError("The range contains no speakable text")
+            seconds = writer.frames / writer.sample_rate
+            writer.close()
+            writer = None
+            return chunks, seconds
+        finally:
+            for future, _ in pending:
+                future.add_done_callback(_release_result)
+            executor.shutdown(wait=False)
+            if writer is not None:
+                writer.abort()
+
+    def _write_chunk(self, writer, buffer):
+        """Write a chunk at the clip's format, followed by the sentence gap"""
+        if (buffer.sample_rate, buffer.channels) == (writer.sample_rate, writer.channels):
+            writer.write(buffer.data)
+        else:
+            # Voices may differ in format; the first chunk's format wins
+            samples = convert_pcm(pcm_as_array(buffer), buffer.sample_rate, buffer.channels,
+                                  writer.sample_rate, writer.channels)
+            writer.write(memoryview(samples).cast('B'))
+        if self.tts_service.trim_silence and self.tts_service.sentence_gap_ms > 0:
+            writer.write_silence(int(writer.sample_rate * self.tts_service.sentence_gap_ms / 1000))
+
+
+def open_clip_writer(output_path, sample_rate, channels):
+    """A streaming writer for output_path's format (by suffix)"""
+    if Path(output_path).suffix.lower() == '.wav':
+        return WavClipWriter(output_path, sample_rate, channels)
+    return FfmpegClipWriter(output_path, sample_rate, channels)
+
+
+class WavClipWriter:
+    """
+    Streams 16-bit PCM into a WAV file. The header is written with a zero
+    size and patched on close, so the length need not be known up front.
+    Data goes to output_path + ".part", which replaces output_path on close.
+    """
+
+    def __init__(self, output_path, sample_rate, channels):
+        self.output_path = str(output_path)
+        self.part_path = self.output_path + ".part"
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames = 0
+        self._file = open(self.part_path, 'wb')
+        self._file.write(wav_header(sample_rate, channels, 2, 0))
+
+    def write(self, pcm):
+        """Append PCM bytes (any bytes-like object)"""
+        data_size = (self.frames * self.channels * 2) + len(pcm)
+        if data_size > MAX_WAV_DATA_SIZE:
+            raise ExportError("Clip is too long for a WAV file; export a smaller range or another format")
+        self._file.write(pcm)
+        self.frames += len(pcm) // (self.channels * 2)
+
+    def write_silence(self, frames):
+        self.write(bytes(frames * self.channels * 2))
+
+    def close(self):
+        self._file.seek(0)
+        self._file.write(wav_header(self.sample_rate, self.channels, 2, self.frames * self.channels * 2))
+        self._file.close()
+        os.replace(self.part_path, self.output_path)
+
+    def abort(self):
+        """Discard the partial clip"""
+        self._file.close()
+        try:
+            os.remove(self.part_path)
+        except OSError:
+            pass
+
+
+class FfmpegClipWriter:
+    """Streams 16-bit PCM through ffmpeg, which encodes by the output suffix"""
+
+    def __init__(self, output_path, sample_rate, channels):
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            raise ExportError(f"ffmpeg is needed to write {Path(output_path).suffix} clips; "
+                              "install it or export to .wav")
+        self.output_path = str(output_path)
+        # Keep the real suffix so ffmpeg picks the encoder from it
+        path = Path(self.output_path)
+        self.part_path = str(path.with_name(path.stem + ".part" + path.suffix))
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames = 0
+        self._process = subprocess.Popen(
+            [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+             '-f', 's16le', '-ar', str(sample_rate), '-ac', str(channels), '-i', '-',
+             self.part_path],
+            stdin=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+
+    def write(self, pcm):
+        try:
+            self._process.stdin.write(pcm)
+        except BrokenPipeError:
+            raise ExportError(f"ffmpeg failed: {self._process.stderr.read().decode(errors='replace')}")
+        self.frames += len(pcm) // (self.channels * 2)
+
+    def write_silence(self, frames):
+        self.write(bytes(frames * self.channels * 2))
+
+    def close(self):
+        self._process.stdin.close()
+        error = self._process.stderr.read()
+        if self._process.wait() != 0:
+            self.abort()
+            raise ExportError(f"ffmpeg failed: {error.decode(errors='replace')}")
+        os.replace(self.part_path, self.output_path)
+
+    def abort(self):
+        if self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        try:
+            os.remove(self.part_path)
+        except OSError:
+            pass
+
+
+def _release_result(future):
+    """Done-callback that releases audio nobody is waiting for anymore"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().release()
+
+
+def run_export(file_path, output_path, config_file_path="config/app_config.json", start=None, end=None,
+               chapter=None, search=None, hit_index=0, regex=False):
+    """Build the services from the configuration and export one clip, printing progress"""
+    config_service = ConfigService(config_file_path)
+    audio_settings = config_service.get_audio_settings()
+    params = config_service.get_tts_params()
+
+    tts_service = TTSService(
+        memory_budget_mb=audio_settings.get('memory_budget_mb', 64),
+        cache_mb=audio_settings.get('cache_mb', 32),
+        init_audio=False
+    )
+    tts_service.configure_audio(**audio_settings)
+    tts_service.configure_resources(**config_service.get_resource_settings())
+    tts_service.configure_voices(**config_service.get_voice_settings())
+    tts_service.set_parameters(
+        rate=params.get('rate', 1.0),
+        pitch=params.get('pitch', 1.0),
+        volume=params.get('volume', 1.0),
+        voice_model=params.get('voice_model') or None
+    )
+
+    export_service = ExportService(
+        tts_service,
+        index_dir=config_service.config_dir / "indexes",
+        workers=config_service.get_server_settings().get('workers', 2),
+        chapter_patterns=config_service.get_chapter_settings().get('patterns', [])
+    )
+
+    def on_progress(position, range_end):
+        print(f"\rExporting... byte {position} of {range_end}", end="", flush=True)
+
+    try:
+        if chapter is not None:
+            result = export_service.export_chapter(file_path, chapter, output_path, on_progress=on_progress)
+        elif search:
+            result = export_service.export_search_hit(file_path, search, output_path, hit_index=hit_index,
+                                                      regex=regex, on_progress=on_progress)
+        else:
+            result = export_service.export_range(file_path, start or 0, end, output_path,
+                                                 on_progress=on_progress)
+        print(f"\nWrote {result.output_path}: bytes {result.start}-{result.end}, "
+              f"{result.chunks} chunks, {result.seconds:.1f} s")
+        cpu = tts_service.get_cpu_report()
+        if cpu["cpu_seconds_per_audio_minute"] is not None:
+            print(f"CPU: {cpu['cpu_seconds']:.1f} s for {cpu['audio_seconds']:.1f} s of new audio "
+                  f"({cpu['cpu_seconds_per_audio_minute']:.1f} CPU s per audio minute, "
+                  f"real-time factor {cpu['real_time_factor']:.2f})")
+        return result
+    finally:
+        tts_service.close_voices()
@@ -1,23 +1,109 @@
 # File service for handling text files efficiently
+import io
+import mmap
 import os
+import sys
+import threading
+import time
 from pathlib import Path
 
+# Add the src directory to the path to enable imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.text_processing import split_text_into_spans, SENTENCE_END_PATTERN
+from services.compressed_reader import detect_compression, CompressedIndex, SeekableDecompressedFile
+from services.document_reader import detect_document_format, DocumentIndex
+from services.file_watcher import FileWatcher
+
 
 class FileService:
-    def __init__(self):
+    # Follow mode reads appended bytes through the file handle and maps them
+    # again once this much has been appended since the last mapping
+    REMAP_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, index_dir="config/indexes", checkpoint_mb=1):
+        self.index_dir = index_dir  # Where seek indexes for compressed files are kept
+        self.checkpoint_bytes = int(checkpoint_mb * 1024 * 1024)
+        self.compression = None
+        self.document = None  # DocumentIndex when reading EPUB/HTML/Markdown
         self.file_path = None
         self.file_handle = None
+        self.binary_handle = None
+        self.file_mmap = None
         self.file_size = 0
         self._buffer_size = 8192  # 8KB buffer
+        # Held while a file is opened, reopened or closed and for each read, so the
+        # UI and playback threads never see a file swapped in mid-read. Readers
+        # that need several calls to agree (e.g. file_path and the bytes) hold it too.
+        self.lock = threading.RLock()
 
     def load_file(self, file_path):
         """Load a text file for reading"""
-        if self.file_handle:
-            self.file_handle.close()
+        with self.lock:
+            if self.file_handle:
+                self.file_handle.close()
+            self._close_binary()
+
+            self.document = None
+            self.compression = detect_compression(file_path)
+            if self.compression:
+                self._load_compressed(file_path)
+                return
+
+            if detect_document_format(file_path):
+                # Markup is never read aloud: read the document's extracted text instead
+                self.document = DocumentIndex(file_path, self.index_dir)
+                self._open_text(self.document.text_path)
+            else:
+                self._open_text(file_path)
+            self.file_path = file_path
+
+    def _open_text(self, text_path):
+        """Open a plain UTF-8 text file for reading"""
+        self.file_handle = open(text_path, 'r', encoding='utf-8')
+        # Byte-level handle for reads that must map exactly onto byte offsets
+        self.binary_handle = open(text_path, 'rb')
+        self.file_size = os.fstat(self.binary_handle.fileno()).st_size
+
+        # Memory-map the file so windowed reads are cheap slices that never
+        # pull the whole file into memory (empty files cannot be mapped)
+        if self.file_size > 0:
+            try:
+                self.file_mmap = mmap.mmap(self.binary_handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                self.file_mmap = None
+
+    def _load_compressed(self, file_path):
+        """
+        Open a gzip/bz2/zstd file through its seek-point index, so positions are
+        offsets in the decompressed text and any read only decompresses from
+        the nearest checkpoint
+        """
+        index = CompressedIndex(file_path, self.index_dir, self.checkpoint_bytes)
 
         self.file_path = file_path
-        self.file_handle = open(file_path, 'r', encoding='utf-8')
-        self.file_size = os.path.getsize(file_path)
+        self.binary_handle = SeekableDecompressedFile(index)
+        # The text handle gets its own reader so the two never disturb each other's position
+        self.file_handle = io.TextIOWrapper(io.BufferedReader(SeekableDecompressedFile(index)), encoding='utf-8')
+        self.file_size = index.total_size
+
+    def source_location(self, position):
+        """
+        Where a reading position comes from in a structured document
+        ({"part": EPUB member, "line": source line}), or None for plain text
+        """
+        if self.document is None:
+            return None
+        return self.document.source_location(position)
+
+    def _close_binary(self):
+        """Close the memory map and binary handle"""
+        if self.file_mmap:
+            self.file_mmap.close()
+            self.file_mmap = None
+        if self.binary_handle:
+            self.binary_handle.close()
+            self.binary_handle = None
     
     def is_file_loaded(self):
         """Check if a file is currently loaded"""
@@ -90,13 +176,232 @@ class FileService:
         
         return text
     
+    def read_bytes(self, start_pos, size):
+        """Read raw bytes starting at a byte offset"""
+        with self.lock:
+            if not self.binary_handle or start_pos >= self.file_size or size <= 0:
+                return b""
+
+            start_pos = max(0, start_pos)
+            mapped = b""
+            if self.file_mmap is not None:
+                mapped = self.file_mmap[start_pos:start_pos + size]
+                if len(mapped) == size or len(self.file_mmap) >= self.file_size:
+                    return mapped
+                # Bytes appended since the file was mapped (follow mode) come from the handle
+                start_pos += len(mapped)
+                size = min(size - len(mapped), self.file_size - start_pos)
+
+            if self.compression:
+                return self.binary_handle.read_at(start_pos, size)
+
+            self.binary_handle.seek(start_pos)
+            return mapped + self.binary_handle.read(size)
+
+    def read_text_window(self, start_pos, size):
+        """
+        Read about size bytes of text starting at a byte offset.
+        The window is snapped to UTF-8 character boundaries, so byte offsets in
+        the returned text map exactly onto file offsets. Bytes that are not
+        valid UTF-8 come back as surrogate escapes, one character per byte, so
+        they keep their length too: measure text with utf8_length and pass it
+        through replace_undecodable before showing it (split_text_into_spans
+        does both).
+        Returns (text, window_start, window_end) as byte offsets.
+        """
+        start_pos = max(0, start_pos)
+        with self.lock:
+            data = self.read_bytes(start_pos, size)
+            file_size = self.file_size
+            if not data:
+                return "", start_pos, start_pos
+
+            # Skip continuation bytes of a character that started before the
+            # window (stray ones in a file that is not valid UTF-8 are kept)
+            head = 0
+            if start_pos > 0 and (data[0] & 0xC0) == 0x80:
+                head = utf8_overhang(self.read_bytes(max(0, start_pos - 3), min(3, start_pos)), data)
+
+        # Drop a trailing character that was cut in half
+        tail = len(data)
+        if start_pos + tail < file_size:
+            tail = utf8_boundary_before(data, tail)
+
+        text = data[head:tail].decode('utf-8', errors='surrogateescape')
+        return text, start_pos + head, start_pos + tail
+
+    def find_line_start(self, position, max_scan=4096):
+        """
+        Get the byte offset of the start of the line containing position.
+        Scans back at most max_scan bytes so very long lines stay cheap.
+        """
+        with self.lock:
+            position = min(max(0, position), self.file_size)
+            scan_start = max(0, position - max_scan)
+            data = self.read_bytes(scan_start, position - scan_start)
+        newline = data.rfind(b'\n')
+        if newline >= 0:
+            return scan_start + newline + 1
+        return scan_start
+
+    def find_sentence_start(self, position, max_scan=1024):
+        """
+        Get the byte offset where the sentence containing position begins,
+        so reading can start at a natural boundary (e.g. for search hits).
+        """
+        with self.lock:
+            position = min(max(0, position), self.file_size)
+            text, window_start, _ = self.read_text_window(max(0, position - max_scan), min(position, max_scan))
+        spans = split_text_into_spans(text, base_offset=window_start)
+        if not spans:
+            return position
+
+        last_text, last_start, _ = spans[-1]
+        # Spans end at sentence terminators, so only the last one can be unfinished
+        terminator = SENTENCE_END_PATTERN.search(last_text)
+        if terminator and terminator.end() == len(last_text):
+            return position  # position is already at a sentence boundary
+        if last_start == window_start and window_start > 0:
+            return position  # no boundary within reach; start where asked
+        return last_start
+
+    def iter_sentence_spans(self, start_position=0, chunk_size=4096):
+        """
+        Yield (sentence, span_start, span_end) from start_position to the end
+        of the file. Spans are exact byte ranges; the last sentence of each
+        chunk is re-read with the next one, since it may continue there.
+        """
+        current_pos = start_position
+        while True:
+            # Read a chunk of text from the current position, aligned to characters
+            text_chunk, chunk_start, chunk_end = self.read_text_window(current_pos, chunk_size)
+
+            # If we've reached the end of the file, exit
+            if not text_chunk:
+                return
+
+            # Split the chunk into sentences with exact byte spans for natural reading
+            sentence_spans = split_text_into_spans(text_chunk, base_offset=chunk_start)
+
+            # The last sentence may continue in the next chunk; re-read it from its start
+            at_end_of_file = chunk_end >= self.get_file_size()
+            if not at_end_of_file and len(sentence_spans) > 1:
+                sentence_spans = sentence_spans[:-1]
+
+            for span in sentence_spans:
+                yield span
+                current_pos = span[2]
+
+    def snap_to_sentences(self, start, end):
+        """
+        Widen a byte range to whole sentences: start moves back to the start of
+        its sentence and end forward to the end of the sentence containing end - 1
+        """
+        start = self.find_sentence_start(start)
+        end = min(max(end, start), self.file_size)
+        for _, _, span_end in self.iter_sentence_spans(start):
+            if span_end >= end:
+                return start, span_end
+        return start, self.file_size
+
+    def can_follow(self):
+        """Whether the loaded file can be followed as it grows (plain text only)"""
+        return self.is_file_loaded() and not self.compression and self.document is None
+
+    def refresh_size(self):
+        """
+        Pick up bytes appended to the loaded file since it was opened or last
+        refreshed. Returns the number of new bytes, or -1 if the file was
+        truncated or replaced (e.g. a rotated log), in which case it has been
+        reopened and reading should start over.
+        """
+        with self.lock:
+            return self._refresh_size()
+
+    def _refresh_size(self):
+        if not self.can_follow():
+            return 0
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return 0  # Between a rotation's rename and the new file; try again later
+        opened = os.fstat(self.binary_handle.fileno())
+        if stat.st_ino != opened.st_ino or stat.st_size < self.file_size:
+            self.file_handle.close()
+            self._close_binary()
+            self._open_text(self.file_path)
+            return -1
+
+        grown = stat.st_size - self.file_size
+        if grown <= 0:
+            return 0
+        mapped = len(self.file_mmap) if self.file_mmap is not None else 0
+        if stat.st_size - mapped >= self.REMAP_BYTES or (mapped == 0 and self.file_mmap is None):
+            try:
+                new_map = mmap.mmap(self.binary_handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                new_map = None
+            if new_map is not None:
+                # Reads hold the lock, so nobody is slicing the old map
+                if self.file_mmap is not None:
+                    self.file_mmap.close()
+                self.file_mmap = new_map
+        self.file_size = stat.st_size
+        return grown
+
+    def follow_sentence_spans(self, start_position=0, should_stop=None, poll_interval=0.25,
+                              idle_flush_s=2.0, chunk_size=4096):
+        """
+        Like iter_sentence_spans, but at the end of the file wait for more to
+        be appended instead of stopping (until should_stop() is true). Only
+        the new bytes are read and segmented. A sentence at the end of the
+        file is held back until it is finished (a sentence terminator or a
+        newline), or until nothing has been appended for idle_flush_s.
+        If the file is truncated or replaced, reading starts over at 0.
+        """
+        if not self.can_follow():
+            raise ValueError("Only plain text files can be followed")
+        should_stop = should_stop or (lambda: False)
+        watcher = FileWatcher(self.file_path, poll_interval=poll_interval)
+        try:
+            position = start_position
+            held_since = None  # When an unfinished last sentence was first seen
+            while not should_stop():
+                held = False
+                for sentence, span_start, span_end in self.iter_sentence_spans(position, chunk_size):
+                    if span_end >= self.file_size and not _is_finished(sentence):
+                        if held_since is None:
+                            held_since = time.monotonic()
+                        if time.monotonic() - held_since < idle_flush_s:
+                            held = True
+                            break
+                    held_since = None
+                    yield sentence, span_start, span_end
+                    position = span_end
+                    if should_stop():
+                        return
+
+                # Wake up on the next append, or when a held sentence is due anyway
+                timeout = poll_interval
+                if held:
+                    timeout = min(timeout, max(0.0, held_since + idle_flush_s - time.monotonic()))
+                watcher.wait(timeout)
+                if self.refresh_size() < 0:
+                    position, held_since = 0, None
+        finally:
+            watcher.close()
+
     def close_file(self):
         """Close the currently opened file"""
-        if self.file_handle:
-            self.file_handle.close()
-            self.file_handle = None
-            self.file_path = None
-            self.file_size = 0
+        with self.lock:
+            self._close_binary()
+            if self.file_handle:
+                self.file_handle.close()
+                self.file_handle = None
+                self.file_path = None
+                self.file_size = 0
+                self.compression = None
+                self.document = None
     
     def get_line_at_position(self, position):
         """Get the full line at the given position"""
@@ -150,4 +455,52 @@ class FileService:
         
         self.file_handle.seek(0)
         content = self.file_handle.read(position)
-        return content.count('\n') + 1  # Line numbers start at 1
\ No newline at end of file
+        return content.count('\n') + 1  # Line numbers start at 1
+
+
+def _is_finished(sentence):
+    """Whether a sentence at the end of a growing file is complete"""
+    if sentence.endswith('\n'):
+        return True
+    terminator = SENTENCE_END_PATTERN.search(sentence)
+    return terminator is not None and terminator.end() == len(sentence)
+
+
+def utf8_boundary_before(data, end):
+    """Largest offset <= end that does not split a UTF-8 character"""
+    index = end
+    # Walk back over at most 3 continuation bytes to the lead byte
+    while index > 0 and end - index < 4 and (data[index - 1] & 0xC0) == 0x80:
+        index -= 1
+    if index == 0:
+        return end
+
+    lead = data[index - 1]
+    if lead < 0x80:
+        return end  # ASCII byte, nothing was cut
+
+    char_start = index - 1
+    return end if char_start + _sequence_length(lead) <= end else char_start
+
+
+def utf8_overhang(before, data):
+    """Number of bytes at the start of data that finish a character begun in before"""
+    joined = before + data[:3]
+    char_start = utf8_boundary_before(joined, len(before))
+    if char_start == len(before):
+        return 0
+    overhang = char_start + _sequence_length(joined[char_start]) - len(before)
+    # Only continuation bytes can finish it; anything else means the sequence was cut short
+    count = 0
+    while count < min(overhang, len(data)) and (data[count] & 0xC0) == 0x80:
+        count += 1
+    return count
+
+
+def _sequence_length(lead):
+    """Length of the UTF-8 sequence a lead byte starts"""
+    if lead >= 0xF0:
+        return 4
+    if lead >= 0xE0:
+        return 3
+    return 2
@@ -0,0 +1,104 @@
+# File watcher for following a file that is being appended to
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVE_SELF = 0x00000800
+IN_DELETE_SELF = 0x00000400
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVE_SELF | IN_DELETE_SELF
+
+
+def _load_inotify():
+    """libc's inotify functions, or None where inotify is not available"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _load_inotify()
+
+
+class FileWatcher:
+    """
+    Wakes up when a file changes. Uses inotify on Linux, so an append is
+    noticed as soon as it is written; elsewhere, or when inotify can't be
+    set up (e.g. the watch limit is reached), the file's size and mtime are
+    polled every poll_interval seconds.
+    """
+
+    def __init__(self, file_path, poll_interval=0.25, use_inotify=True):
+        self.file_path = str(file_path)
+        self.poll_interval = poll_interval
+        self._fd = None
+        self._last_stat = self._stat()
+        if use_inotify and _libc is not None:
+            self._fd = self._start_inotify()
+
+    @property
+    def mode(self):
+        """"inotify" or "polling\""""
+        return "inotify" if self._fd is not None else "polling"
+
+    def _start_inotify(self):
+        fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if _libc.inotify_add_watch(fd, os.fsencode(self.file_path), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds for a change; returns True if the file changed"""
+        if self._fd is not None:
+            readable, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+            if not readable:
+                return False
+            self._drain()
+            self._last_stat = self._stat()
+            return True
+
+        deadline = time.monotonic() + max(0.0, timeout)
+        while True:
+            current = self._stat()
+            if current != self._last_stat:
+                self._last_stat = current
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.poll_interval, remaining))
+
+    def _drain(self):
+        """Read the pending events; only the fact that something happened matters"""
+        try:
+            while os.read(self._fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,343 @@
+# Library catalog: per-file statistics for whole directories of books, kept on disk
+import codecs
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# Add the src directory to the path to enable imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from services.file_service import FileService
+from services.document_reader import DOCUMENT_FORMATS, detect_document_format
+from services.compressed_reader import detect_compression
+from utils.text_processing import WORD_PATTERN, estimate_reading_time
+
+
+# Bump when the table layout or the statistics change so catalogs are rebuilt
+CATALOG_VERSION = 1
+
+LIBRARY_EXTENSIONS = {'.txt', '.text', '.log', '.gz', '.bz2', '.zst'} | set(DOCUMENT_FORMATS)
+
+READ_BLOCK = 1024 * 1024  # Bytes counted at a time; files are never read whole
+COMMIT_EVERY = 500  # Scanned files written per transaction
+
+COLUMNS = ("path", "size", "mtime_ns", "format", "encoding", "text_bytes", "lines", "words",
+           "reading_seconds", "last_position", "error")
+
+
+class LibraryService:
+    """
+    Catalog of the readable files under a set of directories: size, mtime,
+    format, encoding, line and word counts, estimated reading time and the
+    last reading position, kept in an SQLite file so the library view can
+    list tens of thousands of files without opening any of them.
+
+    scan() walks the directories and only reads files that are new or whose
+    size or mtime changed since the last scan, spread over a thread pool;
+    files that disappeared are dropped. Reading positions are taken from
+    the ConfigService on every scan, since they change without the file
+    changing.
+    """
+
+    def __init__(self, config_service, db_path="config/library.sqlite3", index_dir="config/indexes",
+                 workers=4, words_per_minute=150):
+        self.config_service = config_service
+        self.db_path = Path(db_path)
+        self.index_dir = index_dir  # Compressed and document files keep their indexes here
+        self.workers = max(1, workers)
+        self.words_per_minute = words_per_minute
+        self._write_lock = threading.Lock()  # One scan writes at a time
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        db = self._connect()
+        try:
+            if db.execute("PRAGMA user_version").fetchone()[0] != CATALOG_VERSION:
+                db.execute("DROP TABLE IF EXISTS files")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, format TEXT, encoding TEXT, "
+                "text_bytes INTEGER, lines INTEGER, words INTEGER, reading_seconds INTEGER, "
+                "last_position INTEGER, error TEXT) WITHOUT ROWID"
+            )
+            db.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+            db.commit()
+        finally:
+            db.close()
+
+    def _connect(self):
+        """A new connection; sqlite3 connections are not shared between threads"""
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.execute("PRAGMA journal_mode = WAL")  # The view reads while a scan writes
+        return db
+
+    # Listing
+
+    def entries(self, directory=None):
+        """
+        Catalogued files (under directory, if given) sorted by path, as
+        dicts of the catalog columns plus "progress" (0.0-1.0 read).
+        Only the catalog is read, never the files.
+        """
+        query = f"SELECT {', '.join(COLUMNS)} FROM files"
+        params = ()
+        if directory is not None:
+            prefix = os.path.join(str(Path(directory).resolve()), "")
+            # Paths sort together under their directory; a range scan of the primary key
+            query += " WHERE path >= ? AND path < ?"
+            params = (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        query += " ORDER BY path"
+        db = self._connect()
+        try:
+            return [_entry(row) for row in db.execute(query, params)]
+        finally:
+            db.close()
+
+    def entry(self, file_path):
+        """The catalog entry for one file, or None"""
+        db = self._connect()
+        try:
+            row = db.execute(f"SELECT {', '.join(COLUMNS)} FROM files WHERE path = ?",
+                             (str(Path(file_path).resolve()),)).fetchone()
+        finally:
+            db.close()
+        return _entry(row) if row is not None else None
+
+    def totals(self):
+        """Files, bytes, words and reading seconds across the catalog"""
+        db = self._connect()
+        try:
+            files, size, words, seconds = db.execute(
+                "SELECT COUNT(*), SUM(size), SUM(words), SUM(reading_seconds) FROM files").fetchone()
+        finally:
+            db.close()
+        return {"files": files, "bytes": size or 0, "words": words or 0, "reading_seconds": seconds or 0}
+
+    # Scanning
+
+    def scan(self, directories, on_progress=None, stop_event=None):
+        """
+        Bring the catalog up to date with directories (recursively).
+        on_progress(done, total) is called as changed files are read; a set
+        stop_event ends the scan early, keeping what was read so far.
+        Returns counts: files found, read, removed, positions updated and
+        the seconds it took.
+        """
+        started = time.monotonic()
+        roots = [str(Path(directory).resolve()) for directory in directories]
+        positions = self.config_service.load_config().get("last_positions", {})
+
+        with self._write_lock:
+            db = self._connect()
+            try:
+                known = {row[0]: row[1:] for row in
+                         db.execute("SELECT path, size, mtime_ns, last_position FROM files")}
+                found = set()
+                changed = []
+                moved_on = []
+                for root in roots:
+                    for path, stat in _walk(root):
+                        found.add(path)
+                        row = known.get(path)
+                        if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+                            changed.append((path, stat.st_size, stat.st_mtime_ns))
+                        elif row[2] != positions.get(path):
+                            moved_on.append((positions.get(path), path))
+
+                removed = [(path,) for path in known
+                           if path not in found and any(_is_under(path, root) for root in roots)]
+                db.executemany("DELETE FROM files WHERE path = ?", removed)
+                db.executemany("UPDATE files SET last_position = ? WHERE path = ?", moved_on)
+                db.commit()
+
+                read = self._read_changed(db, changed, positions, on_progress, stop_event)
+            finally:
+                db.close()
+
+        return {
+            "files": len(found),
+            "read": read,
+            "removed": len(removed),
+            "positions_updated": len(moved_on),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+
+    def _read_changed(self, db, changed, positions, on_progress, stop_event):
+        """Compute statistics of the changed files on the pool and store them in batches"""
+        if not changed:
+            return 0
+        insert = f"INSERT OR REPLACE INTO files ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        batch = []
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="library-scan") as pool:
+            futures = [pool.submit(self._statistics, path, size, mtime_ns)
+                       for path, size, mtime_ns in changed]
+            try:
+                for future in as_completed(futures):
+                    stats = future.result()
+                    stats["last_position"] = positions.get(stats["path"])
+                    batch.append(tuple(stats[column] for column in COLUMNS))
+                    done += 1
+                    if len(batch) >= COMMIT_EVERY:
+                        db.executemany(insert, batch)
+                        db.commit()
+                        batch = []
+                    if on_progress is not None:
+                        on_progress(done, len(changed))
+                    if stop_event is not None and stop_event.is_set():
+                        break
+            finally:
+                for future in futures:
+                    future.cancel()
+                db.executemany(insert, batch)
+                db.commit()
+        return done
+
+    def _statistics(self, path, size, mtime_ns):
+        """Catalog row for one file (unreadable files are kept, with the error)"""
+        stats = dict.fromkeys(COLUMNS)
+        stats.update(path=path, size=size, mtime_ns=mtime_ns,
+                     format=detect_compression(path) or detect_document_format(path) or "text")
+        try:
+            stats.update(file_statistics(path, self.index_dir))
+            stats["reading_seconds"] = estimate_reading_time(None, self.words_per_minute,
+                                                             word_count=stats["words"])
+        except Exception as e:
+            stats["error"] = str(e) or type(e).__name__
+        return stats
+
+
+def file_statistics(file_path, index_dir="config/indexes"):
+    """
+    Encoding, line and word counts and readable size of a file, read in
+    blocks as the reader reads it (compressed files decompressed, documents
+    as their extracted text). The encoding is "ascii", "utf-8",
+    "utf-8-sig", "utf-16" (by its byte order mark) or "unknown" when the
+    bytes are not valid UTF-8.
+    """
+    file_service = FileService(index_dir=index_dir)
+    file_service.load_file(file_path)
+    try:
+        total = file_service.get_file_size()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        encoding = "ascii"
+        lines = words = 0
+        tail = ""  # A word that may continue in the next block
+        last_byte = b"\n"
+        position = 0
+        while position < total:
+            block = file_service.read_bytes(position, READ_BLOCK)
+            if not block:
+                break
+            if position == 0:
+                if block.startswith(codecs.BOM_UTF8):
+                    encoding = "utf-8-sig"
+                elif block.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+                    encoding = "utf-16"
+            position += len(block)
+            lines += block.count(b"\n")
+            last_byte = block[-1:]
+
+            if encoding == "ascii" and not block.isascii():
+                encoding = "utf-8"
+            try:
+                text = decoder.decode(block, final=position >= total)
+            except UnicodeDecodeError:
+                if encoding in ("ascii", "utf-8"):
+                    encoding = "unknown"
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                text = decoder.decode(block, final=position >= total)
+
+            text = tail + text
+            cut = len(text)
+            while cut > 0 and (text[cut - 1].isalnum() or text[cut - 1] == '_'):
+                cut -= 1
+            words += len(WORD_PATTERN.findall(text, 0, cut))
+            tail = text[cut:]
+        words += len(WORD_PATTERN.findall(tail))
+        if total and last_byte != b"\n":
+            lines += 1  # Last line without a newline
+    finally:
+        file_service.close_file()
+    return {"encoding": encoding, "text_bytes": total, "lines": lines, "words": words}
+
+
+def _walk(root):
+    """(resolved path, stat) of every library file under root; symlinked directories are not followed"""
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            with os.scandir(directory) as listing:
+                for entry in listing:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(entry.path)
+                        elif entry.is_file() and _is_library_file(entry.name):
+                            path = entry.path if not entry.is_symlink() else os.path.realpath(entry.path)
+                            yield path, entry.stat()
+                    except OSError:
+                        continue  # Vanished or unreadable while listing
+        except OSError:
+            continue
+
+
+def _is_library_file(name):
+    return os.path.splitext(name)[1].lower() in LIBRARY_EXTENSIONS
+
+
+def _is_under(path, root):
+    return path.startswith(os.path.join(root, ""))
+
+
+def _entry(row):
+    entry = dict(zip(COLUMNS, row))
+    text_bytes = entry["text_bytes"]
+    position = entry["last_position"]
+    entry["progress"] = min(1.0, position / text_bytes) if text_bytes and position else 0.0
+    return entry
+
+
+def create_library_service(config_service):
+    """LibraryService with its store and settings from the configuration"""
+    settings = config_service.get_library_settings()
+    return LibraryService(
+        config_service,
+        db_path=config_service.config_dir / "library.sqlite3",
+        index_dir=config_service.config_dir / "indexes",
+        workers=settings.get('workers', 4),
+        words_per_minute=settings.get('words_per_minute', 150)
+    )
+
+
+def run_scan(directories, config_path="config/app_config.json"):
+    """Headless: update the library catalog for directories (default from config) and list it"""
+    from services.config_service import ConfigService
+
+    config_service = ConfigService(config_path)
+    library = create_library_service(config_service)
+    directories = directories or config_service.get_library_settings().get('dirs', [])
+    if not directories:
+        raise ValueError("No library directories given or configured")
+
+    def show_progress(done, total):
+        if done == total or done % 100 == 0:
+            print(f"\rReading {done}/{total} changed files", end="", flush=True)
+
+    result = library.scan(directories, on_progress=show_progress)
+    if result["read"]:
+        print()
+    started = time.monotonic()
+    entries = [entry for directory in directories for entry in library.entries(directory)]
+    listed = time.monotonic() - started
+    for entry in entries:
+        if entry["error"]:
+            print(f"{entry['path']}: {entry['error']}")
+            continue
+        minutes = (entry["reading_seconds"] or 0) / 60
+        print(f"{entry['path']}: {entry['words']} words, {entry['lines']} lines, {entry['encoding']}, "
+              f"{minutes:.0f} min, {entry['progress'] * 100:.0f}% read")
+    print(f"{result['files']} files ({result['read']} read, {result['removed']} removed) "
+          f"scanned in {result['seconds']:.2f}s; catalog listed in {listed * 1000:.0f} ms")
@@ -0,0 +1,208 @@
+# Playback scheduler: one worker thread and an explicit playback state machine
+import threading
+
+
+# Playback states
+IDLE = "idle"            # Nothing to play (never started, finished or stopped)
+BUFFERING = "buffering"  # Started; waiting for audio to be synthesized
+PLAYING = "playing"      # Audio is being heard
+PAUSED = "paused"        # Stopped by the user; the position is kept
+SEEKING = "seeking"      # Restarting at a new position; waiting for its first audio
+
+ACTIVE_STATES = (BUFFERING, PLAYING, SEEKING)
+
+
+class PlaybackSession:
+    """
+    Handle a playback job gets from the scheduler. Jobs check cancelled (or
+    wait() on it instead of sleeping) and report their progress through the
+    scheduler's buffering()/playing(); reports from a cancelled session are
+    ignored, so a job that is winding down can never change the state.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def wait(self, seconds):
+        """Wait up to seconds; returns True as soon as the session is cancelled"""
+        return self._cancelled.wait(seconds)
+
+    def _cancel(self):
+        self._cancelled.set()
+
+
+class PlaybackScheduler:
+    """
+    Runs playback jobs one at a time on a single long-lived worker thread
+    and tracks the playback state:
+
+        idle/paused --play()--> buffering --playing()--> playing
+        any         --seek()--> seeking   --playing()--> playing
+        playing     --buffering()--> buffering (next audio not ready in time)
+        active      --pause()--> paused,  --stop()--> idle
+        active      --job returns--> idle
+
+    A job is a callable taking a PlaybackSession. Starting a job cancels the
+    one that is running; since jobs share the worker, the next job only
+    begins after the previous one has returned, so two jobs never overlap
+    even when a caller stops waiting for a slow one. stop_event (the TTS
+    service's stop signal) is set on cancellation to cut the current sound
+    short and cleared before each job starts. Listeners are called as
+    listener(old_state, new_state) from the thread making the transition.
+    """
+
+    def __init__(self, stop_event=None, name="playback"):
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.name = name
+        self._condition = threading.Condition()
+        self._state = IDLE
+        self._pending = None  # (job, session) waiting for the worker
+        self._session = None  # Session of the job running now
+        self._listeners = []
+        self._thread = None
+        self._closed = False
+
+    @property
+    def state(self):
+        return self._state
+
+    def is_active(self):
+        """Whether playback is started (buffering, playing or seeking)"""
+        return self._state in ACTIVE_STATES
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def play(self, job):
+        """Run job in place of whatever is playing"""
+        return self._submit(job, BUFFERING)
+
+    def seek(self, job):
+        """Like play(), for restarting at a new position"""
+        return self._submit(job, SEEKING)
+
+    def _submit(self, job, state):
+        session = PlaybackSession()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The playback scheduler is closed")
+            self._cancel_locked()
+            self._pending = (job, session)
+            changes = [self._set_state_locked(state)]
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+        self._notify(changes)
+        return session
+
+    def pause(self, timeout=2.0):
+        """
+        Stop playback, keeping the position. Returns True once the job has
+        returned, False if it is still winding down after timeout (it can't
+        overlap the next job either way). timeout=None waits indefinitely.
+        """
+        return self._halt(PAUSED, timeout)
+
+    def stop(self, timeout=2.0):
+        """Stop playback and go idle; see pause()"""
+        return self._halt(IDLE, timeout)
+
+    def _halt(self, end_state, timeout):
+        with self._condition:
+            changes = []
+            if self._pending is not None:
+                self._pending = None
+                changes.append(self._set_state_locked(end_state))
+            if self._session is not None:
+                self._cancel_locked()
+                changes.append(self._set_state_locked(end_state))
+            elif self._state == PAUSED and end_state == IDLE:
+                changes.append(self._set_state_locked(IDLE))
+        self._notify(changes)
+        return self.wait(timeout)
+
+    def wait(self, timeout=None):
+        """Block until no job is running or pending; returns False on timeout"""
+        if threading.current_thread() is self._thread:
+            return self._session is None  # A job can't wait for itself
+        with self._condition:
+            return self._condition.wait_for(lambda: self._session is None and self._pending is None, timeout)
+
+    def buffering(self):
+        """Called by the running job while it waits for audio"""
+        self._report(BUFFERING)
+
+    def playing(self):
+        """Called by the running job when its audio starts"""
+        self._report(PLAYING)
+
+    def _report(self, state):
+        with self._condition:
+            session = self._session
+            if session is None or session.cancelled or threading.current_thread() is not self._thread:
+                return
+            if state == BUFFERING and self._state == SEEKING:
+                return  # Still seeking until the first audio plays
+            changes = [self._set_state_locked(state)]
+        self._notify(changes)
+
+    def close(self, timeout=2.0):
+        """Stop playback and end the worker thread"""
+        self.stop(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _cancel_locked(self):
+        """Cancel the running job (lock held)"""
+        if self._session is not None and not self._session.cancelled:
+            self._session._cancel()
+            self.stop_event.set()
+
+    def _set_state_locked(self, state):
+        """Change state (lock held); returns the (old, new) pair to notify"""
+        old, self._state = self._state, state
+        return (old, state)
+
+    def _notify(self, changes):
+        for old, new in changes:
+            if old != new:
+                for listener in list(self._listeners):
+                    try:
+                        listener(old, new)
+                    except Exception as e:
+                        print(f"Playback state listener failed: {e}")
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                # Sleep until there is work; no polling
+                self._condition.wait_for(lambda: self._pending is not None or self._closed)
+                if self._pending is None:
+                    return
+                job, session = self._pending
+                self._pending = None
+                self._session = session
+                self.stop_event.clear()
+
+            try:
+                job(session)
+            except Exception as e:
+                print(f"Playback error: {e}")
+            finally:
+                with self._condition:
+                    self._session = None
+                    changes = []
+                    if self._pending is None and not session.cancelled:
+                        changes.append(self._set_state_locked(IDLE))  # Played to the end
+                    self._condition.notify_all()
+                self._notify(changes)
@@ -0,0 +1,246 @@
+# Resource policy for the Piper processes that do the synthesis
+import asyncio
+import math
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager, nullcontext
+
+try:
+    import resource  # CPU time of finished child processes (POSIX)
+except ImportError:
+    resource = None
+
+
+# Thread-count variables honoured by onnxruntime builds that use OpenMP and by
+# the BLAS libraries some Piper builds link against
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# Windows has priority classes instead of nice levels
+_WINDOWS_PRIORITY_CLASSES = (
+    (15, "IDLE_PRIORITY_CLASS"),
+    (1, "BELOW_NORMAL_PRIORITY_CLASS"),
+)
+
+
+class ResourcePolicy:
+    """
+    How much of the machine synthesis may take.
+
+    nice            Niceness added to every Piper process (0 = same priority
+                    as the app; Windows maps >=1 to below-normal and >=15 to
+                    idle priority)
+    ionice_class    Linux I/O scheduling class for Piper: "idle",
+                    "best-effort" (with ionice_level 0-7) or "" to leave it
+    onnx_threads    Threads each Piper process may use (0 = its default,
+                    usually one per core)
+    max_concurrent_jobs
+                    Piper runs allowed at the same time across the whole app
+                    (live playback, look-ahead, resynthesis, server, export);
+                    0 = unlimited
+    just_in_time    Synthesize only as far ahead as the measured real-time
+                    factor requires instead of the configured look-ahead
+
+    It also meters the cost: CPU seconds of this process and of every Piper
+    process against the seconds of audio Piper produced, reported as CPU
+    seconds per minute of audio.
+    """
+
+    # Look-ahead kept above the strict minimum in just-in-time mode, to absorb
+    # chunks that take longer than average
+    JIT_SAFETY = 1.5
+    # Weight of the newest chunk in the real-time factor estimate
+    RTF_SMOOTHING = 0.2
+
+    def __init__(self, nice=0, ionice_class="", ionice_level=7, onnx_threads=0, max_concurrent_jobs=0,
+                 just_in_time=False):
+        self._lock = threading.Lock()
+        self._slots = None
+        self.configure(nice=nice, ionice_class=ionice_class, ionice_level=ionice_level,
+                       onnx_threads=onnx_threads, max_concurrent_jobs=max_concurrent_jobs,
+                       just_in_time=just_in_time)
+        self.reset_meter()
+
+    def configure(self, nice=None, ionice_class=None, ionice_level=None, onnx_threads=None,
+                  max_concurrent_jobs=None, just_in_time=None, **_ignored):
+        """Change the policy (usually the "resources" config section); applies to new Piper processes"""
+        if nice is not None:
+            self.nice = max(0, min(19, int(nice)))
+        if ionice_class is not None:
+            if ionice_class not in ("", "idle", "best-effort"):
+                raise ValueError(f"Unknown I/O class: {ionice_class!r}")
+            self.ionice_class = ionice_class
+        if ionice_level is not None:
+            self.ionice_level = max(0, min(7, int(ionice_level)))
+        if onnx_threads is not None:
+            self.onnx_threads = max(0, int(onnx_threads))
+        if max_concurrent_jobs is not None:
+            self.max_concurrent_jobs = max(0, int(max_concurrent_jobs))
+            # Jobs holding a slot of the old semaphore finish on it
+            self._slots = threading.BoundedSemaphore(self.max_concurrent_jobs) if self.max_concurrent_jobs else None
+        if just_in_time is not None:
+            self.just_in_time = bool(just_in_time)
+
+    # Piper processes
+
+    def wrap_command(self, cmd):
+        """
+        Prefix a Piper command line with nice and ionice as the policy asks
+        (POSIX). Left alone when Piper itself is missing, so that still fails
+        with FileNotFoundError rather than inside the wrapper.
+        """
+        cmd = list(cmd)
+        if os.name == "nt" or shutil.which(cmd[0]) is None:
+            return cmd
+        prefix = []
+        if self.nice and shutil.which("nice"):
+            prefix += [shutil.which("nice"), "-n", str(self.nice)]
+        if self.ionice_class and sys.platform.startswith("linux") and shutil.which("ionice"):
+            if self.ionice_class == "idle":
+                prefix += [shutil.which("ionice"), "-c", "3"]
+            else:
+                prefix += [shutil.which("ionice"), "-c", "2", "-n", str(self.ionice_level)]
+        return prefix + cmd
+
+    def popen_kwargs(self):
+        """Extra subprocess arguments (thread limits, Windows priority) for starting Piper"""
+        kwargs = {}
+        if self.onnx_threads:
+            env = dict(os.environ)
+            for name in THREAD_ENV_VARS:
+                env[name] = str(self.onnx_threads)
+            kwargs["env"] = env
+        if self.nice and os.name == "nt":
+            for level, name in _WINDOWS_PRIORITY_CLASSES:
+                if self.nice >= level:
+                    kwargs["creationflags"] = getattr(subprocess, name, 0)
+                    break
+        return kwargs
+
+    def job_slot(self):
+        """Context manager held for the duration of one Piper run"""
+        slots = self._slots
+        if slots is None:
+            return nullcontext()
+        return _held(slots)
+
+    @asynccontextmanager
+    async def job_slot_async(self):
+        """job_slot() for coroutines; waits for the slot without blocking the event loop"""
+        slots = self._slots
+        if slots is None:
+            yield
+            return
+        acquiring = asyncio.get_running_loop().run_in_executor(None, slots.acquire)
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # Give the slot back once the pending acquire gets it
+            acquiring.add_done_callback(lambda _: slots.release())
+            raise
+        try:
+            yield
+        finally:
+            slots.release()
+
+    # Look-ahead
+
+    def lookahead(self, requested):
+        """
+        Chunks to synthesize ahead of playback. Just-in-time mode keeps only
+        enough for synthesis to stay ahead of playback at the measured
+        real-time factor (synthesis seconds per second of audio).
+        """
+        requested = max(1, requested)
+        rtf = self.real_time_factor
+        if not self.just_in_time or rtf is None:
+            return requested
+        return max(1, min(requested, math.ceil(rtf * self.JIT_SAFETY)))
+
+    # Metering
+
+    def record_synthesis(self, synthesis_seconds, audio_seconds):
+        """Account one Piper run: how long it took and how much audio it made"""
+        if audio_seconds <= 0:
+            return
+        with self._lock:
+            self._audio_seconds += audio_seconds
+            self._synthesis_seconds += synthesis_seconds
+            self._chunks += 1
+            rtf = synthesis_seconds / audio_seconds
+            if self._rtf is None:
+                self._rtf = rtf
+            else:
+                self._rtf += self.RTF_SMOOTHING * (rtf - self._rtf)
+
+    @property
+    def real_time_factor(self):
+        """Smoothed synthesis seconds per second of audio, or None before the first chunk"""
+        return self._rtf
+
+    def reset_meter(self, worker_cpu_seconds=0.0):
+        """Start metering from now (worker_cpu_seconds as for report())"""
+        with self._lock:
+            self._cpu_start = process_cpu_seconds() + worker_cpu_seconds
+            self._audio_seconds = 0.0
+            self._synthesis_seconds = 0.0
+            self._chunks = 0
+            self._rtf = None
+
+    def report(self, worker_cpu_seconds=0.0):
+        """
+        CPU used since the meter was reset against the audio produced.
+        worker_cpu_seconds is the CPU time of Piper processes that are still
+        running (warm voice workers); finished ones are already included.
+        """
+        with self._lock:
+            cpu = process_cpu_seconds() + worker_cpu_seconds - self._cpu_start
+            audio = self._audio_seconds
+            report = {
+                "cpu_seconds": round(cpu, 3),
+                "audio_seconds": round(audio, 3),
+                "synthesis_seconds": round(self._synthesis_seconds, 3),
+                "chunks": self._chunks,
+                "cpu_seconds_per_audio_minute": round(cpu / (audio / 60.0), 3) if audio else None,
+                "real_time_factor": round(self._rtf, 3) if self._rtf is not None else None,
+            }
+        report["policy"] = {
+            "nice": self.nice,
+            "ionice_class": self.ionice_class,
+            "onnx_threads": self.onnx_threads,
+            "max_concurrent_jobs": self.max_concurrent_jobs,
+            "just_in_time": self.just_in_time,
+        }
+        return report
+
+
+@contextmanager
+def _held(semaphore):
+    semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+def process_cpu_seconds():
+    """CPU seconds of this process plus its finished (waited-for) child processes"""
+    if resource is None:
+        return time.process_time()
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def pid_cpu_seconds(pid):
+    """CPU seconds a running process has used so far (Linux; 0.0 elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/stat", 'r') as f:
+            # Fields after the parenthesised command name; utime and stime are the 12th and 13th
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0.0
@@ -0,0 +1,107 @@
+# Search service for finding passages in large files without loading them
+import re
+import threading
+from collections import namedtuple
+
+
+SearchHit = namedtuple('SearchHit', ['offset', 'end', 'snippet'])
+
+
+class SearchService:
+    """
+    Full-text search over the loaded file.
+    The file is scanned in large chunks through FileService.read_bytes (an
+    mmap slice for plain files) with a bytes regex. Consecutive chunks
+    overlap so matches crossing a chunk boundary are still found, and hits
+    are yielded as soon as they are found instead of after the whole scan.
+    """
+
+    def __init__(self, file_service, chunk_size=4 * 1024 * 1024, max_match_bytes=1024, snippet_bytes=60):
+        self.file_service = file_service
+        self.chunk_size = chunk_size
+        self.max_match_bytes = max_match_bytes  # Longest match guaranteed across chunk edges
+        self.snippet_bytes = snippet_bytes
+
+    def compile_query(self, query, regex=False, ignore_case=True):
+        """
+        Compile a query into a bytes pattern.
+        Case-insensitive matching on bytes only folds ASCII letters, which keeps
+        the scan fast; CJK text has no case anyway.
+        """
+        if not query:
+            raise ValueError("Search query is empty")
+        pattern = query.encode('utf-8')
+        if not regex:
+            pattern = re.escape(pattern)
+        try:
+            return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            raise ValueError(f"Invalid search pattern: {e}")
+
+    def iter_search(self, query, regex=False, ignore_case=True, start_pos=0, stop_event=None, max_hits=None):
+        """Yield SearchHit tuples in file order, one chunk at a time"""
+        pattern = self.compile_query(query, regex, ignore_case)
+        overlap = max(self.max_match_bytes, len(query.encode('utf-8')))
+        with self.file_service.lock:
+            file_path = self.file_service.file_path
+            file_size = self.file_service.get_file_size()
+
+        position = max(0, start_pos)
+        last_end = position
+        hits = 0
+        while position < file_size:
+            if stop_event is not None and stop_event.is_set():
+                return
+
+            with self.file_service.lock:
+                if self.file_service.file_path != file_path:
+                    return  # Another file was loaded (e.g. the playlist moved on)
+                data = self.file_service.read_bytes(position, self.chunk_size + overlap)
+            if not data:
+                return
+            is_last_chunk = position + len(data) >= file_size
+
+            for match in pattern.finditer(data):
+                # Matches starting in the overlap are reported by the next chunk
+                if not is_last_chunk and match.start() >= self.chunk_size:
+                    break
+                offset = position + match.start()
+                if offset < last_end or match.end() == match.start():
+                    continue
+
+                last_end = position + match.end()
+                yield SearchHit(offset, last_end, self._snippet(data, match.start(), match.end()))
+
+                hits += 1
+                if max_hits is not None and hits >= max_hits:
+                    return
+
+            position += self.chunk_size
+
+    def _snippet(self, data, start, end):
+        """A single-line excerpt around a match"""
+        context = data[max(0, start - self.snippet_bytes):end + self.snippet_bytes]
+        text = context.decode('utf-8', errors='ignore')
+        return " ".join(text.split())
+
+    def search_async(self, query, on_hit, on_done=None, regex=False, ignore_case=True, max_hits=10000):
+        """
+        Run a search in a background thread, calling on_hit(hit) for each hit and
+        on_done(hit_count, error) at the end. Returns an Event that cancels it.
+        """
+        stop_event = threading.Event()
+
+        def worker():
+            count = 0
+            error = None
+            try:
+                for hit in self.iter_search(query, regex, ignore_case, stop_event=stop_event, max_hits=max_hits):
+                    on_hit(hit)
+                    count += 1
+            except Exception as e:
+                error = e
+            if on_done is not None:
+                on_done(count, error)
+
+        threading.Thread(target=worker, daemon=True).start()
+        return stop_event
@@ -0,0 +1,174 @@
+# Session snapshots for resuming exactly where the last run stopped
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+# Bump when the snapshot layout changes so old snapshots are ignored
+SNAPSHOT_VERSION = 1
+
+
+class SessionService:
+    """
+    Saves what a relaunch needs to continue immediately: the open file (with
+    its size and mtime, so a changed file is not resumed), the exact reading
+    position, the playlist and its index, whether it was playing, and the
+    audio of the next few sentences copied from the synthesis cache. The
+    audio is written to a new session-<stamp>.pcm first and session.json,
+    which names it, is replaced atomically afterwards, so a crash mid-save
+    leaves the previous snapshot intact.
+    Launch-to-audio times are kept in launches.json for comparing warm and
+    cold starts.
+    """
+
+    def __init__(self, session_dir="config/session", max_chunks=3, max_launches=20):
+        self.session_dir = Path(session_dir)
+        self.snapshot_path = self.session_dir / "session.json"
+        self.launches_path = self.session_dir / "launches.json"
+        self.max_chunks = max_chunks
+        self.max_launches = max_launches
+        self._lock = threading.Lock()
+
+    def save(self, controller, playing=None, synthesize=False):
+        """
+        Snapshot the controller's file, position, playlist and upcoming audio.
+        Only audio already in the synthesis cache is saved unless synthesize is
+        set (for periodic snapshots taken in the background), which
+        synthesizes the upcoming sentences first; they then stay cached for
+        the snapshot taken on exit.
+        """
+        file_path = controller.file_service.file_path
+        saved = time.time()
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "saved": saved,
+            "audio_file": f"session-{int(saved * 1000)}.pcm",
+            "file_path": file_path,
+            "position": 0,
+            "playlist": list(controller.playlist),
+            "playlist_index": controller.playlist_index,
+            "playing": controller.is_playing() if playing is None else bool(playing),
+            "chunks": [],
+        }
+        audio = []
+        if file_path:
+            stat = os.stat(file_path)
+            snapshot["file_size"] = stat.st_size
+            snapshot["file_mtime"] = stat.st_mtime
+            position = controller.config_service.get_last_position(file_path) or 0
+            snapshot["position"] = position
+            if self.max_chunks > 0:
+                sentences = controller.upcoming_sentences(position, self.max_chunks)
+                if synthesize:
+                    for sentence in sentences:
+                        for buffer in controller.tts_service.presynthesize(sentence, file_path):
+                            buffer.release()
+                audio = controller.tts_service.export_cached_audio(sentences, self.max_chunks)
+
+        pcm_parts = []
+        offset = 0
+        for chunk in audio:
+            pcm = chunk.pop("pcm")
+            chunk["offset"], chunk["nbytes"] = offset, len(pcm)
+            offset += len(pcm)
+            pcm_parts.append(pcm)
+            snapshot["chunks"].append(chunk)
+
+        with self._lock:
+            self.session_dir.mkdir(parents=True, exist_ok=True)
+            self._write_atomic(self.session_dir / snapshot["audio_file"], b"".join(pcm_parts))
+            self._write_atomic(self.snapshot_path, json.dumps(snapshot).encode('utf-8'))
+            self._remove_audio_files(keep=snapshot["audio_file"])
+        return snapshot
+
+    def load(self):
+        """The last snapshot, or None if there is none or its file has changed since"""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return None
+
+        file_path = snapshot.get("file_path")
+        if file_path:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                return None
+            if stat.st_size != snapshot.get("file_size") or stat.st_mtime != snapshot.get("file_mtime"):
+                # The text changed, so the saved audio may not match it any more
+                snapshot["chunks"] = []
+                snapshot["position"] = min(snapshot.get("position", 0), stat.st_size)
+        return snapshot
+
+    def restore_audio(self, tts_service, snapshot):
+        """Load the snapshot's audio into the synthesis cache; returns the number of chunks restored"""
+        chunks = snapshot.get("chunks") or []
+        if not chunks:
+            return 0
+        try:
+            with open(self.session_dir / snapshot["audio_file"], 'rb') as f:
+                data = f.read()
+        except IOError:
+            return 0
+        for chunk in chunks:
+            chunk["pcm"] = data[chunk["offset"]:chunk["offset"] + chunk["nbytes"]]
+            if len(chunk["pcm"]) != chunk["nbytes"]:
+                return 0  # Snapshot and audio file don't belong together
+
+        # Open the mixer at the audio's format now rather than on the first sentence
+        tts_service.prepare_output(chunks[0]["sample_rate"], chunks[0]["channels"])
+        return tts_service.import_cached_audio(chunks)
+
+    def record_launch(self, seconds, restored_chunks):
+        """Remember how long a launch took to start speaking"""
+        with self._lock:
+            launches = self.launches()
+            launches.append({"time": time.time(), "seconds": round(seconds, 3), "restored_chunks": restored_chunks})
+            self.session_dir.mkdir(parents=True, exist_ok=True)
+            self._write_atomic(self.launches_path, json.dumps(launches[-self.max_launches:], indent=2).encode('utf-8'))
+
+    def launches(self):
+        """Recorded launches, oldest first"""
+        try:
+            with open(self.launches_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return []
+
+    def clear(self):
+        """Forget the snapshot"""
+        with self._lock:
+            try:
+                self.snapshot_path.unlink()
+            except OSError:
+                pass
+            self._remove_audio_files()
+
+    def _remove_audio_files(self, keep=None):
+        for path in self.session_dir.glob("session-*.pcm"):
+            if path.name != keep:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _write_atomic(self, path, data):
+        fd, temp_path = tempfile.mkstemp(dir=self.session_dir, prefix=path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
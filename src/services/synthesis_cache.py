@@ -0,0 +1,139 @@
+# Synthesis cache for reusing finished audio chunks across playback sessions
+import threading
+from collections import OrderedDict
+
+
+class CachedPCM:
+    """
+    A pinned reference to a cached PCMBuffer.
+    It exposes the same read-only interface as PCMBuffer. release() unpins the
+    entry instead of returning memory to the pool, so it can be passed to
+    anything that consumes a PCMBuffer (e.g. TTSService.play_pcm). Cached audio
+    is shared: never modify it in place.
+    """
+
+    def __init__(self, cache, entry):
+        self._cache = cache
+        self._entry = entry
+        self._buffer = entry.buffer
+
+    def __getattr__(self, name):
+        # data, samples(), nbytes, sample_rate, channels, num_frames, duration...
+        return getattr(self._buffer, name)
+
+    def release(self):
+        if self._entry is not None:
+            entry = self._entry
+            self._entry = None
+            self._cache._unpin(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class _CacheEntry:
+    __slots__ = ('key', 'buffer', 'pins', 'evicted')
+
+    def __init__(self, key, buffer):
+        self.key = key
+        self.buffer = buffer
+        self.pins = 0
+        self.evicted = False
+
+
+class SynthesisCache:
+    """
+    LRU cache of post-processed audio keyed by everything that affects it
+    (voice, parameters and text). Entries are PCMBuffers from the shared
+    AudioBufferPool, so cached audio counts against the same memory budget
+    as queued audio; max_bytes bounds the cache's share of it. Entries that
+    are in use (pinned) are never freed until their last user releases them.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get a pinned CachedPCM for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            entry.pins += 1
+            return CachedPCM(self, entry)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, buffer):
+        """
+        Hand a buffer over to the cache and get a pinned CachedPCM back.
+        If caching is disabled or the chunk is too large, the buffer itself is
+        returned unchanged (the caller still releases it as usual).
+        """
+        if self.max_bytes <= 0 or buffer.capacity > self.max_bytes:
+            return buffer
+
+        with self._lock:
+            existing = self._entries.pop(key, None)
+            if existing is not None:
+                self._drop(existing)
+
+            entry = _CacheEntry(key, buffer)
+            entry.pins = 1
+            self._entries[key] = entry
+            self._bytes += buffer.capacity
+            self._evict()
+            return CachedPCM(self, entry)
+
+    def _evict(self):
+        """
+        Drop least recently used entries until the cache fits (lock held).
+        Pinned entries leave the cache too; their memory is freed on last release.
+        """
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._drop(entry)
+
+    def _drop(self, entry):
+        """Remove an entry's bytes from the cache; free it unless still pinned (lock held)"""
+        self._bytes -= entry.buffer.capacity
+        entry.evicted = True
+        if entry.pins == 0:
+            entry.buffer.release()
+
+    def _unpin(self, entry):
+        with self._lock:
+            entry.pins -= 1
+            if entry.pins == 0 and entry.evicted:
+                entry.buffer.release()
+
+    def clear(self):
+        """Drop every entry (pinned entries are freed by their last user)"""
+        with self._lock:
+            for entry in self._entries.values():
+                self._drop(entry)
+            self._entries.clear()
+
+    def stats(self):
+        """Get a snapshot of cache usage"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
@@ -0,0 +1,436 @@
+# Speech synthesis engines behind one interface (Piper, eSpeak NG, a test tone engine)
+import asyncio
+import functools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import zlib
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the path to enable imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.wav_io import read_wav_header
+from services.resource_policy import ResourcePolicy
+from services.voice_manager import VoiceManager, VoiceWorkerError, PiperWorker
+
+
+# A piece of synthesized 16-bit PCM. total_bytes is the PCM size of the whole
+# synthesis when the engine knows it up front (None otherwise), so the
+# consumer can allocate once.
+AudioBlock = namedtuple('AudioBlock', ['sample_rate', 'channels', 'pcm', 'total_bytes'])
+
+# Size of the blocks engines read their output in
+BLOCK_BYTES = 64 * 1024
+
+
+class SynthesisCancelled(RuntimeError):
+    """Raised by a synthesis stream aborted through TTSEngine.cancel()"""
+
+
+class TTSEngine:
+    """
+    Interface every synthesis engine implements.
+
+    synthesize(text, voice_model, length_scale)
+        Generator of AudioBlocks, yielded as the engine produces them (all
+        blocks of one synthesis share a format). Work starts on the first
+        next(), so the time to the first block is the time to first audio.
+    synthesize_async(...)
+        The same on an event loop, returning the list of blocks; engines
+        without a native asyncio path run synthesize() in an executor.
+    sample_rate(voice_model)
+        Output rate if known without synthesizing, else None.
+    warm_up(voice_model, length_scale)
+        Load what a voice needs ahead of the first sentence (may return at once).
+    cancel()
+        Abort every synthesis running now; their streams raise SynthesisCancelled.
+
+    Engines start their processes through the resource policy, so the
+    priority and thread limits apply whatever the engine.
+    """
+
+    name = "engine"
+    display_name = "TTS engine"
+
+    def __init__(self, resource_policy=None):
+        self.resource_policy = resource_policy or ResourcePolicy()
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._generation = 0  # Bumped by cancel(); streams started earlier stop
+
+    def available(self):
+        """Whether the engine can run on this machine"""
+        return True
+
+    def configure(self, **_settings):
+        """Engine-specific settings (e.g. warm Piper workers); unknown ones are ignored"""
+
+    def sample_rate(self, voice_model=None):
+        return None
+
+    def warm_up(self, voice_model=None, length_scale=1.0):
+        return None
+
+    def synthesize(self, text, voice_model=None, length_scale=1.0):
+        raise NotImplementedError
+
+    async def synthesize_async(self, text, voice_model=None, length_scale=1.0):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, lambda: list(self.synthesize(text, voice_model, length_scale))
+        )
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            processes = list(self._processes)
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+
+    def cpu_seconds(self):
+        """CPU time of engine processes that are still running (finished ones count as children)"""
+        return 0.0
+
+    def memory_bytes(self):
+        """Resident memory of engine processes that are still running"""
+        return 0
+
+    def close(self):
+        """Stop any long-running engine processes"""
+        self.cancel()
+
+    # Helpers for engines
+
+    def _current_generation(self):
+        with self._lock:
+            return self._generation
+
+    def _check_cancelled(self, generation):
+        if generation != self._generation:
+            raise SynthesisCancelled(f"{self.display_name} synthesis was cancelled")
+
+    def _popen(self, cmd, **kwargs):
+        """Start an engine process under the resource policy, tracked for cancel()"""
+        process = subprocess.Popen(self.resource_policy.wrap_command(cmd),
+                                   **kwargs, **self.resource_policy.popen_kwargs())
+        with self._lock:
+            self._processes.add(process)
+        return process
+
+    def _forget(self, process):
+        with self._lock:
+            self._processes.discard(process)
+
+
+class PiperEngine(TTSEngine):
+    """
+    Piper (https://github.com/rhasspy/piper). With warm_models > 0 voice
+    models stay loaded in long-running workers (see VoiceManager);
+    otherwise Piper is started for every chunk. Piper writes a whole WAV
+    file per chunk, so its first block arrives once the chunk is done.
+    cancel() stops per-chunk processes; a warm worker finishes its chunk,
+    since killing it would throw away the loaded model.
+    """
+
+    name = "piper"
+    display_name = "Piper TTS"
+    NOT_FOUND = "Piper TTS not found. Please install Piper TTS from https://github.com/rhasspy/piper"
+    # Chunks in a row for which even a fresh warm worker failed before warm
+    # workers are given up on; those chunks are synthesized per chunk
+    MAX_WORKER_FAILURES = 3
+
+    def __init__(self, resource_policy=None, warm_models=0, warm_memory_mb=512):
+        super().__init__(resource_policy)
+        self.voice_manager = None
+        self._worker_failures = 0
+        self.configure(warm_models=warm_models, warm_memory_mb=warm_memory_mb)
+
+    def available(self):
+        return shutil.which('piper') is not None
+
+    def configure(self, warm_models=None, warm_memory_mb=None, **_settings):
+        if warm_models is None:
+            return
+        if self.voice_manager is not None:
+            self.voice_manager.close()
+            self.voice_manager = None
+        if warm_models > 0:
+            self.voice_manager = VoiceManager(
+                max_models=warm_models,
+                memory_budget_mb=warm_memory_mb or 512,
+                worker_factory=functools.partial(PiperWorker, resource_policy=self.resource_policy)
+            )
+
+    def sample_rate(self, voice_model=None):
+        """From the model's .onnx.json, which Piper reads as well"""
+        try:
+            with open(f"{voice_model}.json", 'r', encoding='utf-8') as f:
+                return int(json.load(f)["audio"]["sample_rate"])
+        except (TypeError, OSError, ValueError, KeyError):
+            return None
+
+    def warm_up(self, voice_model=None, length_scale=1.0):
+        if self.voice_manager is not None:
+            return self.voice_manager.prewarm(voice_model, length_scale)
+        return None
+
+    def command(self, output_path, voice_model, length_scale=1.0):
+        """Build the Piper TTS command line for writing a WAV file to output_path"""
+        # Check if voice model is set
+        if not voice_model:
+            raise RuntimeError("No voice model specified. Please set a voice model before synthesizing text.")
+
+        # Piper doesn't have a direct rate parameter, but --length-scale has a similar effect
+        return [
+            'piper',
+            '--model', voice_model,
+            '--output_file', output_path,
+            '--length-scale', str(length_scale)
+        ]
+
+    def synthesize(self, text, voice_model=None, length_scale=1.0):
+        generation = self._current_generation()
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_audio:
+            temp_audio_path = temp_audio.name
+        try:
+            self._run(text, temp_audio_path, voice_model, length_scale, generation)
+            with open(temp_audio_path, 'rb') as f:
+                yield from _wav_blocks(f, known_size=True)
+        finally:
+            os.remove(temp_audio_path)
+
+    def _run(self, text, output_path, voice_model, length_scale, generation):
+        """Run Piper on the text, writing a WAV file to output_path"""
+        manager = self.voice_manager
+        if manager is not None and voice_model:
+            # A worker can die or be closed under us; try once more on a fresh one
+            for _ in range(2):
+                worker = None
+                try:
+                    worker = manager.get_worker(voice_model, length_scale)
+                    worker.synthesize(text, output_path)
+                    self._worker_failures = 0
+                    manager.prewarm_predicted(voice_model, length_scale)
+                    return
+                except VoiceWorkerError as e:
+                    error = e
+                    if worker is not None:
+                        manager.discard(worker)
+            self._worker_failures += 1
+            if self._worker_failures >= self.MAX_WORKER_FAILURES and self.voice_manager is manager:
+                # e.g. a Piper build without --json-input: start Piper per chunk from now on
+                print(f"Warm voice models disabled: {error}")
+                self.voice_manager = None
+                manager.close()
+
+        cmd = self.command(output_path, voice_model, length_scale)
+        try:
+            process = self._popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        except FileNotFoundError:
+            raise RuntimeError(self.NOT_FOUND)
+        try:
+            _, stderr = process.communicate(text)
+        finally:
+            self._forget(process)
+        self._check_cancelled(generation)
+        if process.returncode != 0:
+            raise RuntimeError(f"Piper TTS failed: {stderr}")
+
+    async def synthesize_async(self, text, voice_model=None, length_scale=1.0):
+        """Drives Piper with an asyncio subprocess, so no thread waits on it"""
+        if self.voice_manager is not None:
+            # Warm workers are driven synchronously; keep them off the loop
+            return await super().synthesize_async(text, voice_model, length_scale)
+
+        loop = asyncio.get_running_loop()
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_audio:
+            temp_audio_path = temp_audio.name
+        try:
+            cmd = self.resource_policy.wrap_command(self.command(temp_audio_path, voice_model, length_scale))
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE,
+                    **self.resource_policy.popen_kwargs()
+                )
+            except FileNotFoundError:
+                raise RuntimeError(self.NOT_FOUND)
+
+            try:
+                _, stderr = await proc.communicate(text.encode('utf-8'))
+            except asyncio.CancelledError:
+                # Don't leave Piper running for audio nobody will play
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                raise
+            if proc.returncode != 0:
+                raise RuntimeError(f"Piper TTS failed: {stderr.decode('utf-8', errors='replace')}")
+
+            return await loop.run_in_executor(None, _read_wav_file_blocks, temp_audio_path)
+        finally:
+            if os.path.exists(temp_audio_path):
+                os.remove(temp_audio_path)
+
+    def cpu_seconds(self):
+        manager = self.voice_manager
+        return manager.cpu_seconds() if manager is not None else 0.0
+
+    def memory_bytes(self):
+        manager = self.voice_manager
+        return manager.stats()["memory_bytes"] if manager is not None else 0
+
+    def close(self):
+        super().close()
+        if self.voice_manager is not None:
+            self.voice_manager.close()
+
+
+class EspeakEngine(TTSEngine):
+    """
+    eSpeak NG (https://github.com/espeak-ng/espeak-ng): formant synthesis,
+    far less natural than Piper but very fast and without model files. The
+    WAV it writes to stdout is streamed as it arrives. voice_model is used as
+    the eSpeak voice unless it names a Piper model, then voice is used.
+    """
+
+    name = "espeak-ng"
+    display_name = "eSpeak NG"
+    WORDS_PER_MINUTE = 175  # eSpeak's default speed, i.e. length_scale 1.0
+
+    def __init__(self, resource_policy=None, voice="en"):
+        super().__init__(resource_policy)
+        self.voice = voice
+
+    def available(self):
+        return shutil.which('espeak-ng') is not None
+
+    def configure(self, espeak_voice=None, **_settings):
+        if espeak_voice:
+            self.voice = espeak_voice
+
+    def sample_rate(self, voice_model=None):
+        return 22050
+
+    def synthesize(self, text, voice_model=None, length_scale=1.0):
+        generation = self._current_generation()
+        voice = voice_model if voice_model and not voice_model.endswith('.onnx') else self.voice
+        speed = max(80, int(round(self.WORDS_PER_MINUTE / (length_scale or 1.0))))
+        try:
+            process = self._popen(['espeak-ng', '--stdout', '-v', voice, '-s', str(speed)],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            raise RuntimeError("eSpeak NG not found. Please install espeak-ng")
+        try:
+            # Chunks are small, so the whole text fits the pipe before eSpeak starts writing
+            process.stdin.write(" ".join(text.split()).encode('utf-8'))
+            process.stdin.close()
+            for block in _wav_blocks(process.stdout, known_size=False):
+                self._check_cancelled(generation)
+                yield block
+            stderr = process.stderr.read()
+            process.wait()
+            self._check_cancelled(generation)
+            if process.returncode != 0:
+                raise RuntimeError(f"eSpeak NG failed: {stderr.decode('utf-8', errors='replace')}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+            self._forget(process)
+
+
+class ToneEngine(TTSEngine):
+    """
+    Deterministic stand-in that needs no models or programs: every word
+    becomes a short tone, pitched by a hash of the word and as long as the
+    word, with pauses between words and silence at the edges. The same text
+    always gives the same samples, which makes it useful for tests,
+    benchmarks of the rest of the pipeline, and machines without a voice.
+    Blocks are yielded word by word.
+    """
+
+    name = "tone"
+    display_name = "Tone engine"
+    SAMPLE_RATE = 22050
+    EDGE_SILENCE_S = 0.1
+    WORD_GAP_S = 0.04
+
+    def sample_rate(self, voice_model=None):
+        return self.SAMPLE_RATE
+
+    def synthesize(self, text, voice_model=None, length_scale=1.0):
+        generation = self._current_generation()
+        rate = self.SAMPLE_RATE
+        edge = np.zeros(int(rate * self.EDGE_SILENCE_S * length_scale), dtype=np.int16)
+        gap = np.zeros(int(rate * self.WORD_GAP_S * length_scale), dtype=np.int16)
+
+        yield AudioBlock(rate, 1, edge.tobytes(), None)
+        for word in text.split():
+            self._check_cancelled(generation)
+            yield AudioBlock(rate, 1, self._tone(word, length_scale).tobytes() + gap.tobytes(), None)
+        yield AudioBlock(rate, 1, edge.tobytes(), None)
+
+    def _tone(self, word, length_scale):
+        rate = self.SAMPLE_RATE
+        frequency = 160 + zlib.crc32(word.lower().encode('utf-8')) % 240
+        frames = int(rate * (0.06 + 0.05 * len(word)) * length_scale)
+        t = np.arange(frames, dtype=np.float32) / rate
+        envelope = np.minimum(1.0, np.minimum(t, t[::-1]) / 0.01)  # 10 ms fades, no clicks
+        return (np.sin(2 * np.pi * frequency * t) * envelope * 8000).astype(np.int16)
+
+
+ENGINES = {
+    PiperEngine.name: PiperEngine,
+    EspeakEngine.name: EspeakEngine,
+    ToneEngine.name: ToneEngine,
+}
+
+
+def create_engine(name, resource_policy=None, **settings):
+    """An engine by name ("piper", "espeak-ng" or "tone") with its settings applied"""
+    try:
+        engine_class = ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown TTS engine: {name!r} (available: {', '.join(ENGINES)})")
+    engine = engine_class(resource_policy)
+    engine.configure(**settings)
+    return engine
+
+
+def _wav_blocks(f, known_size):
+    """
+    Yield the PCM payload of a WAV stream as AudioBlocks. Streams written as
+    they are produced (known_size=False) carry a placeholder data size, so
+    they are read until EOF.
+    """
+    sample_rate, channels, sample_width, data_size = read_wav_header(f)
+    if sample_width != 2:
+        raise RuntimeError(f"Unsupported sample width: {sample_width * 8} bits")
+    remaining = data_size if known_size else None
+    total = data_size if known_size else None
+    while remaining is None or remaining > 0:
+        block = f.read(BLOCK_BYTES if remaining is None else min(BLOCK_BYTES, remaining))
+        if not block:
+            break
+        if remaining is not None:
+            remaining -= len(block)
+        yield AudioBlock(sample_rate, channels, block, total)
+
+
+def _read_wav_file_blocks(path):
+    with open(path, 'rb') as f:
+        return list(_wav_blocks(f, known_size=True))
@@ -1,190 +1,856 @@
-# TTS service for converting text to speech using Piper TTS
-import subprocess
-import tempfile
+# TTS service for converting text to speech (Piper TTS by default)
+import asyncio
 import threading
 import queue
 import time
-import os
 import sys
 from pathlib import Path
 from datetime import datetime
-import io
+from collections import deque, namedtuple
+from contextlib import nullcontext
 
 # Add the src directory to the path to enable imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from utils.text_processing import split_text_by_sentences, sanitize_for_tts
+from utils.text_processing import split_text_by_sentences, sanitize_for_tts, split_quoted_segments
+from utils.wav_io import parse_wav_bytes, wav_header
+from utils.audio_dsp import post_process, trim_silence, pcm_as_array, convert_pcm, change_tempo
+from utils.timing_map import TimingMap
+from services.audio_buffer_pool import AudioBufferPool
+from services.synthesis_cache import SynthesisCache
+from services.resource_policy import ResourcePolicy
+from services.tts_engines import create_engine
+from services.playback_scheduler import PlaybackScheduler
 import pygame  # For better audio playback
 
 
+# One synthesized unit yielded by TTSService.stream()
+SpeechChunk = namedtuple('SpeechChunk', ['text', 'byte_start', 'byte_end', 'audio', 'unit'])
+
+
 class TTSService:
-    def __init__(self):
+    RATE_SETTLE_SECONDS = 2.0  # A new rate must hold this long before Piper is re-run at it
+
+    def __init__(self, memory_budget_mb=64, cache_mb=32, init_audio=True):
         self.rate = 1.0  # Speed multiplier (1.0 = normal speed)
+        self.synthesis_rate = 1.0  # Rate Piper synthesizes at; other rates are time-stretched
         self.pitch = 1.0  # Pitch multiplier (1.0 = normal pitch)
         self.volume = 1.0  # Volume multiplier (1.0 = normal volume)
         self.voice_model = None  # Path to the voice model
         self.audio_queue = queue.Queue()
-        self.playback_thread = None
-        self.is_playing_flag = False
         self.stop_signal = threading.Event()
+        # Owns the single playback thread (shared with MainController) and the playback state
+        self.scheduler = PlaybackScheduler(stop_event=self.stop_signal)
+
+        # All synthesized PCM audio lives in this pool so queued audio stays within budget
+        self.buffer_pool = AudioBufferPool(budget_bytes=int(memory_budget_mb * 1024 * 1024))
+        # Finished chunks are kept (inside the pool budget) for reuse by later reads
+        self.synthesis_cache = SynthesisCache(max_bytes=int(min(cache_mb, memory_budget_mb / 2) * 1024 * 1024))
+
+        # Post-processing options applied to every synthesized chunk
+        self.normalize_loudness = False
+        self.target_loudness_dbfs = -20.0
+
+        # Edge silence Piper leaves on each chunk is trimmed and replaced by a fixed gap
+        self.trim_silence = True
+        self.silence_threshold_db = -45.0
+        self.sentence_gap_ms = 120
+        self.silence_stats = {}  # source file -> listening time saved by trimming
+
+        # Byte span <-> sample offset map, filled as chunks are synthesized
+        self.timing_map = TimingMap()
+        self._clock_unit = None
+        self._clock_started_at = 0.0
+
+        # Priority, thread and concurrency limits for Piper, and its CPU cost per minute of audio
+        self.resource_policy = ResourcePolicy()
 
-        # Initialize pygame mixer for audio playback
-        pygame.mixer.init()
+        # Synthesis engine (see tts_engines; Piper without warm workers until configured)
+        # and dialogue voice routing
+        self.engine = create_engine("piper", self.resource_policy)
+        self._engine_settings = {}
+        self.dialogue_voice_model = None
+        self.route_quotes = False
+
+        # Optional PlaybackProfiler measuring every synthesized chunk
+        self.profiler = None
+
+        # Rate changes are applied by time-stretching existing audio; once a new
+        # rate has settled, audio is optionally re-synthesized at it in the background
+        self.instant_rate_changes = True
+        self.resynthesize_after_rate_change = True
+        self._rate_changed_at = 0.0
+        self._resynthesis_queue = queue.Queue()
+        self._resynthesis_pending = set()
+        self._resynthesis_lock = threading.Lock()
+        self._resynthesis_thread = None
+
+        # Voices are warmed up off the caller's thread; only the latest request per voice counts
+        self._warm_up_lock = threading.Lock()
+        self._warm_up_requests = {}
+        self._warm_up_thread = None
+
+        # Initialize pygame mixer for audio playback (headless users such as the
+        # streaming server only synthesize and never open an audio device)
+        if init_audio:
+            pygame.mixer.init()
     
     def set_parameters(self, rate=1.0, pitch=1.0, volume=1.0, voice_model=None):
         """Set TTS parameters"""
-        self.rate = rate
+        if rate != self.rate:
+            self.rate = rate
+            self._rate_changed_at = time.monotonic()
+            if not self.instant_rate_changes:
+                self.synthesis_rate = rate
         self.pitch = pitch
         self.volume = volume
         if voice_model:
             self.voice_model = voice_model
+        # Load a newly selected voice (or the new rate) before the first sentence needs it
+        self.warm_up(self.voice_model)
+
+    def configure_audio(self, normalize_loudness=None, target_loudness_dbfs=None, trim_silence=None,
+                        silence_threshold_db=None, sentence_gap_ms=None, instant_rate_changes=None,
+                        resynthesize_after_rate_change=None, **_ignored):
+        """Set audio post-processing options (usually the "audio" config section)"""
+        if instant_rate_changes is not None:
+            self.instant_rate_changes = bool(instant_rate_changes)
+            if not self.instant_rate_changes:
+                self.synthesis_rate = self.rate
+        if resynthesize_after_rate_change is not None:
+            self.resynthesize_after_rate_change = bool(resynthesize_after_rate_change)
+        if normalize_loudness is not None:
+            self.normalize_loudness = bool(normalize_loudness)
+        if target_loudness_dbfs is not None:
+            self.target_loudness_dbfs = float(target_loudness_dbfs)
+        if trim_silence is not None:
+            self.trim_silence = bool(trim_silence)
+        if silence_threshold_db is not None:
+            self.silence_threshold_db = float(silence_threshold_db)
+        if sentence_gap_ms is not None:
+            self.sentence_gap_ms = max(0, int(sentence_gap_ms))
     
+    def configure_voices(self, engine=None, warm_models=None, warm_memory_mb=None, dialogue_voice_model=None,
+                         route_quotes=None, **settings):
+        """
+        Choose the synthesis engine and set up warm voice models and quoted-text
+        routing (usually the "voices" config section). Other settings are
+        passed on to the engine (e.g. espeak_voice).
+        """
+        if warm_models is not None:
+            settings.update(warm_models=warm_models, warm_memory_mb=warm_memory_mb)
+        self._engine_settings.update(settings)
+        if engine is not None and engine != self.engine.name:
+            self.set_engine(engine)
+        else:
+            self.engine.configure(**settings)
+        if dialogue_voice_model is not None:
+            self.dialogue_voice_model = dialogue_voice_model or None
+        if route_quotes is not None:
+            self.route_quotes = bool(route_quotes)
+        if self.route_quotes:
+            self.warm_up(self.dialogue_voice_model)
+
+    def set_engine(self, engine):
+        """
+        Switch the synthesis engine (a name from tts_engines.ENGINES or a
+        TTSEngine). Cached audio stays valid: cache keys include the engine.
+        """
+        if isinstance(engine, str):
+            engine = create_engine(engine, self.resource_policy, **self._engine_settings)
+        old, self.engine = self.engine, engine
+        if old is not engine:
+            old.close()
+        self.warm_up(self.voice_model)
+
+    def configure_resources(self, **settings):
+        """Set the synthesis resource policy (usually the "resources" config section)"""
+        self.resource_policy.configure(**settings)
+
+    def get_cpu_report(self):
+        """CPU seconds spent (here and in Piper) per minute of synthesized audio; see ResourcePolicy.report"""
+        return self.resource_policy.report(self.engine.cpu_seconds())
+
+    def reset_cpu_report(self):
+        """Start the CPU report over, e.g. before a measurement"""
+        self.resource_policy.reset_meter(self.engine.cpu_seconds())
+
+    def close_voices(self):
+        """Stop the engine's long-running processes (warm Piper workers)"""
+        self.engine.close()
+
+    def warm_up(self, voice_model):
+        """
+        Have the engine load a voice at the synthesis rate in the background,
+        so slider changes and voice switches never wait for a model to load.
+        Requests for a voice made while one is running collapse into the latest.
+        """
+        with self._warm_up_lock:
+            self._warm_up_requests[voice_model] = (self.engine, self._length_scale())
+            if self._warm_up_thread is None or not self._warm_up_thread.is_alive():
+                self._warm_up_thread = threading.Thread(target=self._warm_up_worker, daemon=True)
+                self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def _warm_up_worker(self):
+        while True:
+            with self._warm_up_lock:
+                if not self._warm_up_requests:
+                    self._warm_up_thread = None
+                    return
+                voice_model = next(iter(self._warm_up_requests))
+                engine, length_scale = self._warm_up_requests.pop(voice_model)
+            if engine is not self.engine:
+                continue  # Replaced (and closed) since the request
+            try:
+                engine.warm_up(voice_model, length_scale)
+            except Exception as e:
+                print(f"Voice warm-up failed: {e}")
+
+    def _length_scale(self):
+        return 1.0 / self.synthesis_rate if self.synthesis_rate != 0 else 1.0
+
+    def _update_synthesis_rate(self):
+        """Let Piper synthesize at the requested rate once it has stopped changing"""
+        if self.synthesis_rate == self.rate or not self.resynthesize_after_rate_change:
+            return
+        if time.monotonic() - self._rate_changed_at >= self.RATE_SETTLE_SECONDS:
+            self.synthesis_rate = self.rate
+            self.warm_up(self.voice_model)
+
+    def conform_rate(self, audio):
+        """
+        Get audio at the current rate: audio synthesized at another rate is
+        time-stretched (WSOLA, pitch kept) into a new pooled buffer and the
+        original is released. Audio already at the rate is returned as is.
+        """
+        if self.matches_rate(audio):
+            return audio
+
+        try:
+            speech_rate = audio.speech_rate
+            samples = change_tempo(pcm_as_array(audio), self.rate / speech_rate, audio.sample_rate, audio.channels)
+            stretched = self.buffer_pool.acquire(samples.nbytes, audio.sample_rate, audio.channels)
+            pcm_as_array(stretched)[:] = samples
+            stretched.speech_rate = self.rate
+        finally:
+            audio.release()
+        return stretched
+
+    def matches_rate(self, audio):
+        """Whether audio is already at the current rate (conform_rate would return it as is)"""
+        speech_rate = getattr(audio, 'speech_rate', None)
+        return not speech_rate or not self.rate or abs(self.rate / speech_rate - 1.0) < 0.01
+
+    def _cached_audio(self, text, key):
+        """
+        Cached audio for a chunk (or None), as synthesized. Audio made at an
+        earlier rate is queued for resynthesis once the new rate has settled;
+        the caller stretches it with conform_rate in the meantime.
+        """
+        cached = self.synthesis_cache.get(key)
+        if cached is not None and cached.speech_rate != self.synthesis_rate and self.synthesis_rate == self.rate:
+            self._schedule_resynthesis(text, key)
+        return cached
+
+    def _schedule_resynthesis(self, text, key):
+        """Re-synthesize a cached chunk at the settled rate in the background"""
+        with self._resynthesis_lock:
+            if key in self._resynthesis_pending:
+                return
+            self._resynthesis_pending.add(key)
+            self._resynthesis_queue.put((text, key))
+            if self._resynthesis_thread is None or not self._resynthesis_thread.is_alive():
+                self._resynthesis_thread = threading.Thread(target=self._resynthesis_worker, daemon=True)
+                self._resynthesis_thread.start()
+
+    def _resynthesis_worker(self):
+        while True:
+            try:
+                text, key = self._resynthesis_queue.get(timeout=5)
+            except queue.Empty:
+                return
+            try:
+                # Skip work made stale by further changes
+                if key == self.cache_key(text) and self.synthesis_rate == self.rate:
+                    self.synthesis_cache.put(key, self._synthesize_chunk(text)).release()
+            except Exception as e:
+                print(f"Background resynthesis failed: {e}")
+            finally:
+                with self._resynthesis_lock:
+                    self._resynthesis_pending.discard(key)
+
     def synthesize_text_to_memory(self, text):
-        """Convert text to speech using Piper TTS and return audio data in memory"""
+        """Convert text to speech and return it as WAV data in memory"""
+        buffer = self.synthesize_text_to_pcm(text)
         try:
-            # Check if voice model is set
-            if not self.voice_model:
-                raise RuntimeError("No voice model specified. Please set a voice model before synthesizing text.")
-
-            # Create a temporary file to receive the audio output from Piper
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_audio:
-                temp_audio_path = temp_audio.name
-
-            # Prepare the Piper TTS command
-            cmd = [
-                'piper',
-                '--model', self.voice_model,  # Model is now required
-                '--output_file', temp_audio_path  # Directly specify output file
-            ]
-
-            # Add rate parameter if supported by Piper
-            # Note: Piper doesn't have a direct rate parameter, but we can achieve
-            # similar effect with --length-scale
-            length_scale = 1.0 / self.rate if self.rate != 0 else 1.0
-            cmd.extend(['--length-scale', str(length_scale)])
-
-            # Execute Piper TTS with the text
-            proc = subprocess.run(
-                cmd,
-                input=text,
-                stderr=subprocess.PIPE,
-                text=True,
-                check=True  # This will raise an exception if the command fails
-            )
-
-            # Read the audio data from the temporary file into memory
-            with open(temp_audio_path, 'rb') as f:
-                audio_data = f.read()
-
-            # Clean up the temporary file immediately after reading
-            os.remove(temp_audio_path)
-
-            # Verify that we have audio data
-            if not audio_data or len(audio_data) == 0:
-                raise RuntimeError("Piper TTS generated empty audio data")
-
-            return audio_data
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Piper TTS failed: {e.stderr}")
-        except FileNotFoundError:
-            raise RuntimeError("Piper TTS not found. Please install Piper TTS from https://github.com/rhasspy/piper")
+            return wav_header(buffer.sample_rate, buffer.channels, 2, buffer.nbytes) + bytes(buffer.data)
+        finally:
+            buffer.release()
+
+    def synthesize_text_to_pcm(self, text, timeout=None, voice_model=None):
+        """
+        Convert text to speech with the engine and return a PCMBuffer leased
+        from the buffer pool. The engine's blocks are copied into one pooled
+        block as they arrive. Callers must release() the buffer when done.
+        """
+        try:
+            # Only the engine run counts against the concurrency limit and the real-time factor
+            with self.resource_policy.job_slot():
+                started = time.perf_counter()
+                blocks = self.engine.synthesize(text, voice_model or self.voice_model, self._length_scale())
+                buffer = self._blocks_into_pool(blocks, timeout=timeout)
+                elapsed = time.perf_counter() - started
+        except (RuntimeError, MemoryError):
+            raise
         except Exception as e:
             raise RuntimeError(f"TTS synthesis failed: {str(e)}")
 
-    def play_audio_from_memory(self, audio_data):
-        """Play the synthesized audio data from memory"""
+        if buffer.nbytes == 0:
+            buffer.release()
+            raise RuntimeError(f"{self.engine.display_name} generated empty audio data")
+        self.resource_policy.record_synthesis(elapsed, buffer.duration)
+        return buffer
+
+    def _blocks_into_pool(self, blocks, timeout=None):
+        """
+        Copy a stream of AudioBlocks into one pooled buffer: allocated once up
+        front when the engine announces the total size, otherwise after the
+        blocks are collected
+        """
+        buffer = None
+        filled = 0
+        collected = []
         try:
-            # Create a BytesIO object from the audio data
-            audio_buffer = io.BytesIO(audio_data)
+            for block in blocks:
+                if buffer is None and not collected and block.total_bytes is not None:
+                    buffer = self.buffer_pool.acquire(block.total_bytes, block.sample_rate, block.channels,
+                                                      timeout=timeout)
+                if buffer is None:
+                    collected.append(block)
+                    continue
+                size = min(len(block.pcm), buffer.nbytes - filled)
+                buffer.data[filled:filled + size] = block.pcm[:size]
+                filled += size
 
-            # Create a temporary Sound object from the buffer
-            # We'll use pygame's Sound class which can work with file-like objects
-            sound = pygame.mixer.Sound(audio_buffer)
+            if buffer is None:
+                if not collected:
+                    raise RuntimeError(f"{self.engine.display_name} generated empty audio data")
+                first = collected[0]
+                buffer = self.buffer_pool.acquire(sum(len(block.pcm) for block in collected),
+                                                  first.sample_rate, first.channels, timeout=timeout)
+                for block in collected:
+                    buffer.data[filled:filled + len(block.pcm)] = block.pcm
+                    filled += len(block.pcm)
+            buffer.resize(filled - filled % (buffer.sample_width * buffer.channels))
+        except BaseException:
+            if buffer is not None:
+                buffer.release()
+            raise
+        finally:
+            close = getattr(blocks, "close", None)
+            if close is not None:
+                close()
+        return buffer
 
-            # Play the sound
-            sound.play()
+    def post_process_pcm(self, buffer):
+        """
+        Apply pitch, loudness normalization and volume to a synthesized buffer in place.
+        Piper only handles the rate (via --length-scale); everything else happens here.
+        """
+        post_process(
+            buffer,
+            volume=self.volume,
+            pitch=self.pitch,
+            normalize=self.normalize_loudness,
+            target_dbfs=self.target_loudness_dbfs
+        )
+        return buffer
 
-            # Wait for the audio to finish playing
-            while sound.get_num_channels() > 0 and not self.stop_signal.is_set():
-                pygame.time.wait(100)  # Check every 100ms if playback should stop
+    def trim_edge_silence(self, buffer):
+        """
+        Trim leading/trailing silence from a synthesized buffer in place and
+        note the seconds removed on it (trimmed_seconds), so every later use of
+        the audio, cached or not, can be counted by _count_trimmed_silence.
+        """
+        if not self.trim_silence:
+            return 0.0
 
-        except Exception as e:
-            raise RuntimeError(f"Failed to play audio from memory: {e}")
+        removed_frames = trim_silence(buffer, threshold_db=self.silence_threshold_db)
+        removed = removed_frames / buffer.sample_rate if buffer.sample_rate else 0.0
+        buffer.trimmed_seconds = removed
+        return removed
 
-    def speak_text(self, text, source_file_path=None, sync_playback=True):
-        """Synthesize and play text directly"""
-        if not text.strip():
+    def _count_trimmed_silence(self, audio, source_file_path=None):
+        """Account the listening time saved by a chunk about to be played (net of the sentence gap)"""
+        if not self.trim_silence:
             return
+        trimmed = getattr(audio, 'trimmed_seconds', 0.0)
+        speech_rate = getattr(audio, 'speech_rate', None)
+        if speech_rate and self.rate:
+            # Stretched to the current rate, the silence would have been that much shorter or longer
+            trimmed *= speech_rate / self.rate
 
-        # Sanitize text for TTS
-        sanitized_text = sanitize_for_tts(text)
+        stats = self.silence_stats.setdefault(str(source_file_path or ""), {
+            "chunks": 0,
+            "trimmed_seconds": 0.0,
+            "gap_seconds": 0.0,
+        })
+        stats["chunks"] += 1
+        stats["trimmed_seconds"] += trimmed
+        stats["gap_seconds"] += self.sentence_gap_ms / 1000.0
 
-        # Split text into smaller chunks for better TTS processing
-        text_chunks = split_text_by_sentences(sanitized_text)
+    def get_silence_report(self, source_file_path=None):
+        """Get the listening time saved by silence trimming for a file"""
+        stats = self.silence_stats.get(str(source_file_path or ""))
+        if not stats:
+            return {"chunks": 0, "trimmed_seconds": 0.0, "gap_seconds": 0.0, "saved_seconds": 0.0}
+
+        report = dict(stats)
+        report["saved_seconds"] = max(0.0, stats["trimmed_seconds"] - stats["gap_seconds"])
+        return report
+
+    def cache_key(self, text):
+        """
+        Everything that determines the audio produced for a text chunk.
+        The rate is left out: cached audio records the rate it was synthesized
+        at and is time-stretched to the current one (see conform_rate).
+        """
+        dialogue_voice = self.dialogue_voice_model if self.route_quotes else None
+        return (
+            self.engine.name, self.voice_model, dialogue_voice, self.pitch, self.volume,
+            self.normalize_loudness, self.target_loudness_dbfs,
+            self.trim_silence, self.silence_threshold_db, text
+        )
+
+    def prepare_audio(self, text, source_file_path=None, use_cache=True):
+        """
+        Get finished (trimmed and post-processed) audio for a text chunk, from the
+        synthesis cache when possible. The result behaves like a PCMBuffer and
+        must be released by the caller; it must not be modified in place.
+        """
+        self._update_synthesis_rate()
+        key = self.cache_key(text)
+        if use_cache:
+            cached = self._cached_audio(text, key)
+            if cached is not None:
+                self._count_trimmed_silence(cached, source_file_path)
+                return self.conform_rate(cached)
+
+        buffer = self._synthesize_chunk(text)
+        audio = self.synthesis_cache.put(key, buffer) if use_cache else buffer
+        self._count_trimmed_silence(audio, source_file_path)
+        return self.conform_rate(audio)
+
+    def _synthesize_chunk(self, text):
+        """Synthesize, trim and post-process a chunk at the synthesis rate"""
+        speech_rate = self.synthesis_rate
+        with self.profiler.synthesis() if self.profiler is not None else nullcontext():
+            buffer = self._synthesize_voices(text)
+            try:
+                self.trim_edge_silence(buffer)
+                self.post_process_pcm(buffer)
+            except Exception:
+                buffer.release()
+                raise
+        buffer.speech_rate = speech_rate
+        return buffer
+
+    def _synthesize_voices(self, text):
+        """Synthesize a chunk, reading quoted text with the dialogue voice when routing is on"""
+        if not (self.route_quotes and self.dialogue_voice_model):
+            return self.synthesize_text_to_pcm(text)
+
+        segments = split_quoted_segments(text)
+        if len(segments) == 1:
+            voice = self.dialogue_voice_model if segments[0][1] else None
+            return self.synthesize_text_to_pcm(text, voice_model=voice)
+
+        parts = []
+        try:
+            for segment, quoted in segments:
+                part = self.synthesize_text_to_pcm(segment, voice_model=self.dialogue_voice_model if quoted else None)
+                parts.append(part)
+                if self.trim_silence:
+                    trim_silence(part, threshold_db=self.silence_threshold_db)
+            return self._join_pcm(parts)
+        finally:
+            for part in parts:
+                part.release()
+
+    def _join_pcm(self, parts):
+        """
+        Concatenate buffers into one pooled buffer at the first part's format
+        (voices may differ), with a short pause at each voice change
+        """
+        sample_rate, channels = parts[0].sample_rate, parts[0].channels
+        pause_frames = int(sample_rate * self.sentence_gap_ms / 2000) if self.trim_silence else 0
+        arrays = [convert_pcm(pcm_as_array(part), part.sample_rate, part.channels, sample_rate, channels)
+                  for part in parts]
+        total = sum(array.size for array in arrays) + pause_frames * channels * (len(arrays) - 1)
+
+        joined = self.buffer_pool.acquire(total * 2, sample_rate, channels)
+        out = pcm_as_array(joined)
+        position = 0
+        for index, array in enumerate(arrays):
+            if index:
+                out[position:position + pause_frames * channels] = 0
+                position += pause_frames * channels
+            out[position:position + array.size] = array
+            position += array.size
+        return joined
+
+    def _prepare_chunk(self, text, source_file_path=None, byte_span=None):
+        """
+        Prepare audio for a text chunk and record it in the timing map.
+        Returns (buffer, timing unit); the unit is None when no byte span is known.
+        """
+        buffer = self.prepare_audio(text, source_file_path)
+
+        unit = None
+        if byte_span is not None:
+            unit = self.timing_map.add_unit(byte_span[0], byte_span[1], buffer.num_frames, buffer.sample_rate)
+            if self.trim_silence and self.sentence_gap_ms > 0:
+                self.timing_map.add_gap(int(buffer.sample_rate * self.sentence_gap_ms / 1000), buffer.sample_rate)
+        return buffer, unit
 
-        for chunk in text_chunks:
+    def _wait_sentence_gap(self):
+        """Insert the configured pause between sentences (interrupted by stop)"""
+        if self.trim_silence and self.sentence_gap_ms > 0:
+            self.stop_signal.wait(self.sentence_gap_ms / 1000.0)
+
+    def _start_clock(self, unit):
+        """Mark the moment the audio of a timing unit starts playing"""
+        self._clock_unit = unit
+        self._clock_started_at = time.monotonic()
+
+    def get_playback_sample(self):
+        """
+        Estimate the current position on the timing map's sample timeline.
+        Returns -1 when nothing with a known byte span has played yet.
+        """
+        unit = self._clock_unit
+        if unit is None:
+            return -1
+        elapsed = time.monotonic() - self._clock_started_at
+        sample = unit.sample_start + int(elapsed * self.timing_map.sample_rate)
+        # Hold on the last sample while the next sentence is being prepared
+        return min(sample, max(unit.sample_start, unit.sample_end - 1))
+
+    def get_current_unit(self):
+        """Get the timing unit (byte span) that is playing right now, or None"""
+        return self.timing_map.lookup(self.get_playback_sample())
+
+    def reset_timing(self):
+        """Clear the timing map and playback clock (e.g. when playback restarts)"""
+        self.timing_map.clear()
+        self._clock_unit = None
+
+    def _ensure_mixer(self, sample_rate, channels):
+        """Make sure the mixer runs at the PCM format so raw buffers play unconverted"""
+        if pygame.mixer.get_init() != (sample_rate, -16, channels):
+            pygame.mixer.quit()
+            pygame.mixer.init(frequency=sample_rate, size=-16, channels=channels, allowedchanges=0)
+
+    def _play_raw_pcm(self, pcm_view, sample_rate, channels):
+        """Play raw int16 PCM and block until it finishes or stop is requested"""
+        self._ensure_mixer(sample_rate, channels)
+
+        # pygame copies the samples into its own chunk, so the caller's buffer
+        # can be reused as soon as the Sound exists
+        sound = pygame.mixer.Sound(buffer=pcm_view)
+        sound.play()
+
+        # Wait exactly as long as the audio lasts instead of polling, so no
+        # polling delay stacks up between sentences; stop() wakes us early
+        if self.stop_signal.wait(sound.get_length()):
+            sound.stop()
+
+    def play_pcm(self, buffer, release=True):
+        """Play a PCMBuffer, returning it to the pool once the mixer holds its copy"""
+        try:
+            self._play_raw_pcm(buffer.data, buffer.sample_rate, buffer.channels)
+        except Exception as e:
+            raise RuntimeError(f"Failed to play audio from memory: {e}")
+        finally:
+            if release:
+                buffer.release()
+
+    def play_audio_from_memory(self, audio_data):
+        """Play the synthesized audio data from memory"""
+        try:
+            # Hand the PCM payload to the mixer as a view, without a BytesIO copy
+            sample_rate, channels, sample_width, pcm_view = parse_wav_bytes(audio_data)
+            if sample_width != 2:
+                raise RuntimeError(f"Unsupported sample width: {sample_width * 8} bits")
+            self._play_raw_pcm(pcm_view, sample_rate, channels)
+        except Exception as e:
+            raise RuntimeError(f"Failed to play audio from memory: {e}")
+
+    def get_audio_memory_stats(self):
+        """Get usage statistics of the PCM buffer pool, synthesis cache and warm voices"""
+        stats = self.buffer_pool.stats()
+        stats["cache"] = self.synthesis_cache.stats()
+        stats["engine"] = self.engine.name
+        voice_manager = getattr(self.engine, "voice_manager", None)
+        if voice_manager is not None:
+            stats["voices"] = voice_manager.stats()
+        return stats
+
+    def speak_text(self, text, source_file_path=None, sync_playback=True, byte_span=None):
+        """
+        Synthesize and play text directly.
+        byte_span is the (start, end) byte range of the text in the source file;
+        when given, the synthesized audio is recorded in the timing map.
+        """
+        for chunk in self._speech_chunks(text):
             if self.stop_signal.is_set():
                 break
 
             if chunk.strip():
-                # Synthesize the text chunk to audio data in memory
-                audio_data = self.synthesize_text_to_memory(chunk)
-                # Play the audio from memory
-                self.play_audio_from_memory(audio_data)
+                if self.cache_key(chunk) not in self.synthesis_cache:
+                    self.scheduler.buffering()
+                # Synthesize the text chunk into a pooled, trimmed PCM buffer
+                buffer, unit = self._prepare_chunk(chunk, source_file_path, byte_span)
+                if unit is not None:
+                    self._start_clock(unit)
+                self.scheduler.playing()
+                # Play the audio from memory (returns once the audio has played)
+                self.play_pcm(buffer)
 
-                # Wait for the audio to finish playing before continuing if sync_playback is True
+                # Replace the trimmed edge silence with the configured gap
                 if sync_playback:
-                    # Wait for the audio to finish playing before continuing
-                    # This ensures proper synchronization with the playback
-                    while pygame.mixer.get_busy() and not self.stop_signal.is_set():
-                        pygame.time.wait(100)  # Check every 100ms if playback should stop
+                    self._wait_sentence_gap()
     
-    def start_streaming_speech(self, text_generator, source_file_path=None):
-        """Start streaming speech from a text generator"""
-        if self.playback_thread and self.playback_thread.is_alive():
-            self.stop_signal.set()
-            self.playback_thread.join(timeout=2)
+    def _speech_chunks(self, text):
+        """The chunks speak_text synthesizes for a text (and caches them under)"""
+        if not text.strip():
+            return []
 
-        self.stop_signal.clear()
-        self.is_playing_flag = True
+        # Sanitize text for TTS
+        sanitized_text = sanitize_for_tts(text)
 
-        self.playback_thread = threading.Thread(
-            target=self._streaming_worker,
-            args=(text_generator, source_file_path)
-        )
-        self.playback_thread.daemon = True
-        self.playback_thread.start()
-    
-    def _streaming_worker(self, text_generator, source_file_path=None):
-        """Worker thread for streaming speech"""
+        # Split text into smaller chunks for better TTS processing
+        return split_text_by_sentences(sanitized_text)
+
+    def presynthesize(self, text, source_file_path=None):
+        """
+        Synthesize text into the synthesis cache ahead of speak_text, so a
+        later speak_text of the same text starts without waiting. Returns the
+        pinned buffers; release them once the text has been spoken.
+        """
+        return [self.prepare_audio(chunk, source_file_path)
+                for chunk in self._speech_chunks(text) if chunk.strip()]
+
+    def export_cached_audio(self, texts, max_chunks=3):
+        """
+        Copy the cached audio of the first speech chunks of texts, in reading
+        order, for saving with a session snapshot. Stops at the first chunk that
+        is not cached. Returns dicts with the chunk text, its cache key, the PCM
+        format and the PCM bytes.
+        """
+        exported = []
+        for text in texts:
+            for chunk in self._speech_chunks(text):
+                if not chunk.strip():
+                    continue
+                if len(exported) >= max_chunks:
+                    return exported
+                key = self.cache_key(chunk)
+                cached = self.synthesis_cache.get(key) if key in self.synthesis_cache else None
+                if cached is None:
+                    return exported
+                with cached:
+                    exported.append({
+                        "text": chunk,
+                        "key": list(key),
+                        "sample_rate": cached.sample_rate,
+                        "channels": cached.channels,
+                        "speech_rate": cached.speech_rate,
+                        "pcm": bytes(cached.data),
+                    })
+        return exported
+
+    def import_cached_audio(self, chunks):
+        """
+        Put audio saved by export_cached_audio back into the synthesis cache.
+        Chunks made with other voice or audio settings are skipped. Returns the
+        number of chunks restored.
+        """
+        restored = 0
+        for chunk in chunks:
+            key = self.cache_key(chunk["text"])
+            if list(key) != chunk["key"] or key in self.synthesis_cache:
+                continue
+            pcm = chunk["pcm"]
+            buffer = self.buffer_pool.acquire(len(pcm), chunk["sample_rate"], chunk["channels"])
+            buffer.data[:] = pcm
+            buffer.speech_rate = chunk["speech_rate"]
+            self.synthesis_cache.put(key, buffer).release()
+            restored += 1
+        return restored
+
+    def prepare_output(self, sample_rate, channels):
+        """Open the mixer at a PCM format ahead of the first sentence"""
+        self._ensure_mixer(sample_rate, channels)
+
+    def start_streaming_speech(self, text_generator, source_file_path=None):
+        """Start streaming speech from a text generator (replaces any playback)"""
+        self.scheduler.play(lambda session: self._streaming_worker(text_generator, source_file_path, session))
+
+    def _streaming_worker(self, text_generator, source_file_path, session):
+        """Playback job speaking each chunk of a text generator"""
         for text_chunk in text_generator:
-            if self.stop_signal.is_set():
+            if session.cancelled:
                 break
 
             # Synthesize and play the text chunk
             try:
                 if text_chunk.strip():
-                    audio_data = self.synthesize_text_to_memory(text_chunk)
-                    self.play_audio_from_memory(audio_data)
-
-                    # Wait for the audio to finish playing before continuing
-                    while pygame.mixer.get_busy() and not self.stop_signal.is_set():
-                        pygame.time.wait(100)  # Check every 100ms if playback should stop
+                    buffer, _ = self._prepare_chunk(text_chunk, source_file_path)
+                    self.scheduler.playing()
+                    self.play_pcm(buffer)
+                    self._wait_sentence_gap()
             except Exception as e:
                 print(f"Error during speech synthesis/playback: {e}")
                 break
-    
+
     def stop_speech(self):
         """Stop ongoing speech"""
-        self.is_playing_flag = False
-        if self.stop_signal:
-            self.stop_signal.set()
-        
-        if self.playback_thread and self.playback_thread.is_alive():
-            self.playback_thread.join(timeout=2)
-    
+        self.scheduler.stop()
+
     def is_speaking(self):
         """Check if the TTS is currently speaking"""
-        return self.is_playing_flag or (
-            self.playback_thread and self.playback_thread.is_alive()
-        )
\ No newline at end of file
+        return self.scheduler.is_active()
+
+    # Native asyncio API: lets one event loop drive many reading sessions
+    # without a thread per session
+
+    async def synthesize_async(self, text):
+        """Async version of synthesize_text_to_pcm (Piper runs as an asyncio subprocess)"""
+        loop = asyncio.get_running_loop()
+        async with self.resource_policy.job_slot_async():
+            started = time.perf_counter()
+            blocks = await self.engine.synthesize_async(text, self.voice_model, self._length_scale())
+            elapsed = time.perf_counter() - started
+
+        # Copying into the pool may wait for budget, so keep it off the event loop
+        buffer = await loop.run_in_executor(None, self._blocks_into_pool, iter(blocks))
+        if buffer.nbytes == 0:
+            buffer.release()
+            raise RuntimeError(f"{self.engine.display_name} generated empty audio data")
+        self.resource_policy.record_synthesis(elapsed, buffer.duration)
+        return buffer
+
+    async def prepare_audio_async(self, text, source_file_path=None):
+        """Async version of prepare_audio (cache, trimming and post-processing)"""
+        loop = asyncio.get_running_loop()
+        if self.route_quotes and self.dialogue_voice_model:
+            # Multi-voice chunks are driven synchronously; keep them off the loop
+            return await loop.run_in_executor(None, self.prepare_audio, text, source_file_path)
+
+        self._update_synthesis_rate()
+        key = self.cache_key(text)
+        cached = self._cached_audio(text, key)
+        if cached is not None:
+            self._count_trimmed_silence(cached, source_file_path)
+            return await loop.run_in_executor(None, self.conform_rate, cached)
+
+        speech_rate = self.synthesis_rate
+        buffer = await self.synthesize_async(text)
+        buffer.speech_rate = speech_rate
+        try:
+            await loop.run_in_executor(None, self._finish_buffer, buffer)
+        except BaseException:
+            buffer.release()
+            raise
+        audio = self.synthesis_cache.put(key, buffer)
+        self._count_trimmed_silence(audio, source_file_path)
+        return await loop.run_in_executor(None, self.conform_rate, audio)
+
+    def _finish_buffer(self, buffer):
+        self.trim_edge_silence(buffer)
+        self.post_process_pcm(buffer)
+
+    async def stream(self, spans, source_file_path=None, lookahead=2):
+        """
+        Asynchronously synthesize a sequence of text spans, keeping up to
+        lookahead syntheses running ahead of the consumer:
+
+            async for chunk in tts.stream(spans):
+                await tts.play_async(chunk.audio, chunk.unit)
+
+        spans are plain strings or (text, byte_start, byte_end) tuples; blank
+        spans are skipped. In just-in-time mode the resource policy may keep
+        fewer than lookahead syntheses running (see ResourcePolicy.lookahead).
+        Each yielded SpeechChunk's audio must be released (play_async does
+        this). Chunks with byte offsets are recorded in the timing map in
+        playback order.
+        """
+        pending = deque()
+        span_iter = iter(spans)
+
+        def schedule_next():
+            for span in span_iter:
+                if isinstance(span, str):
+                    text, byte_start, byte_end = span, None, None
+                else:
+                    text, byte_start, byte_end = span
+                if text.strip():
+                    task = asyncio.ensure_future(
+                        self.prepare_audio_async(sanitize_for_tts(text), source_file_path)
+                    )
+                    pending.append((text, byte_start, byte_end, task))
+                    return True
+            return False
+
+        try:
+            while len(pending) < self.resource_policy.lookahead(lookahead) and schedule_next():
+                pass
+
+            while pending:
+                text, byte_start, byte_end, task = pending.popleft()
+                # Look-ahead audio made before a rate change is stretched now
+                audio = self.conform_rate(await task)
+                while len(pending) < self.resource_policy.lookahead(lookahead) and schedule_next():
+                    pass
+
+                unit = None
+                if byte_start is not None:
+                    unit = self.timing_map.add_unit(byte_start, byte_end, audio.num_frames, audio.sample_rate)
+                    if self.trim_silence and self.sentence_gap_ms > 0:
+                        self.timing_map.add_gap(int(audio.sample_rate * self.sentence_gap_ms / 1000), audio.sample_rate)
+                yield SpeechChunk(text, byte_start, byte_end, audio, unit)
+        finally:
+            # Consumer stopped early: cancel look-ahead and return its audio
+            for *_, task in pending:
+                task.cancel()
+                task.add_done_callback(_release_task_result)
+
+    async def play_async(self, audio, unit=None):
+        """
+        Play audio and return once it (and the sentence gap) has finished.
+        Cancelling the awaiting task stops the sound immediately.
+        """
+        try:
+            self._ensure_mixer(audio.sample_rate, audio.channels)
+            sound = pygame.mixer.Sound(buffer=audio.data)
+        finally:
+            audio.release()
+
+        if unit is not None:
+            self._start_clock(unit)
+        sound.play()
+        try:
+            await asyncio.sleep(sound.get_length())
+            if self.trim_silence and self.sentence_gap_ms > 0:
+                await asyncio.sleep(self.sentence_gap_ms / 1000.0)
+        except asyncio.CancelledError:
+            sound.stop()
+            raise
+
+
+def _release_task_result(task):
+    """Done-callback that releases audio produced by a cancelled look-ahead task"""
+    if not task.cancelled() and task.exception() is None:
+        task.result().release()
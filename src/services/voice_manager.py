@@ -0,0 +1,300 @@
+# Voice manager that keeps Piper voice models loaded between synthesis calls
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict, Counter
+
+from services.resource_policy import pid_cpu_seconds
+
+
+class VoiceWorkerError(RuntimeError):
+    """A persistent Piper process could not be started or stopped responding"""
+
+
+class PiperWorker:
+    """
+    A long-running Piper process with one voice model loaded.
+    Piper reads one JSON request per line (--json-input) and prints the path
+    of each WAV file it writes to --output_dir, so the model is loaded once
+    instead of on every sentence. Rate is fixed per process (--length-scale):
+    Piper's JSON requests carry only the text and speaker.
+    resource_policy (a ResourcePolicy) sets the process's priority and threads.
+
+    close() never interrupts a request: a worker closed while another thread
+    is synthesizing on it (e.g. evicted by the voice manager) shuts down once
+    that request is done.
+    """
+
+    def __init__(self, voice_model, length_scale=1.0, resource_policy=None):
+        self.voice_model = voice_model
+        self.length_scale = length_scale
+        self.output_dir = tempfile.mkdtemp(prefix="piper-worker-")
+        self._lock = threading.Lock()  # One request at a time
+        self._state_lock = threading.Lock()  # Guards _busy and _closing
+        self._busy = False
+        self._closing = False
+        cmd = ['piper', '--model', voice_model, '--length-scale', str(length_scale),
+               '--json-input', '--output_dir', self.output_dir]
+        popen_kwargs = {}
+        if resource_policy is not None:
+            cmd = resource_policy.wrap_command(cmd)
+            popen_kwargs = resource_policy.popen_kwargs()
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding='utf-8',
+                bufsize=1,
+                **popen_kwargs
+            )
+        except FileNotFoundError:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            raise VoiceWorkerError("Piper TTS not found. Please install Piper TTS from https://github.com/rhasspy/piper")
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def synthesize(self, text, output_path):
+        """Synthesize text into a WAV file at output_path, at the worker's length_scale"""
+        with self._lock:
+            with self._state_lock:
+                if self._closing:
+                    raise VoiceWorkerError(f"Piper worker for {self.voice_model} was closed")
+                self._busy = True
+            try:
+                self._request(text, output_path)
+            finally:
+                with self._state_lock:
+                    self._busy = False
+                    close_now = self._closing
+                if close_now:
+                    self._shutdown()
+
+    def _request(self, text, output_path):
+        if not self.is_alive():
+            raise VoiceWorkerError(f"Piper worker for {self.voice_model} has exited")
+        request = {"text": " ".join(text.split())}
+        try:
+            self.process.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+            written = self.process.stdout.readline().strip()
+        except (OSError, ValueError) as e:
+            raise VoiceWorkerError(f"Piper worker for {self.voice_model} failed: {e}")
+        if not written or not os.path.exists(written):
+            raise VoiceWorkerError(f"Piper worker for {self.voice_model} stopped responding")
+        shutil.move(written, output_path)
+
+    def memory_bytes(self):
+        """Resident memory of the worker (estimated from the model size off Linux)"""
+        try:
+            with open(f"/proc/{self.process.pid}/statm", 'r') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError, AttributeError):
+            try:
+                return int(os.path.getsize(self.voice_model) * 1.5)
+            except OSError:
+                return 0
+
+    def cpu_seconds(self):
+        """CPU time the worker has used so far"""
+        return pid_cpu_seconds(self.process.pid) if self.is_alive() else 0.0
+
+    def close(self):
+        """Stop the process, or have the request in flight stop it when done"""
+        with self._state_lock:
+            self._closing = True
+            if self._busy:
+                return
+        with self._lock:
+            self._shutdown()
+
+    def _shutdown(self):
+        if self.is_alive():
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+
+class VoiceManager:
+    """
+    Keeps up to max_models Piper workers warm, evicting the least recently
+    used ones when the count or the memory budget is exceeded. It learns
+    which voice tends to follow which (e.g. narration -> dialogue) and starts
+    the predicted next voice in the background so switching doesn't wait for
+    a cold model load.
+    """
+
+    def __init__(self, max_models=2, memory_budget_mb=512, worker_factory=PiperWorker):
+        self.max_models = max(1, max_models)
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.worker_factory = worker_factory
+        self._workers = OrderedDict()  # (voice_model, length_scale) -> worker
+        self._starting = {}  # key -> Event set once the worker is ready
+        self._transitions = {}  # voice_model -> Counter of the voices used next
+        self._last_voice = None
+        self._cold_starts = 0
+        self._prewarmed = 0
+        self._warm_hits = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get_worker(self, voice_model, length_scale=1.0):
+        """Get a warm worker for a voice at a rate, starting one if needed"""
+        key = (voice_model, length_scale)
+        self._record_use(voice_model)
+
+        while True:
+            with self._lock:
+                worker = self._workers.get(key)
+                if worker is not None and worker.is_alive():
+                    self._workers.move_to_end(key)
+                    self._warm_hits += 1
+                    return worker
+                if worker is not None:
+                    del self._workers[key]
+                starting = self._starting.get(key)
+                if starting is None:
+                    starting = self._starting[key] = threading.Event()
+                    break
+            # Another thread is already loading this voice
+            starting.wait()
+
+        try:
+            worker = self.worker_factory(voice_model, length_scale)
+        finally:
+            with self._lock:
+                self._starting.pop(key).set()
+
+        with self._lock:
+            self._workers[key] = worker
+            self._cold_starts += 1
+            evicted = self._evict(keep=key)
+        for old in evicted:
+            old.close()
+        return worker
+
+    def discard(self, worker):
+        """Drop a worker that failed, so the next get_worker starts a new one"""
+        key = (worker.voice_model, worker.length_scale)
+        with self._lock:
+            if self._workers.get(key) is worker:
+                del self._workers[key]
+        worker.close()
+
+    def _evict(self, keep):
+        """
+        Pick least recently used workers over the count or memory budget (lock
+        held). Closing one that is mid-request lets that request finish first.
+        """
+        evicted = []
+        while len(self._workers) > 1:
+            over_count = len(self._workers) > self.max_models
+            over_budget = sum(worker.memory_bytes() for worker in self._workers.values()) > self.memory_budget
+            if not (over_count or over_budget):
+                break
+            key = next(iter(self._workers))
+            if key == keep:
+                break
+            evicted.append(self._workers.pop(key))
+            self._evictions += 1
+        return evicted
+
+    def _record_use(self, voice_model):
+        """Learn which voice follows which, for predict_next"""
+        with self._lock:
+            previous = self._last_voice
+            self._last_voice = voice_model
+            if previous is not None and previous != voice_model:
+                self._transitions.setdefault(previous, Counter())[voice_model] += 1
+
+    def predict_next(self, voice_model):
+        """The voice most often used after voice_model, or None"""
+        with self._lock:
+            following = self._transitions.get(voice_model)
+            if not following:
+                return None
+            return following.most_common(1)[0][0]
+
+    def is_warm(self, voice_model, length_scale=1.0):
+        with self._lock:
+            worker = self._workers.get((voice_model, length_scale))
+            return worker is not None and worker.is_alive()
+
+    def prewarm(self, voice_model, length_scale=1.0):
+        """Start a worker for a voice in the background if it isn't warm yet"""
+        if not voice_model or self.is_warm(voice_model, length_scale):
+            return None
+
+        def warm():
+            key = (voice_model, length_scale)
+            with self._lock:
+                if key in self._workers or key in self._starting:
+                    return
+                starting = self._starting[key] = threading.Event()
+            try:
+                worker = self.worker_factory(voice_model, length_scale)
+            except VoiceWorkerError:
+                return
+            finally:
+                with self._lock:
+                    self._starting.pop(key, None)
+                starting.set()
+            with self._lock:
+                self._workers[key] = worker
+                self._prewarmed += 1
+                # A pre-warmed voice is the next one expected, so it counts as most recent
+                evicted = self._evict(keep=key)
+            for old in evicted:
+                old.close()
+
+        thread = threading.Thread(target=warm, daemon=True)
+        thread.start()
+        return thread
+
+    def prewarm_predicted(self, voice_model, length_scale=1.0):
+        """Pre-warm whatever voice usually follows voice_model"""
+        predicted = self.predict_next(voice_model)
+        if predicted is not None:
+            return self.prewarm(predicted, length_scale)
+        return None
+
+    def cpu_seconds(self):
+        """CPU time used so far by the running workers"""
+        with self._lock:
+            workers = list(self._workers.values())
+        return sum(worker.cpu_seconds() for worker in workers if hasattr(worker, "cpu_seconds"))
+
+    def close(self):
+        """Stop every worker"""
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
+
+    def stats(self):
+        """Warm models, memory use and hit counters"""
+        with self._lock:
+            workers = list(self._workers.items())
+            stats = {
+                "cold_starts": self._cold_starts,
+                "prewarmed": self._prewarmed,
+                "warm_hits": self._warm_hits,
+                "evictions": self._evictions,
+            }
+        stats["models"] = [{"voice_model": model, "length_scale": scale, "memory_bytes": worker.memory_bytes()}
+                           for (model, scale), worker in workers]
+        stats["memory_bytes"] = sum(model["memory_bytes"] for model in stats["models"])
+        stats["max_models"] = self.max_models
+        stats["memory_budget_bytes"] = self.memory_budget
+        return stats
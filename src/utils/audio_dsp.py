@@ -0,0 +1,248 @@
+# Vectorized DSP helpers for post-processing synthesized int16 PCM audio
+import numpy as np
+
+
+INT16_MAX = 32767.0
+
+
+def pcm_as_array(buffer):
+    """Get a writable int16 NumPy view over a PCMBuffer (no copy)"""
+    return np.frombuffer(buffer.data, dtype=np.int16)
+
+
+def _write_back(samples, values):
+    """Clip float samples to the int16 range and store them in place"""
+    np.clip(values, -INT16_MAX - 1, INT16_MAX, out=values)
+    np.rint(values, out=values)
+    samples[:] = values
+
+
+def apply_gain(samples, gain):
+    """Scale int16 samples in place by a linear gain factor"""
+    if gain == 1.0 or samples.size == 0:
+        return samples
+    values = samples.astype(np.float32)
+    values *= gain
+    _write_back(samples, values)
+    return samples
+
+
+def rms_dbfs(samples):
+    """Root-mean-square level of int16 samples in dB relative to full scale"""
+    if samples.size == 0:
+        return float('-inf')
+    values = samples.astype(np.float32) / INT16_MAX
+    rms = float(np.sqrt(np.mean(values * values)))
+    return 20.0 * np.log10(rms) if rms > 0 else float('-inf')
+
+
+def normalize_loudness(samples, target_dbfs=-20.0, peak_limit=0.95):
+    """
+    Bring the RMS level of int16 samples to target_dbfs in place.
+    The gain is capped so the peak never exceeds peak_limit of full scale.
+    """
+    level = rms_dbfs(samples)
+    if level == float('-inf'):
+        return samples
+
+    gain = 10.0 ** ((target_dbfs - level) / 20.0)
+    peak = float(np.max(np.abs(samples.astype(np.int32)))) / INT16_MAX
+    if peak > 0:
+        gain = min(gain, peak_limit / peak)
+    return apply_gain(samples, gain)
+
+
+def frame_levels_db(samples, sample_rate, frame_ms=10):
+    """Per-frame RMS level in dBFS, computed with a single reshape"""
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = samples.size // frame_len
+    if n_frames == 0:
+        return np.full(1, rms_dbfs(samples)), frame_len
+
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32) / INT16_MAX
+    power = np.mean(frames * frames, axis=1)
+    with np.errstate(divide='ignore'):
+        levels = 10.0 * np.log10(power)
+    return levels, frame_len
+
+
+def find_speech_bounds(samples, sample_rate, threshold_db=-45.0, frame_ms=10, padding_ms=20):
+    """
+    Locate the first and last non-silent sample.
+    Returns (start, end) sample indices; (0, 0) if the whole chunk is silent.
+    """
+    if samples.size == 0:
+        return 0, 0
+
+    levels, frame_len = frame_levels_db(samples, sample_rate, frame_ms)
+    voiced = np.flatnonzero(levels > threshold_db)
+    if voiced.size == 0:
+        return 0, 0
+
+    padding = int(sample_rate * padding_ms / 1000)
+    start = max(0, int(voiced[0]) * frame_len - padding)
+    end = min(samples.size, (int(voiced[-1]) + 1) * frame_len + padding)
+    return start, end
+
+
+def trim_silence(buffer, threshold_db=-45.0, padding_ms=20):
+    """
+    Drop leading and trailing silence from a PCMBuffer in place.
+    Returns the number of sample frames removed.
+    """
+    samples = pcm_as_array(buffer)
+    channels = buffer.channels
+    mono = samples[::channels] if channels > 1 else samples
+    start, end = find_speech_bounds(mono, buffer.sample_rate, threshold_db, padding_ms=padding_ms)
+
+    kept = end - start
+    removed = mono.size - kept
+    if removed <= 0:
+        return 0
+
+    if start > 0 and kept > 0:
+        # Overlapping slice assignment is handled as a memmove by NumPy
+        samples[:kept * channels] = samples[start * channels:end * channels]
+    buffer.resize(kept * channels * buffer.sample_width)
+    return removed
+
+
+def resample(values, out_length):
+    """Linear-interpolation resampling of a float signal to out_length samples"""
+    if out_length <= 0 or values.size == 0:
+        return np.zeros(max(out_length, 0), dtype=np.float32)
+    if out_length == values.size:
+        return values
+    positions = np.linspace(0, values.size - 1, out_length, dtype=np.float64)
+    return np.interp(positions, np.arange(values.size), values).astype(np.float32)
+
+
+def convert_pcm(samples, sample_rate, channels, to_rate, to_channels):
+    """Convert int16 samples to another sample rate/channel count (a copy only when needed)"""
+    if sample_rate == to_rate and channels == to_channels:
+        return samples
+    values = samples.astype(np.float32)
+    if channels > 1:
+        values = values.reshape(-1, channels).mean(axis=1)
+    if sample_rate != to_rate:
+        values = resample(values, int(round(values.size * to_rate / sample_rate)))
+    if to_channels > 1:
+        values = np.repeat(values, to_channels)
+    np.clip(values, -INT16_MAX - 1, INT16_MAX, out=values)
+    return np.rint(values).astype(np.int16)
+
+
+def time_stretch(values, factor, sample_rate, frame_ms=30, tolerance_ms=8):
+    """
+    Change the tempo of a float mono signal by factor (>1 is faster) without
+    changing its pitch, using WSOLA (waveform-similarity overlap-add).
+    Each output frame is taken from the analysis position, shifted by up to
+    tolerance_ms to best continue the previous frame, which avoids the phasing
+    artifacts of plain overlap-add.
+    """
+    if factor == 1.0 or values.size == 0:
+        return values.astype(np.float32, copy=True)
+
+    frame_len = max(32, int(sample_rate * frame_ms / 1000)) & ~1
+    synthesis_hop = frame_len // 2
+    analysis_hop = synthesis_hop * factor
+    tolerance = max(1, int(sample_rate * tolerance_ms / 1000))
+
+    out_length = int(round(values.size / factor))
+    n_frames = out_length // synthesis_hop + 2
+
+    # Pad so every candidate window stays in range
+    pad_front = tolerance
+    pad_back = frame_len + 2 * tolerance + int(analysis_hop) + synthesis_hop
+    padded = np.concatenate((
+        np.zeros(pad_front, dtype=np.float32),
+        values.astype(np.float32, copy=False),
+        np.zeros(pad_back, dtype=np.float32),
+    ))
+    max_pos = padded.size - frame_len
+
+    window = np.hanning(frame_len).astype(np.float32)
+    output = np.zeros(n_frames * synthesis_hop + frame_len, dtype=np.float32)
+    norm = np.zeros_like(output)
+
+    prev_pos = pad_front
+    for k in range(n_frames):
+        nominal = pad_front + int(k * analysis_hop)
+        if k == 0:
+            pos = nominal
+        else:
+            # The frame that would naturally follow the previous one
+            natural = min(prev_pos + synthesis_hop, max_pos)
+            target = padded[natural:natural + frame_len]
+            lo = max(0, nominal - tolerance)
+            hi = min(max_pos, nominal + tolerance)
+            region = padded[lo:hi + frame_len]
+            scores = np.correlate(region, target, mode='valid')
+            pos = lo + int(np.argmax(scores)) if scores.size else nominal
+        pos = min(pos, max_pos)
+
+        start = k * synthesis_hop
+        output[start:start + frame_len] += padded[pos:pos + frame_len] * window
+        norm[start:start + frame_len] += window
+        prev_pos = pos
+
+    np.maximum(norm, 1e-3, out=norm)
+    output /= norm
+    return output[:out_length]
+
+
+def change_tempo(samples, factor, sample_rate, channels=1):
+    """
+    Time-stretch int16 samples by factor (>1 is faster) keeping the pitch.
+    Returns a new int16 array of about len(samples) / factor samples.
+    """
+    if channels == 1:
+        stretched = time_stretch(samples.astype(np.float32), factor, sample_rate)
+    else:
+        frames = samples.reshape(-1, channels).astype(np.float32)
+        columns = [time_stretch(frames[:, channel], factor, sample_rate) for channel in range(channels)]
+        stretched = np.stack(columns, axis=1).reshape(-1)
+    np.clip(stretched, -INT16_MAX - 1, INT16_MAX, out=stretched)
+    return np.rint(stretched).astype(np.int16)
+
+
+def pitch_shift(samples, pitch, sample_rate):
+    """
+    Shift the pitch of int16 mono samples in place by a ratio (2.0 = one octave up)
+    while keeping the duration: time-stretch by 1/pitch, then resample back to
+    the original length.
+    """
+    if pitch == 1.0 or samples.size == 0:
+        return samples
+
+    values = samples.astype(np.float32)
+    stretched = time_stretch(values, 1.0 / pitch, sample_rate)
+    shifted = resample(stretched, samples.size)
+    _write_back(samples, shifted)
+    return samples
+
+
+def post_process(buffer, volume=1.0, pitch=1.0, normalize=False, target_dbfs=-20.0):
+    """
+    Apply pitch, loudness normalization and volume to a PCMBuffer in place.
+    The buffer length never changes here, so it can be called on pooled buffers.
+    """
+    samples = pcm_as_array(buffer)
+    if samples.size == 0:
+        return buffer
+
+    if pitch != 1.0:
+        if buffer.channels == 1:
+            pitch_shift(samples, pitch, buffer.sample_rate)
+        else:
+            frames = samples.reshape(-1, buffer.channels)
+            for channel in range(buffer.channels):
+                column = np.ascontiguousarray(frames[:, channel])
+                pitch_shift(column, pitch, buffer.sample_rate)
+                frames[:, channel] = column
+
+    if normalize:
+        normalize_loudness(samples, target_dbfs)
+
+    apply_gain(samples, volume)
+    return buffer
@@ -0,0 +1,162 @@
+# Opt-in profiling of the playback path for attaching to bug reports
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+# Setting this to 1/true/yes turns profiling on regardless of app_config.json
+PROFILE_ENV_VAR = "TEXT_READER_PROFILE"
+# Overrides the directory profiles are written to
+PROFILE_DIR_ENV_VAR = "TEXT_READER_PROFILE_DIR"
+
+
+def profiling_enabled(settings=None):
+    """Whether profiling is requested by the environment or the "profiling" config section"""
+    value = os.environ.get(PROFILE_ENV_VAR)
+    if value is not None:
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool((settings or {}).get("enabled", False))
+
+
+def thread_cpu_times():
+    """CPU seconds used so far by each live thread, keyed by thread name"""
+    times = {}
+    for thread in threading.enumerate():
+        try:
+            clock = time.pthread_getcpuclockid(thread.ident)
+            times[thread.name] = time.clock_gettime(clock)
+        except (AttributeError, OSError, TypeError):
+            # No per-thread clocks on this platform: only the calling thread is measurable
+            if thread is threading.current_thread():
+                times[thread.name] = time.thread_time()
+    return times
+
+
+class PlaybackProfiler:
+    """
+    Records one profile per playback session: a cProfile of the playback
+    thread, tracemalloc peaks around every synthesized chunk plus the
+    allocation sites that grew over the session, and per-thread CPU time.
+    Each session writes <stamp>-<name>.prof/.txt/.json into output_dir; only
+    the newest max_sessions sessions are kept, so the directory stays small
+    enough to attach to a bug report.
+    """
+
+    def __init__(self, output_dir="config/profiles", max_sessions=10, top_entries=40,
+                 trace_allocations=True, tracemalloc_frames=5):
+        self.output_dir = Path(os.environ.get(PROFILE_DIR_ENV_VAR) or output_dir)
+        self.max_sessions = max(1, max_sessions)
+        self.top_entries = top_entries
+        self.trace_allocations = trace_allocations
+        self.tracemalloc_frames = tracemalloc_frames
+        self._lock = threading.Lock()
+        self._synthesis = None
+
+    @contextmanager
+    def session(self, name="playback"):
+        """Profile the calling thread for the duration of the block"""
+        started_tracing = False
+        start_snapshot = None
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.tracemalloc_frames)
+                started_tracing = True
+            start_snapshot = tracemalloc.take_snapshot()
+
+        with self._lock:
+            self._synthesis = {"chunks": 0, "seconds": 0.0, "max_seconds": 0.0, "peak_bytes": 0}
+        cpu_before = thread_cpu_times()
+        wall_start = time.perf_counter()
+        thread_start = time.thread_time()
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield self
+        finally:
+            profile.disable()
+            report = {
+                "session": name,
+                "started": datetime.now().isoformat(timespec='seconds'),
+                "wall_seconds": time.perf_counter() - wall_start,
+                "cpu_seconds": time.thread_time() - thread_start,
+                "threads_cpu_seconds": _cpu_deltas(cpu_before, thread_cpu_times()),
+            }
+            with self._lock:
+                report["synthesis"] = self._synthesis
+                self._synthesis = None
+
+            allocation_lines = []
+            if start_snapshot is not None:
+                report["traced_memory"] = dict(zip(("current_bytes", "peak_bytes"), tracemalloc.get_traced_memory()))
+                growth = tracemalloc.take_snapshot().compare_to(start_snapshot, 'lineno')
+                allocation_lines = [str(stat) for stat in growth[:self.top_entries]]
+                if started_tracing:
+                    tracemalloc.stop()
+            try:
+                self._write(name, profile, report, allocation_lines)
+            except OSError as e:
+                print(f"Could not write profile: {e}")
+
+    @contextmanager
+    def synthesis(self):
+        """Measure time and peak traced memory of one synthesized chunk"""
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if tracing else 0
+            with self._lock:
+                stats = self._synthesis
+                if stats is not None:
+                    stats["chunks"] += 1
+                    stats["seconds"] += elapsed
+                    stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+                    stats["peak_bytes"] = max(stats["peak_bytes"], peak)
+
+    def _write(self, name, profile, report, allocation_lines):
+        """Write the session's files and drop the oldest sessions"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        base = self.output_dir / f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{name}"
+
+        profile.dump_stats(str(base) + ".prof")
+
+        summary = io.StringIO()
+        stats = pstats.Stats(profile, stream=summary)
+        stats.sort_stats('cumulative').print_stats(self.top_entries)
+        if allocation_lines:
+            summary.write("\nAllocation growth over the session (top sites):\n")
+            summary.write("\n".join(allocation_lines) + "\n")
+        with open(str(base) + ".txt", 'w', encoding='utf-8') as f:
+            f.write(summary.getvalue())
+
+        with open(str(base) + ".json", 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+        self._prune()
+
+    def _prune(self):
+        """Keep only the newest max_sessions sessions"""
+        reports = sorted(self.output_dir.glob("*.json"))
+        for old in reports[:-self.max_sessions]:
+            for suffix in (".prof", ".txt", ".json"):
+                try:
+                    old.with_suffix(suffix).unlink()
+                except OSError:
+                    pass
+
+
+def _cpu_deltas(before, after):
+    """CPU seconds each thread used between two thread_cpu_times() readings"""
+    return {name: round(seconds - before.get(name, 0.0), 4) for name, seconds in after.items()}
@@ -2,13 +2,62 @@
 import re
 
 
-def split_text_by_sentences(text, max_chunk_size=2048):
+# Full-width sentence terminators end a sentence even without a following space;
+# closing quotes/brackets right after them belong to the same sentence
+CJK_SENTENCE_END = r'[。！？｡]+[」』”’）)\]]*'
+# (the leading lookahead lets the regex engine scan for terminator characters quickly)
+SENTENCE_END_PATTERN = re.compile(r'(?=[.!?。！？｡])(?:[.!?]+\s+|' + CJK_SENTENCE_END + r'\s*)')
+# ASCII terminators are dropped along with the following space; CJK ones are kept
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?=[.!?。！？｡])(?:[.!?]+\s+|(' + CJK_SENTENCE_END + r')\s*)')
+
+# Clause punctuation where an over-long sentence can be broken without cutting a phrase
+CLAUSE_BREAK_CHARS = '，、；：,;:'
+
+CJK_CHAR_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]')
+
+# Chunk size targets in bytes per script. CJK text packs ~3 bytes into each
+# character and has no spaces, and Piper's time to first audio grows with
+# chunk length, so CJK chunks are kept much shorter.
+CHUNK_SIZE_TARGETS = {"latin": 2048, "cjk": 360}
+
+
+def detect_script(text, sample_chars=500):
+    """Classify text as 'cjk' or 'latin' from a sample of its characters"""
+    sample = "".join(text[:sample_chars].split())
+    if not sample:
+        return "latin"
+    cjk = len(CJK_CHAR_PATTERN.findall(sample))
+    return "cjk" if cjk * 4 >= len(sample) else "latin"
+
+
+def chunk_size_for(text):
+    """Chunk size target (bytes) for the script the text is written in"""
+    return CHUNK_SIZE_TARGETS[detect_script(text)]
+
+
+def _split_sentences(text):
+    """Split text into sentences at ASCII and full-width terminators"""
+    # The capturing group interleaves each kept CJK terminator (or None) with the sentences
+    parts = SENTENCE_SPLIT_PATTERN.split(text)
+    sentences = [sentence + (terminator or "") for sentence, terminator in zip(parts[::2], parts[1::2])]
+    sentences.append(parts[-1])
+    return sentences
+
+
+def split_text_by_sentences(text, max_chunk_size=None):
     """
     Split text into chunks by sentences, ensuring each chunk doesn't exceed max_chunk_size.
     This helps with more natural TTS reading.
+    max_chunk_size defaults to the target for the text's script.
     """
+    script = detect_script(text)
+    if max_chunk_size is None:
+        max_chunk_size = CHUNK_SIZE_TARGETS[script]
+    # CJK sentences are joined without a space
+    separator = "" if script == "cjk" else " "
+
     # First, break the text into sentences
-    sentences = re.split(r'[.!?]+\s+', text)
+    sentences = _split_sentences(text)
     
     chunks = []
     current_chunk = ""
@@ -18,7 +67,7 @@ def split_text_by_sentences(text, max_chunk_size=2048):
         if len(current_chunk.encode('utf-8')) + len(sentence.encode('utf-8')) + 1 <= max_chunk_size:
             # Add the sentence to the current chunk
             if current_chunk:
-                current_chunk += " " + sentence
+                current_chunk += separator + sentence
             else:
                 current_chunk = sentence
         else:
@@ -27,7 +76,12 @@ def split_text_by_sentences(text, max_chunk_size=2048):
                 chunks.append(current_chunk)
             
             # If the sentence itself is larger than max_chunk_size, split it by words
-            if len(sentence.encode('utf-8')) > max_chunk_size:
+            # (or by clauses when it has no spaces to split at, as in CJK text)
+            if len(sentence.encode('utf-8')) > max_chunk_size and not any(c.isspace() for c in sentence.strip()):
+                pieces = _split_oversized(sentence, max_chunk_size)
+                chunks.extend(pieces[:-1])
+                current_chunk = pieces[-1]
+            elif len(sentence.encode('utf-8')) > max_chunk_size:
                 words = sentence.split()
                 current_chunk = ""
                 
@@ -64,15 +118,27 @@ def split_text_by_sentences(text, max_chunk_size=2048):
     return chunks
 
 
-def estimate_reading_time(text, words_per_minute=150):
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def count_words(text):
+    """Number of words in text, as estimate_reading_time counts them"""
+    return len(WORD_PATTERN.findall(text))
+
+
+def estimate_reading_time(text, words_per_minute=150, word_count=None):
     """
     Estimate the reading time for the given text based on average words per minute.
+    A word_count counted beforehand (e.g. by streaming a large file through
+    count_words) can be passed instead of the text.
     """
-    if not text:
+    if word_count is not None:
+        words = word_count
+    elif not text:
         return 0
-    
-    # Count words in the text
-    words = len(re.findall(r'\w+', text))
+    else:
+        # Count words in the text
+        words = count_words(text)
     
     # Calculate minutes and convert to seconds
     minutes = words / words_per_minute
@@ -112,4 +178,130 @@ def sanitize_for_tts(text):
     for pattern, replacement in replacements.items():
         sanitized_text = re.sub(pattern, replacement, sanitized_text, flags=re.IGNORECASE)
     
-    return sanitized_text
\ No newline at end of file
+    return sanitized_text
+
+# Bytes that are not valid UTF-8 are decoded with errors='surrogateescape' into
+# these lone surrogates, one per byte, so the file's byte offsets can be recovered
+_UNDECODABLE = {code: '\ufffd' for code in range(0xDC80, 0xDD00)}
+
+
+def utf8_length(text):
+    """
+    Bytes text takes up in the file: len(text.encode('utf-8')), except that
+    each undecodable byte kept as a surrogate escape counts as the one byte it was
+    """
+    return len(text.encode('utf-8', errors='surrogateescape'))
+
+
+def replace_undecodable(text):
+    """
+    Show surrogate-escaped bytes as U+FFFD, one per byte, so character
+    positions are unchanged (for display and speech)
+    """
+    return text.translate(_UNDECODABLE)
+
+
+def split_text_into_spans(text, base_offset=0, max_chunk_size=None):
+    """
+    Split text into sentence spans that cover it without gaps.
+    Unlike split_text_by_sentences, punctuation and whitespace are kept, so
+    byte offsets stay exact. Returns a list of (sentence_text, byte_start, byte_end)
+    where offsets are relative to base_offset.
+    text may hold undecodable bytes as surrogate escapes (see
+    FileService.read_text_window): they count as one byte each, and come
+    back as U+FFFD in the sentence text.
+    max_chunk_size defaults to the target for the text's script.
+    """
+    if max_chunk_size is None:
+        max_chunk_size = chunk_size_for(text)
+
+    spans = []
+    position = base_offset
+    sentence_start = 0
+
+    boundaries = [match.end() for match in SENTENCE_END_PATTERN.finditer(text)]
+    if not boundaries or boundaries[-1] != len(text):
+        boundaries.append(len(text))
+
+    for boundary in boundaries:
+        sentence = text[sentence_start:boundary]
+        sentence_start = boundary
+        for piece in _split_oversized(sentence, max_chunk_size):
+            size = utf8_length(piece)
+            spans.append((replace_undecodable(piece), position, position + size))
+            position += size
+
+    return spans
+
+
+def _split_oversized(sentence, max_chunk_size):
+    """
+    Break a sentence longer than max_chunk_size bytes after clause punctuation,
+    else at whitespace (or anywhere)
+    """
+    if utf8_length(sentence) <= max_chunk_size:
+        return [sentence] if sentence else []
+
+    pieces = []
+    remaining = sentence
+    while utf8_length(remaining) > max_chunk_size:
+        # Longest prefix that fits, measured in bytes (at least one character)
+        prefix = remaining.encode('utf-8', errors='surrogateescape')[:max_chunk_size]
+        cut = max(1, len(prefix.decode('utf-8', errors='ignore')))
+        # Prefer a clause break in the second half of the prefix, so pieces stay even
+        clause = max(remaining.rfind(mark, cut // 2, cut) for mark in CLAUSE_BREAK_CHARS)
+        space = remaining.rfind(' ', 0, cut)
+        if clause > 0:
+            cut = clause + 1
+        elif space > 0:
+            cut = space + 1
+        pieces.append(remaining[:cut])
+        remaining = remaining[cut:]
+    if remaining:
+        pieces.append(remaining)
+    return pieces
+
+
+# Opening quote -> closing quote for dialogue detection
+QUOTE_PAIRS = {'"': '"', '“': '”', '«': '»', '「': '」', '『': '』'}
+
+
+def split_quoted_segments(text):
+    """
+    Split text into (segment, is_quoted) runs, e.g. for reading dialogue with
+    a second voice. A quote left open at the end of the text runs to the end;
+    a closing quote with no opening one marks everything before it as quoted
+    (dialogue continuing from the previous sentence). Segments without any
+    letters or digits are merged into their neighbours.
+    """
+    segments = []
+    closers = set(QUOTE_PAIRS.values()) - set(QUOTE_PAIRS)
+    first_open = min((text.find(q) for q in QUOTE_PAIRS if q in text), default=len(text))
+    first_close = min((text.find(q) for q in closers if q in text), default=len(text))
+
+    position = 0
+    if first_close < first_open:
+        segments.append([text[:first_close + 1], True])
+        position = first_close + 1
+
+    while position < len(text):
+        opening = min((text.find(q, position) for q in QUOTE_PAIRS if q in text[position:]), default=-1)
+        if opening < 0:
+            segments.append([text[position:], False])
+            break
+        if opening > position:
+            segments.append([text[position:opening], False])
+        closing = text.find(QUOTE_PAIRS[text[opening]], opening + 1)
+        end = len(text) if closing < 0 else closing + 1
+        segments.append([text[opening:end], True])
+        position = end
+
+    merged = []
+    for segment in segments:
+        if merged and (merged[-1][1] == segment[1] or not any(c.isalnum() for c in segment[0])):
+            merged[-1][0] += segment[0]
+        elif merged and not any(c.isalnum() for c in merged[-1][0]):
+            merged[-1] = [merged[-1][0] + segment[0], segment[1]]
+        else:
+            merged.append(segment)
+    return [(segment, quoted) for segment, quoted in merged]
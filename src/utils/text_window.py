@@ -0,0 +1,68 @@
+# Window of decoded file text shown by the text viewer, with byte <-> character offset mapping
+import sys
+from pathlib import Path
+
+# Add the src directory to the path to enable imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.text_processing import utf8_length, replace_undecodable
+
+
+class TextWindow:
+    """
+    The slice start..end of a file that the viewer holds, as text.
+    text keeps undecodable bytes surrogate-escaped (as read_text_window
+    returns it), so every byte of the slice maps to exactly one place;
+    display_text shows each of them as U+FFFD, one character per byte, so
+    character offsets are the same in both.
+    """
+
+    def __init__(self, text="", start=0, end=0):
+        self.text = text
+        self.start = start
+        self.end = end
+        self._bytes = text.encode('utf-8', errors='surrogateescape')
+
+    @property
+    def display_text(self):
+        return replace_undecodable(self.text)
+
+    def __bool__(self):
+        return bool(self._bytes)
+
+    def contains(self, byte_start, byte_end):
+        """Whether the byte span lies inside the window"""
+        return self.start <= byte_start and byte_end <= self.end
+
+    def byte_to_char(self, byte_offset):
+        """
+        Character offset in the text of a file byte offset (clamped to the
+        window); an offset inside a multi-byte character maps to its start
+        """
+        relative = min(max(0, byte_offset - self.start), len(self._bytes))
+        prefix = self._bytes[:relative].decode('utf-8', errors='surrogateescape')
+        # A cut character decodes as up to three escaped bytes; stop where it starts
+        for index in range(max(0, len(prefix) - 3), len(prefix)):
+            if index >= len(self.text) or prefix[index] != self.text[index]:
+                return index
+        return len(prefix)
+
+    def char_to_byte(self, chars):
+        """File byte offset of a character offset in the text"""
+        return self.start + utf8_length(self.text[:max(0, chars)])
+
+    def needs_reread(self, first, last, file_size, edge_fraction):
+        """
+        Whether the view, showing fractions first..last of the window, is close
+        enough to an edge that has more file behind it to re-read the window
+        """
+        near_top = first < edge_fraction and self.start > 0
+        near_bottom = last > 1.0 - edge_fraction and self.end < file_size
+        return near_top or near_bottom
+
+
+def scroll_fractions(top, bottom, file_size):
+    """Scrollbar (first, last) for the visible byte range top..bottom of a file"""
+    if file_size <= 0:
+        return 0.0, 1.0
+    return top / file_size, min(max(bottom, top + 1), file_size) / file_size
@@ -0,0 +1,87 @@
+# Timing map linking synthesized audio samples back to byte spans in the source file
+import threading
+from collections import namedtuple
+
+
+TimingUnit = namedtuple('TimingUnit', ['byte_start', 'byte_end', 'sample_start', 'sample_end'])
+
+
+class TimingMap:
+    """
+    Records, at synthesis time, which byte span of the file each synthesized
+    unit covers and where it sits on the audio timeline.
+    Lookups by sample offset are O(1): a bucket table maps every
+    bucket_seconds of audio to the first unit overlapping it, so at most a
+    couple of units are inspected per lookup.
+    """
+
+    def __init__(self, sample_rate=22050, bucket_seconds=0.1):
+        self.sample_rate = sample_rate
+        self.bucket_seconds = bucket_seconds
+        self.bucket_size = max(1, int(sample_rate * bucket_seconds))
+        self._units = []
+        self._buckets = []  # bucket index -> unit index
+        self._total_samples = 0
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Forget all units (e.g. after a seek)"""
+        with self._lock:
+            self._units = []
+            self._buckets = []
+            self._total_samples = 0
+
+    @property
+    def total_samples(self):
+        """Length of the recorded timeline in samples"""
+        return self._total_samples
+
+    def add_unit(self, byte_start, byte_end, num_samples, sample_rate=None):
+        """Append a synthesized unit to the end of the timeline"""
+        if sample_rate and not self._units and self._total_samples == 0:
+            # Adopt the rate of the first chunk so offsets stay in native samples
+            self.sample_rate = sample_rate
+            self.bucket_size = max(1, int(sample_rate * self.bucket_seconds))
+        if sample_rate and sample_rate != self.sample_rate:
+            num_samples = int(num_samples * self.sample_rate / sample_rate)
+
+        with self._lock:
+            start = self._total_samples
+            end = start + max(0, num_samples)
+            unit = TimingUnit(byte_start, byte_end, start, end)
+            self._units.append(unit)
+            self._total_samples = end
+            self._fill_buckets(end, len(self._units) - 1)
+            return unit
+
+    def add_gap(self, num_samples, sample_rate=None):
+        """Append silence that belongs to no unit (e.g. sentence gaps)"""
+        if sample_rate and sample_rate != self.sample_rate:
+            num_samples = int(num_samples * self.sample_rate / sample_rate)
+        with self._lock:
+            self._total_samples += max(0, num_samples)
+            self._fill_buckets(self._total_samples, max(0, len(self._units) - 1))
+
+    def _fill_buckets(self, end, unit_index):
+        """Point every bucket that starts before end at a unit (lock held)"""
+        while len(self._buckets) * self.bucket_size < end:
+            self._buckets.append(unit_index)
+
+    def lookup(self, sample):
+        """Get the unit playing at a sample offset, or None"""
+        with self._lock:
+            if not self._units or sample < 0 or sample >= self._total_samples:
+                return None
+
+            index = self._buckets[min(sample // self.bucket_size, len(self._buckets) - 1)]
+            # Bucket points at the unit covering its start; step forward if needed
+            while index + 1 < len(self._units) and self._units[index].sample_end <= sample:
+                index += 1
+
+            unit = self._units[index]
+            if unit.sample_start <= sample < unit.sample_end:
+                return unit
+            return None
+
+    def __len__(self):
+        return len(self._units)
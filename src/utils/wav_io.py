@@ -0,0 +1,89 @@
+# Minimal WAV (RIFF) helpers for moving PCM data without extra copies
+import struct
+
+
+class WavFormatError(ValueError):
+    """Raised when a WAV stream cannot be parsed"""
+
+
+def read_wav_header(f):
+    """
+    Parse the RIFF header of an open binary WAV stream.
+    Returns (sample_rate, channels, sample_width, data_size) and leaves the
+    stream positioned at the first byte of the PCM data.
+    """
+    riff = f.read(12)
+    if len(riff) < 12 or riff[:4] != b'RIFF' or riff[8:12] != b'WAVE':
+        raise WavFormatError("Not a RIFF/WAVE stream")
+
+    sample_rate = channels = sample_width = None
+    while True:
+        chunk_header = f.read(8)
+        if len(chunk_header) < 8:
+            raise WavFormatError("WAV stream has no data chunk")
+        chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+
+        if chunk_id == b'fmt ':
+            fmt = f.read(chunk_size + (chunk_size & 1))
+            audio_format, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+            if audio_format not in (1, 0xFFFE):
+                raise WavFormatError(f"Unsupported WAV encoding: {audio_format}")
+            sample_width = bits // 8
+        elif chunk_id == b'data':
+            if sample_rate is None:
+                raise WavFormatError("WAV data chunk precedes fmt chunk")
+            return sample_rate, channels, sample_width, chunk_size
+        else:
+            # Skip chunks we don't care about (LIST, fact, ...)
+            f.seek(chunk_size + (chunk_size & 1), 1)
+
+
+def parse_wav_bytes(audio_data):
+    """
+    Locate the PCM payload inside in-memory WAV data.
+    Returns (sample_rate, channels, sample_width, memoryview of the PCM data)
+    without copying the payload.
+    """
+    view = memoryview(audio_data)
+    stream = _MemoryReader(view)
+    sample_rate, channels, sample_width, data_size = read_wav_header(stream)
+    start = stream.tell()
+    end = min(len(view), start + data_size)
+    return sample_rate, channels, sample_width, view[start:end]
+
+
+def wav_header(sample_rate, channels=1, sample_width=2, data_size=0):
+    """Build a canonical 44-byte PCM WAV header"""
+    byte_rate = sample_rate * channels * sample_width
+    block_align = channels * sample_width
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, byte_rate, block_align, sample_width * 8,
+        b'data', data_size
+    )
+
+
+class _MemoryReader:
+    """Tiny read/seek/tell adapter over a memoryview (avoids BytesIO copies)"""
+
+    def __init__(self, view):
+        self._view = view
+        self._pos = 0
+
+    def read(self, size):
+        data = self._view[self._pos:self._pos + size].tobytes()
+        self._pos += len(data)
+        return data
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            self._pos += offset
+        elif whence == 2:
+            self._pos = len(self._view) + offset
+        else:
+            self._pos = offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
@@ -0,0 +1,147 @@
+# Virtualized text viewer that shows huge files without loading them into Tk
+import sys
+import tkinter as tk
+from pathlib import Path
+from tkinter import ttk
+
+# Add the src directory to the path to enable imports
+sys.path.append(str(Path(__file__).parent.parent))
+
+from utils.text_window import TextWindow, scroll_fractions
+
+
+class VirtualTextView(ttk.Frame):
+    """
+    A read-only text view over a FileService.
+    Only the visible region plus a margin on each side is kept in the Text
+    widget; the scrollbar represents byte offsets over the whole file, and
+    the window is re-read from the file as the user scrolls. Memory use is
+    therefore the same for a 10KB file and a multi-GB one.
+    """
+
+    VISIBLE_BYTES = 4096  # Rough amount of text that fills the widget
+    WINDOW_MARGIN = 4096  # Extra bytes kept above and below the visible text
+    EDGE_FRACTION = 0.15  # Re-read the window when scrolled this close to its edge
+
+    def __init__(self, parent, file_service, on_position_selected=None, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.file_service = file_service
+        self.on_position_selected = on_position_selected
+
+        self._window = TextWindow()
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.text = tk.Text(self, wrap=tk.WORD, height=10, cursor="arrow", state=tk.DISABLED)
+        self.text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.text.tag_configure("current_sentence", background="#fff2a8")
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        # Scrolling is handled here so the Text never scrolls past its window
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", lambda e: self._scroll_lines(-3))
+        self.text.bind("<Button-5>", lambda e: self._scroll_lines(3))
+        self.text.bind("<Button-1>", self._on_click)
+
+    def clear(self):
+        """Remove all text (e.g. when no file is loaded)"""
+        self._window = TextWindow()
+        self._set_text("")
+        self.scrollbar.set(0.0, 1.0)
+
+    def show_position(self, position):
+        """Render the window so that the line containing position is at the top"""
+        if not self.file_service.is_file_loaded():
+            self.clear()
+            return
+
+        # The playback thread may load the next playlist file at any time
+        with self.file_service.lock:
+            top = self.file_service.find_line_start(position)
+            start = self.file_service.find_line_start(max(0, top - self.WINDOW_MARGIN))
+            text, window_start, window_end = self.file_service.read_text_window(
+                start,
+                (top - start) + self.VISIBLE_BYTES + self.WINDOW_MARGIN
+            )
+        self._window = TextWindow(text, window_start, window_end)
+        self._set_text(self._window.display_text)
+
+        self.text.yview(self.byte_to_index(top))
+        self._update_scrollbar()
+
+    def highlight(self, byte_start, byte_end):
+        """Highlight a byte span, moving the window if it is not loaded"""
+        if not self._window.contains(byte_start, byte_end):
+            self.show_position(byte_start)
+
+        self.text.tag_remove("current_sentence", "1.0", tk.END)
+        start_index = self.byte_to_index(byte_start)
+        self.text.tag_add("current_sentence", start_index, self.byte_to_index(byte_end))
+        self.text.see(start_index)
+        self._update_scrollbar()
+
+    def byte_to_index(self, byte_offset):
+        """Convert a file byte offset inside the window to a Text widget index"""
+        return f"1.0 + {self._window.byte_to_char(byte_offset)} chars"
+
+    def index_to_byte(self, index):
+        """Convert a Text widget index to a file byte offset"""
+        return self._window.char_to_byte(len(self.text.get("1.0", index)))
+
+    def top_position(self):
+        """Byte offset of the first visible character"""
+        return self.index_to_byte(self.text.index("@0,0"))
+
+    def _set_text(self, text):
+        """Replace the widget contents while keeping it read-only"""
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", text)
+        self.text.config(state=tk.DISABLED)
+
+    def _update_scrollbar(self):
+        """Show the visible region as a fraction of the whole file"""
+        file_size = self.file_service.get_file_size()
+        if file_size <= 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        top = self.top_position()
+        bottom = self.index_to_byte(self.text.index(f"@0,{self.text.winfo_height()}"))
+        self.scrollbar.set(*scroll_fractions(top, bottom, file_size))
+
+    def _scroll_lines(self, lines):
+        """Scroll by lines inside the window, re-reading it near the edges"""
+        self.text.yview_scroll(lines, "units")
+        first, last = self.text.yview()
+        if self._window.needs_reread(first, last, self.file_service.get_file_size(), self.EDGE_FRACTION):
+            self.show_position(self.top_position())
+        else:
+            self._update_scrollbar()
+        return "break"
+
+    def _on_mousewheel(self, event):
+        """Mouse wheel scrolling (Windows/macOS deliver multiples of 120)"""
+        return self._scroll_lines(-3 * int(event.delta / 120) if abs(event.delta) >= 120 else -event.delta)
+
+    def _on_scrollbar(self, *args):
+        """Scrollbar drag ('moveto') or arrow/page clicks ('scroll')"""
+        if not self.file_service.is_file_loaded():
+            return
+        if args[0] == "moveto":
+            fraction = min(max(float(args[1]), 0.0), 1.0)
+            self.show_position(int(fraction * self.file_service.get_file_size()))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= max(1, int(self.text.cget("height")) - 1)
+            self._scroll_lines(amount)
+
+    def _on_click(self, event):
+        """Report the byte offset of the clicked line"""
+        if self.on_position_selected is None or not self._window:
+            return
+        index = self.text.index(f"@{event.x},{event.y} linestart")
+        self.on_position_selected(self.index_to_byte(index))
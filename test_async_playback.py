@@ -0,0 +1,229 @@
+# Test script for asyncio playback (MainController.play_async and TTSService.stream), on the tone engine
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+import time
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import pygame
+
+from services.file_service import FileService
+from services.tts_service import TTSService
+from services.config_service import ConfigService
+from services.tts_engines import ToneEngine
+from controllers.main_controller import MainController
+
+
+SENTENCES = ["One two. ", "Three four five. ", "Six seven. ", "Eight nine ten. "]
+
+
+class FlakyToneEngine(ToneEngine):
+    """
+    Tone engine that counts its runs, fails on a given word and can be slowed
+    down; slow runs take turns, like chunks sent to one Piper process
+    """
+
+    def __init__(self, resource_policy=None, delay=0.0, fail_on=None):
+        super().__init__(resource_policy)
+        self.delay = delay
+        self.fail_on = fail_on
+        self.runs = 0
+        self._runs_lock = threading.Lock()
+
+    def synthesize(self, text, voice_model=None, length_scale=1.0):
+        with self._runs_lock:
+            self.runs += 1
+            time.sleep(self.delay)
+        if self.fail_on and self.fail_on in text:
+            raise RuntimeError(f"Cannot say {self.fail_on!r}")
+        yield from super().synthesize(text, voice_model, length_scale)
+
+
+def make_controller(work_dir, engine):
+    path = os.path.join(work_dir, "book.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("".join(SENTENCES))
+    tts_service = TTSService()
+    tts_service.set_engine(engine)
+    config_service = ConfigService(os.path.join(work_dir, "config", "app_config.json"))
+    controller = MainController(FileService(index_dir=os.path.join(work_dir, "indexes")), tts_service, config_service)
+    controller.load_file(path)
+    return controller, path
+
+
+def sentence_start(index):
+    return len("".join(SENTENCES[:index]).encode('utf-8'))
+
+
+def leased_buffers(tts_service):
+    """Buffers out of the pool that the synthesis cache does not hold"""
+    return tts_service.buffer_pool.stats()["buffers_in_use"] - tts_service.synthesis_cache.stats()["entries"]
+
+
+def test_cancel_stops_playback():
+    print("Testing cancelling async playback...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller, path = make_controller(work_dir, FlakyToneEngine())
+
+        async def run():
+            task = controller.start_playback_async(0)
+            # Let the first sentence finish and the second start
+            while controller.config_service.get_last_position(path) != sentence_start(1):
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.2)
+            assert controller.is_playing() and pygame.mixer.get_busy()
+            task.cancel()
+            try:
+                await task
+                assert False, "Expected CancelledError"
+            except asyncio.CancelledError:
+                pass
+            # The cancellation reaches the caller, so timeouts and task groups work
+            assert task.cancelled()
+
+        asyncio.run(run())
+        position = controller.async_position
+        print(f"Stopped at {position}")
+        # The start of the interrupted sentence is kept, and nothing plays on
+        assert position == sentence_start(1), position
+        assert controller.config_service.get_last_position(path) == sentence_start(1)
+        assert not pygame.mixer.get_busy()
+        assert not controller.is_playing() and not controller._async_tasks
+        assert leased_buffers(controller.tts_service) == 0
+
+        async def run_with_timeout():
+            async with asyncio.timeout(0.3):
+                await controller.play_async(0)
+
+        try:
+            asyncio.run(run_with_timeout())
+            assert False, "Expected TimeoutError"
+        except TimeoutError:
+            pass
+        assert controller.async_position == 0 and not controller._async_tasks
+
+        # Reading the whole file returns its end
+        assert asyncio.run(controller.play_async(sentence_start(3))) == sentence_start(4)
+        controller.file_service.close_file()
+
+    print("Cancel test completed.\n")
+
+
+def test_pause_stops_async_playback():
+    print("Testing pause and set_position during async playback...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller, path = make_controller(work_dir, FlakyToneEngine())
+
+        async def play_then(stop):
+            task = controller.start_playback_async(0)
+            while not pygame.mixer.get_busy():
+                await asyncio.sleep(0.01)
+            assert controller.is_playing()
+            await stop()
+            try:
+                await asyncio.wait_for(task, 2)
+            except asyncio.CancelledError:
+                pass
+            assert task.cancelled() and not controller.is_playing()
+            assert not pygame.mixer.get_busy()
+
+        async def pause_here():
+            controller.pause()
+
+        async def pause_from_another_thread():
+            await asyncio.get_running_loop().run_in_executor(None, controller.pause)
+
+        async def move():
+            controller.set_position(sentence_start(2))
+
+        asyncio.run(play_then(pause_here))
+        assert controller.async_position == 0
+        asyncio.run(play_then(pause_from_another_thread))
+        asyncio.run(play_then(move))
+        # The interrupted session does not overwrite the new position
+        assert controller.get_current_position() == sentence_start(2)
+        controller.file_service.close_file()
+
+    print("Pause test completed.\n")
+
+
+def test_aclose_cancels_lookahead():
+    print("Testing that closing a stream cancels look-ahead...")
+
+    tts_service = TTSService(init_audio=False)
+    engine = FlakyToneEngine(delay=0.3)
+    tts_service.set_engine(engine)
+    tasks = []
+    prepare_audio_async = tts_service.prepare_audio_async
+
+    async def recording_prepare(text, source_file_path=None):
+        tasks.append(asyncio.current_task())
+        return await prepare_audio_async(text, source_file_path)
+
+    tts_service.prepare_audio_async = recording_prepare
+
+    async def run():
+        spans = [f"Sentence number {index}." for index in range(10)]
+        speech = tts_service.stream(spans, lookahead=3)
+        chunk = await speech.__anext__()
+        chunk.audio.release()
+        await asyncio.sleep(0)
+        assert len(tasks) == 4 and not any(task.done() for task in tasks[1:]), tasks
+        await speech.aclose()
+        await asyncio.sleep(0)
+        return list(tasks)
+
+    tasks = asyncio.run(run())
+    # The first chunk was consumed; the look-ahead behind it was cancelled, not finished
+    assert tasks[0].done() and not tasks[0].cancelled()
+    assert all(task.cancelled() for task in tasks[1:]), tasks
+    assert engine.runs <= len(tasks)
+    # Syntheses already under way in the executor still finish; their audio is released
+    time.sleep(1.0)
+    assert leased_buffers(tts_service) == 0
+
+    print("Look-ahead cancel test completed.\n")
+
+
+def test_sessions_after_error():
+    print("Testing async playback that fails...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller, path = make_controller(work_dir, FlakyToneEngine(fail_on="Six"))
+
+        async def run():
+            try:
+                await controller.play_async(sentence_start(1))
+                assert False, "Expected RuntimeError"
+            except RuntimeError as e:
+                print(f"Failed as expected: {e}")
+            # Nothing counts as playing any more
+            assert not controller._async_tasks and not controller.is_playing()
+
+        asyncio.run(run())
+        # Position is kept up to the last sentence read
+        assert controller.config_service.get_last_position(path) == sentence_start(2)
+        assert leased_buffers(controller.tts_service) == 0
+        controller.file_service.close_file()
+
+    print("Error test completed.\n")
+
+
+def main():
+    print("Running Async Playback Tests\n")
+
+    test_cancel_stops_playback()
+    test_pause_stops_async_playback()
+    test_aclose_cancels_lookahead()
+    test_sessions_after_error()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
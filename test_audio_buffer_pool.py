@@ -0,0 +1,67 @@
+# Test script for the PCM audio buffer pool
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.audio_buffer_pool import AudioBufferPool
+
+
+def test_buffer_reuse():
+    print("Testing buffer reuse...")
+
+    pool = AudioBufferPool(budget_bytes=1024 * 1024)
+    buffer = pool.acquire(10000, sample_rate=22050, channels=1)
+    buffer.samples()[0] = 1234
+    print(f"Leased {buffer.nbytes} bytes in a {buffer.capacity} byte block")
+    buffer.release()
+
+    again = pool.acquire(20000)
+    stats = pool.stats()
+    print(f"Pool stats: {stats}")
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    again.release()
+    assert pool.stats()["in_use_bytes"] == 0
+
+    print("Buffer reuse test completed.\n")
+
+
+def test_budget_backpressure():
+    print("Testing memory budget backpressure...")
+
+    pool = AudioBufferPool(budget_bytes=2 * AudioBufferPool.MIN_BLOCK_SIZE)
+    first = pool.acquire(1000)
+    second = pool.acquire(1000)
+
+    # A third buffer must wait until one of the others is released
+    threading.Timer(0.2, first.release).start()
+    start = time.monotonic()
+    third = pool.acquire(1000, timeout=2)
+    waited = time.monotonic() - start
+    print(f"Waited {waited:.2f}s for budget")
+    assert waited >= 0.1
+    assert pool.stats()["allocated_bytes"] <= pool.budget_bytes
+
+    try:
+        pool.acquire(10 * 1024 * 1024)
+        assert False, "oversized request should fail"
+    except MemoryError as e:
+        print(f"Oversized request rejected: {e}")
+
+    second.release()
+    third.release()
+    print("Memory budget test completed.\n")
+
+
+def main():
+    print("Running AudioBufferPool Tests\n")
+
+    test_buffer_reuse()
+    test_budget_backpressure()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
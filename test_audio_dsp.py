@@ -0,0 +1,114 @@
+# Test script for the vectorized audio post-processing stage
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+
+from services.audio_buffer_pool import AudioBufferPool
+from utils.audio_dsp import pcm_as_array, post_process, trim_silence, time_stretch, rms_dbfs, change_tempo
+
+SAMPLE_RATE = 22050
+
+
+def make_tone_buffer(pool, seconds=2.0, silence=0.5, amplitude=8000):
+    """Create a pooled buffer holding a tone padded with silence"""
+    tone = (amplitude * np.sin(2 * np.pi * 220 * np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE))
+    pad = np.zeros(int(SAMPLE_RATE * silence))
+    signal = np.concatenate((pad, tone, pad)).astype(np.int16)
+    buffer = pool.acquire(signal.nbytes, sample_rate=SAMPLE_RATE, channels=1)
+    pcm_as_array(buffer)[:] = signal
+    return buffer
+
+
+def test_volume_and_pitch():
+    print("Testing volume and pitch post-processing...")
+
+    pool = AudioBufferPool()
+    buffer = make_tone_buffer(pool)
+    nbytes = buffer.nbytes
+    before = rms_dbfs(pcm_as_array(buffer))
+
+    post_process(buffer, volume=0.5, pitch=1.5)
+    after = rms_dbfs(pcm_as_array(buffer))
+    print(f"Level before: {before:.1f} dBFS, after: {after:.1f} dBFS")
+    assert buffer.nbytes == nbytes
+    assert after < before
+
+    buffer.release()
+    print("Volume and pitch test completed.\n")
+
+
+def test_trim_silence():
+    print("Testing silence trimming...")
+
+    pool = AudioBufferPool()
+    buffer = make_tone_buffer(pool, seconds=1.0, silence=0.5)
+    removed = trim_silence(buffer)
+    print(f"Removed {removed / SAMPLE_RATE:.2f}s of silence, {buffer.duration:.2f}s left")
+    assert 0.9 <= buffer.duration <= 1.1
+
+    buffer.release()
+    print("Silence trimming test completed.\n")
+
+
+def test_realtime_factor():
+    print("Testing post-processing speed...")
+
+    pool = AudioBufferPool()
+    buffer = make_tone_buffer(pool, seconds=10.0, silence=0.0)
+
+    start = time.perf_counter()
+    post_process(buffer, volume=0.8, pitch=1.2, normalize=True)
+    elapsed = time.perf_counter() - start
+    speed = buffer.duration / elapsed
+    print(f"Processed {buffer.duration:.1f}s of audio in {elapsed * 1000:.1f}ms ({speed:.0f}x real-time)")
+    assert speed > 10
+
+    stretched = time_stretch(pcm_as_array(buffer).astype(np.float32), 2.0, SAMPLE_RATE)
+    assert abs(stretched.size - buffer.num_frames / 2) <= 1
+
+    buffer.release()
+    print("Speed test completed.\n")
+
+
+def test_change_tempo():
+    print("Testing tempo changes of synthesized audio...")
+
+    pool = AudioBufferPool()
+    buffer = make_tone_buffer(pool, seconds=3.0, silence=0.0)
+    samples = pcm_as_array(buffer)
+
+    start = time.perf_counter()
+    faster = change_tempo(samples, 1.5, SAMPLE_RATE)
+    elapsed = time.perf_counter() - start
+    print(f"Stretched {buffer.duration:.1f}s of audio in {elapsed * 1000:.1f}ms")
+    assert faster.dtype == np.int16
+    assert abs(faster.size - samples.size / 1.5) <= 1
+
+    # The pitch is kept: the dominant frequency is still 220 Hz
+    spectrum = np.abs(np.fft.rfft(faster.astype(np.float32)))
+    peak_hz = np.argmax(spectrum) * SAMPLE_RATE / faster.size
+    assert abs(peak_hz - 220) < 5
+
+    stereo = change_tempo(np.repeat(samples, 2), 0.8, SAMPLE_RATE, channels=2)
+    assert abs(stereo.size / 2 - samples.size / 0.8) <= 1
+
+    buffer.release()
+    print("Tempo change test completed.\n")
+
+
+def main():
+    print("Running Audio DSP Tests\n")
+
+    test_volume_and_pitch()
+    test_trim_silence()
+    test_realtime_factor()
+    test_change_tempo()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# Test script for the streaming server, on the tone engine
+import sys
+import os
+import asyncio
+import socket
+import tempfile
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.config_service import ConfigService
+from services.tts_engines import ToneEngine
+from services.tts_service import TTSService
+from server.audio_stream_server import AudioStreamServer
+from utils.text_processing import split_text_into_spans, sanitize_for_tts
+
+
+SENTENCES = ["The first line is short. ", "A second one follows it. ", "Then comes a third. ",
+             "And the fourth ends here. "]
+
+
+class CountingToneEngine(ToneEngine):
+    """Tone engine that counts its runs and can be slowed down"""
+
+    def __init__(self, resource_policy=None, delay=0.0):
+        super().__init__(resource_policy)
+        self.delay = delay
+        self.runs = 0
+        self._runs_lock = threading.Lock()
+
+    def synthesize(self, text, voice_model=None, length_scale=1.0):
+        with self._runs_lock:
+            self.runs += 1
+        time.sleep(self.delay)
+        yield from super().synthesize(text, voice_model, length_scale)
+
+
+def make_server(work_dir, engine, lookahead_chunks=4, **audio_settings):
+    library_dir = os.path.join(work_dir, "library")
+    os.makedirs(library_dir, exist_ok=True)
+    config_service = ConfigService(os.path.join(work_dir, "config", "app_config.json"))
+    tts_service = TTSService(init_audio=False, **audio_settings)
+    tts_service.set_engine(engine)
+    server = AudioStreamServer(tts_service, config_service, host="127.0.0.1", port=0,
+                               library_dirs=[library_dir], workers=2, lookahead_chunks=lookahead_chunks,
+                               index_dir=os.path.join(work_dir, "indexes"))
+    return server, tts_service, library_dir
+
+
+def write_book(library_dir, sentences, name="book.txt"):
+    path = os.path.join(library_dir, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("".join(sentences))
+    return path
+
+
+def expected_audio(tts_service, text, offset=0):
+    """The PCM the server should send for text from offset"""
+    audio = b""
+    for sentence, span_start, _ in split_text_into_spans(text):
+        if span_start < offset or not sentence.strip():
+            continue
+        buffer = tts_service.prepare_audio(sanitize_for_tts(sentence))
+        try:
+            audio += bytes(buffer.data)
+            if tts_service.trim_silence:
+                audio += bytes(int(buffer.sample_rate * tts_service.sentence_gap_ms / 1000) * buffer.channels * 2)
+        finally:
+            buffer.release()
+    return audio
+
+
+async def request(port, target, receive_buffer=None):
+    """Open a connection and send a GET; returns (reader, writer)"""
+    sock = None
+    if receive_buffer is not None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        sock.connect(("127.0.0.1", port))
+        reader, writer = await asyncio.open_connection(sock=sock, limit=receive_buffer)
+    else:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: test\r\n\r\n".encode('latin-1'))
+    await writer.drain()
+    return reader, writer
+
+
+async def read_response(reader, writer):
+    """(status, body) of a whole response"""
+    head = await reader.readuntil(b"\r\n\r\n")
+    body = await reader.read()
+    writer.close()
+    return int(head.split(b" ", 2)[1]), body
+
+
+async def started(server):
+    await server.start()
+    return server._server.sockets[0].getsockname()[1]
+
+
+def test_library_dirs_forbidden():
+    print("Testing paths outside the library...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        server, _, library_dir = make_server(work_dir, CountingToneEngine())
+        outside = os.path.join(work_dir, "outside.txt")
+        with open(outside, 'w', encoding='utf-8') as f:
+            f.write("Not for listeners. ")
+        broken = write_book(library_dir, [], name="broken.txt.gz")
+        with open(broken, 'wb') as f:
+            f.write(b"\x1f\x8b not really gzip")
+
+        async def run():
+            port = await started(server)
+            try:
+                status, _ = await read_response(*await request(port, f"/stream?file={outside}"))
+                assert status == 403, status
+                escape = os.path.join(library_dir, "..", "outside.txt")
+                status, _ = await read_response(*await request(port, f"/stream?file={escape}"))
+                assert status == 403, status
+                status, _ = await read_response(*await request(port, "/stream"))
+                assert status == 400, status
+                # A file that can't be opened gets an error response, not a dropped connection
+                status, body = await read_response(*await request(port, f"/stream?file={broken}"))
+                assert status in (415, 500), status
+                print(f"  broken file: {status} {body.decode().strip()}")
+            finally:
+                server.close()
+
+        asyncio.run(run())
+
+    print("Library dirs test completed.\n")
+
+
+def test_stream_from_offset():
+    print("Testing a stream that starts at an offset...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        server, tts_service, library_dir = make_server(work_dir, CountingToneEngine())
+        book = write_book(library_dir, SENTENCES)
+        offset = len(SENTENCES[0].encode('utf-8'))
+
+        async def run():
+            port = await started(server)
+            try:
+                status, body = await read_response(*await request(port, f"/stream?file={book}&offset={offset}"))
+            finally:
+                server.close()
+            return status, body
+
+        status, body = asyncio.run(run())
+        assert status == 200
+        assert body[:4] == b"RIFF"
+        expected = expected_audio(tts_service, "".join(SENTENCES), offset)
+        assert body[44:] == expected, (len(body) - 44, len(expected))
+        # Without the first sentence, shorter than the whole book
+        assert len(expected) < len(expected_audio(tts_service, "".join(SENTENCES)))
+
+    print("Offset stream test completed.\n")
+
+
+def test_rate_change_on_cached_audio():
+    print("Testing a stream of cached audio after a rate change...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        engine = CountingToneEngine()
+        server, tts_service, library_dir = make_server(work_dir, engine)
+        tts_service.configure_audio(resynthesize_after_rate_change=False)
+        book = write_book(library_dir, SENTENCES)
+
+        async def run():
+            port = await started(server)
+            try:
+                _, first = await read_response(*await request(port, f"/stream?file={book}&offset=0"))
+                tts_service.set_parameters(rate=2.0)
+                _, second = await read_response(*await request(port, f"/stream?file={book}&offset=0"))
+                return first, second
+            finally:
+                server.close()
+
+        first, second = asyncio.run(run())
+        print(f"  rate 1.0: {len(first) - 44} bytes, rate 2.0: {len(second) - 44} bytes")
+        # The second stream came from the cache, stretched to the new rate
+        assert engine.runs == len(SENTENCES), engine.runs
+        assert second[44:] == expected_audio(tts_service, "".join(SENTENCES))
+        assert len(second) < len(first) * 0.75
+
+    print("Rate change test completed.\n")
+
+
+def test_listeners_share_synthesis():
+    print("Testing two listeners on the same sentences...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        engine = CountingToneEngine(delay=0.2)
+        server, tts_service, library_dir = make_server(work_dir, engine)
+        book = write_book(library_dir, SENTENCES)
+
+        async def run():
+            port = await started(server)
+            try:
+                first, second = await asyncio.gather(
+                    read_response(*await request(port, f"/stream?file={book}&offset=0")),
+                    read_response(*await request(port, f"/stream?file={book}&offset=0")),
+                )
+                return first, second, server.stats()
+            finally:
+                server.close()
+
+        first, second, stats = asyncio.run(run())
+        assert first == second and first[0] == 200
+        print(f"  synthesis runs: {engine.runs}, deduplicated: {stats['deduplicated_requests']}")
+        # One run per sentence, however many listeners
+        assert engine.runs == len(SENTENCES), engine.runs
+        assert stats["deduplicated_requests"] >= 1
+
+    print("Shared synthesis test completed.\n")
+
+
+def test_slow_client_backpressure():
+    print("Testing backpressure from a slow client...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        engine = CountingToneEngine()
+        # No cache, so a block is handed out again as soon as the stream releases it
+        server, tts_service, library_dir = make_server(work_dir, engine, lookahead_chunks=2, cache_mb=0)
+        sentences = [f"Sentence number {index} goes on for a little while. " for index in range(60)]
+        book = write_book(library_dir, sentences)
+
+        async def run():
+            port = await started(server)
+            try:
+                reader, writer = await request(port, f"/stream?file={book}&offset=0", receive_buffer=4096)
+                # The client reads nothing for a while: synthesis must stall, not run to the end
+                await asyncio.sleep(1.0)
+                stalled_at = engine.runs
+                await asyncio.sleep(0.5)
+                assert engine.runs == stalled_at, (stalled_at, engine.runs)
+                assert stalled_at < len(sentences) // 2, stalled_at
+
+                # Then it reads slowly; every byte must still be the audio of its sentence
+                head = await reader.readuntil(b"\r\n\r\n")
+                body = b""
+                while True:
+                    data = await reader.read(16384)
+                    if not data:
+                        break
+                    body += data
+                    await asyncio.sleep(0.001)
+                writer.close()
+                return stalled_at, head, body
+            finally:
+                server.close()
+
+        stalled_at, head, body = asyncio.run(run())
+        print(f"  synthesis stalled after {stalled_at} of {len(sentences)} sentences")
+        assert head.startswith(b"HTTP/1.1 200")
+        expected = expected_audio(tts_service, "".join(sentences))
+        assert len(body) - 44 == len(expected)
+        assert body[44:] == expected, "Streamed audio was overwritten"
+
+    print("Backpressure test completed.\n")
+
+
+def main():
+    print("Running Audio Stream Server Tests\n")
+
+    test_library_dirs_forbidden()
+    test_stream_from_offset()
+    test_rate_change_on_cached_audio()
+    test_listeners_share_synthesis()
+    test_slow_client_backpressure()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
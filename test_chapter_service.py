@@ -0,0 +1,184 @@
+# Test script for chapter detection and the persisted chapter index
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+from services.chapter_service import ChapterService
+
+
+# Hard-wrapped prose, as in most plain-text books, with a few kinds of headings
+BOOK = """THE LONG ROAD NORTH
+
+
+PROLOGUE
+
+It began, as these things do, with a letter nobody wanted to open.
+
+
+CHAPTER I
+
+The winter had been hard. By the time the thaw came the news from the
+coast was already old, and nobody in the valley paid it much attention.
+Part civil war had broken out in the north, and
+part of the army had simply gone home. What the
+book did not matter to him at all; he had never
+read it. Book mix of things, his mother called it.
+Part I was sure of: the roads would close soon.
+
+Book mix of things
+
+Chapter 2: The Storm
+
+Snow came early that year, drifting against the doors of the mill.
+
+Chapter Three
+
+Nobody expected the bridge to hold, and it did not.
+
+Chapter 4 The Return
+
+He came back in spring, thinner, and said nothing about the road.
+chapter 5 of the ledger was missing, the clerk said.
+
+EPILOGUE
+
+The mill still stands.
+"""
+
+EXPECTED_TITLES = ["THE LONG ROAD NORTH", "PROLOGUE", "CHAPTER I", "Chapter 2: The Storm",
+                   "Chapter Three", "Chapter 4 The Return", "EPILOGUE"]
+
+
+def load(work_dir, text):
+    path = os.path.join(work_dir, "book.txt")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    file_service = FileService(index_dir=os.path.join(work_dir, "indexes"))
+    file_service.load_file(path)
+    return file_service, path
+
+
+def test_scan():
+    print("Testing chapter detection...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        file_service, path = load(work_dir, BOOK)
+        chapter_service = ChapterService(file_service, index_dir=os.path.join(work_dir, "indexes"))
+        chapters = chapter_service.scan()
+        titles = [chapter["title"] for chapter in chapters]
+        print(f"Chapters: {titles}")
+        assert titles == EXPECTED_TITLES, titles
+
+        # Offsets are the byte offsets of the heading lines
+        data = BOOK.encode('utf-8')
+        for chapter in chapters:
+            assert data[chapter["offset"]:].startswith(chapter["title"].encode('utf-8'))
+
+        # Without layout heuristics only the patterns (and isolated numbered headings) count
+        plain = ChapterService(file_service, index_dir=os.path.join(work_dir, "indexes"), layout_heuristics=False)
+        assert [chapter["title"] for chapter in plain.scan()] == EXPECTED_TITLES[1:]
+        file_service.close_file()
+
+    print("Chapter detection test completed.\n")
+
+
+def test_false_positives():
+    print("Testing prose lines that only look like headings...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        prose = ("He had read the first\n"
+                 "Part civil war had broken out in the north, and\n"
+                 "book did not matter to him at all\n"
+                 "Book mix of things\n"
+                 "Chapter 4 The Return was the one he liked best,\n"
+                 "Part IV of it anyway.\n")
+        file_service, _ = load(work_dir, prose)
+        chapter_service = ChapterService(file_service, index_dir=os.path.join(work_dir, "indexes"))
+        assert chapter_service.scan() == [], chapter_service.scan()
+        file_service.close_file()
+
+    print("False positive test completed.\n")
+
+
+def test_long_lines():
+    print("Testing lines far longer than any heading...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        long_prose = "word " * 400000  # 2 MB without a newline
+        text = (long_prose + "\n\nChapter 1\n\nShort prose.\n" + " " * 5000 + "\nCHAPTER TWO\n\n" + long_prose)
+        file_service, _ = load(work_dir, text)
+        chapter_service = ChapterService(file_service, index_dir=os.path.join(work_dir, "indexes"))
+
+        lines = list(chapter_service.iter_lines(block_size=4096, max_line_bytes=200))
+        # Offsets still match the file, and no line longer than the limit was kept
+        data = text.encode('utf-8')
+        assert [offset for offset, _ in lines] == [0] + [index + 1 for index, byte in enumerate(data) if byte == 10]
+        assert all(line is None or len(line) <= 200 for _, line in lines)
+        assert lines[0][1] is None and lines[-1][1] is None
+        # A long line of spaces is still a blank line
+        assert lines[5][1] == b""
+
+        titles = [chapter["title"] for chapter in chapter_service.scan()]
+        assert titles == ["Chapter 1", "CHAPTER TWO"], titles
+        file_service.close_file()
+
+    print("Long lines test completed.\n")
+
+
+def test_persisted_index():
+    print("Testing the persisted chapter index...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        index_dir = os.path.join(work_dir, "indexes")
+        file_service, path = load(work_dir, BOOK)
+        chapter_service = ChapterService(file_service, index_dir=index_dir)
+        chapters = chapter_service.get_chapters()
+        assert [chapter["title"] for chapter in chapters] == EXPECTED_TITLES
+
+        index_files = os.listdir(index_dir)
+        assert len(index_files) == 1 and index_files[0].endswith(".chapters.json")
+        with open(os.path.join(index_dir, index_files[0]), 'r', encoding='utf-8') as f:
+            assert json.load(f)["chapters"] == chapters
+
+        # A new service loads the index instead of scanning again
+        reloaded = ChapterService(file_service, index_dir=index_dir)
+        reloaded.scan = lambda: (_ for _ in ()).throw(AssertionError("scanned again"))
+        assert reloaded.get_chapters() == chapters
+        chapter_three = EXPECTED_TITLES.index("Chapter Three")
+        assert reloaded.chapter_at(chapters[chapter_three]["offset"] + 5) == chapter_three
+        assert reloaded.chapter_ranges()[-1][2] == file_service.get_file_size()
+
+        # Extra patterns invalidate the index
+        custom = ChapterService(file_service, index_dir=index_dir, patterns=[r'^the mill'])
+        assert custom.get_chapters()[-1]["title"] == "The mill still stands."
+
+        # So does a changed file
+        file_service.close_file()
+        os.utime(path, (1, 1))
+        file_service.load_file(path)
+        rescanned = ChapterService(file_service, index_dir=index_dir)
+        scans = []
+        original_scan = rescanned.scan
+        rescanned.scan = lambda: scans.append(1) or original_scan()
+        assert rescanned.get_chapters() == chapters and scans == [1]
+        file_service.close_file()
+
+    print("Persisted index test completed.\n")
+
+
+def main():
+    print("Running Chapter Service Tests\n")
+
+    test_scan()
+    test_false_positives()
+    test_long_lines()
+    test_persisted_index()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Test script for reading compressed text through the seek-point index
+import sys
+import os
+import gzip
+import bz2
+import json
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+from services.compressed_reader import CompressedIndex, SeekableDecompressedFile
+
+
+def test_random_access():
+    print("Testing random access into compressed files...")
+
+    index_dir = tempfile.mkdtemp()
+    text = "".join(f"Sentence {i} of the book. Ünïcödé 中文。\n" for i in range(20000))
+    raw = text.encode('utf-8')
+
+    for extension, module in (("gz", gzip), ("bz2", bz2)):
+        path = os.path.join(index_dir, f"book.txt.{extension}")
+        with open(path, 'wb') as f:
+            f.write(module.compress(raw))
+
+        fs = FileService(index_dir=index_dir, checkpoint_mb=0.25)
+        fs.load_file(path)
+        print(f"{extension}: {fs.get_file_size()} bytes decompressed, compression={fs.compression}")
+        assert fs.get_file_size() == len(raw)
+
+        # Reads across checkpoint boundaries and near the end
+        for position in (0, 262140, len(raw) - 50):
+            assert fs.read_bytes(position, 100) == raw[position:position + 100]
+        window, start, end = fs.read_text_window(500001, 200)
+        assert raw[start:end].decode('utf-8') == window
+        fs.close_file()
+
+        # Reopening reuses the persisted index
+        reopened = FileService(index_dir=index_dir, checkpoint_mb=0.25)
+        reopened.load_file(path)
+        assert reopened.read_bytes(len(raw) - 10, 10) == raw[-10:]
+        reopened.close_file()
+
+    print("Compressed random access test completed.\n")
+
+
+def test_zstd_random_access():
+    print("Testing random access into zstd files...")
+
+    try:
+        import zstandard
+    except ImportError:
+        print("zstandard is not installed; skipping zstd test.\n")
+        return
+
+    index_dir = tempfile.mkdtemp()
+    raw = "".join(f"Line {i}: zstd compressed text. 中文。\n" for i in range(20000)).encode('utf-8')
+    path = os.path.join(index_dir, "book.txt.zst")
+    with open(path, 'wb') as f:
+        f.write(zstandard.ZstdCompressor().compress(raw))
+
+    fs = FileService(index_dir=index_dir, checkpoint_mb=0.25)
+    fs.load_file(path)
+    print(f"zst: {fs.get_file_size()} bytes decompressed, compression={fs.compression}")
+    assert fs.compression == 'zstd'
+    assert fs.get_file_size() == len(raw)
+    for position in (0, 262140, len(raw) - 50):
+        assert fs.read_bytes(position, 100) == raw[position:position + 100]
+    fs.close_file()
+
+    print("Zstd random access test completed.\n")
+
+
+def test_damaged_index():
+    print("Testing that a damaged index is rebuilt...")
+
+    index_dir = tempfile.mkdtemp()
+    raw = "".join(f"Sentence {i}.\n" for i in range(50000)).encode('utf-8')
+    path = os.path.join(index_dir, "book.txt.gz")
+    with open(path, 'wb') as f:
+        f.write(gzip.compress(raw))
+
+    index = CompressedIndex(path, index_dir=index_dir, checkpoint_bytes=64 * 1024)
+    segments = index.segments
+    assert not [name for name in os.listdir(index_dir) if name.endswith('.tmp')], "temp files left behind"
+
+    # A meta file cut off mid-write, one missing its segments, and one whose
+    # sidecar was truncated are all rebuilt rather than trusted
+    with open(index.meta_path, 'r', encoding='utf-8') as f:
+        meta_text = f.read()
+    damaged = [
+        (meta_text[:len(meta_text) // 2], None),
+        (json.dumps({key: value for key, value in json.loads(meta_text).items() if key != "segments"}), None),
+        (meta_text, 100),
+    ]
+    for meta, sidecar_size in damaged:
+        with open(index.meta_path, 'w', encoding='utf-8') as f:
+            f.write(meta)
+        if sidecar_size is not None:
+            with open(index.sidecar_path, 'r+b') as f:
+                f.truncate(sidecar_size)
+        rebuilt = CompressedIndex(path, index_dir=index_dir, checkpoint_bytes=64 * 1024)
+        assert rebuilt.segments == segments
+        assert rebuilt.total_size == len(raw)
+        reader = SeekableDecompressedFile(rebuilt)
+        assert reader.read_at(len(raw) - 20, 20) == raw[-20:]
+        reader.close()
+
+    print("Damaged index test completed.\n")
+
+
+def main():
+    print("Running Compressed Reader Tests\n")
+
+    test_random_access()
+    test_zstd_random_access()
+    test_damaged_index()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
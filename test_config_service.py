@@ -0,0 +1,125 @@
+# Test script for cached, lock-protected configuration access
+import sys
+import os
+import json
+import tempfile
+import time
+import multiprocessing
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.config_service import ConfigService
+
+
+def _write_positions(config_path, worker, count):
+    cs = ConfigService(config_path)
+    for i in range(count):
+        cs.set_last_position(f"/books/worker{worker}-{i}.txt", i)
+    # Child processes skip atexit handlers
+    cs.flush_positions()
+
+
+def test_concurrent_writers():
+    print("Testing concurrent writers in several processes...")
+
+    config_path = os.path.join(tempfile.mkdtemp(), "app_config.json")
+    processes = [multiprocessing.Process(target=_write_positions, args=(config_path, worker, 25))
+                 for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    positions = ConfigService(config_path).load_config()["last_positions"]
+    print(f"Positions stored: {len(positions)}")
+    assert len(positions) == 100
+    print("Concurrent writers test completed.\n")
+
+
+def test_cached_reads():
+    print("Testing cached reads and merging saves...")
+
+    config_path = os.path.join(tempfile.mkdtemp(), "app_config.json")
+    cs = ConfigService(config_path)
+    cs.set_last_position("/books/a.txt", 10)
+    assert cs.get_last_position("/books/a.txt") == 10
+
+    # A change made by another process is picked up
+    other = ConfigService(config_path)
+    other.set_last_position("/books/b.txt", 20)
+    assert cs.get_last_position("/books/b.txt") == 20
+
+    # Saving one section keeps the others (e.g. positions saved by playback)
+    cs.save_config({"tts_params": {"rate": 1.5}})
+    config = json.load(open(config_path, encoding='utf-8'))
+    assert config["tts_params"]["rate"] == 1.5
+    assert len(config["last_positions"]) == 2
+    assert other.get_last_position("/books/a.txt") == 10
+
+    cs.remove_last_position("/books/a.txt")
+    assert other.get_last_position("/books/a.txt") is None
+    print("Cached reads test completed.\n")
+
+
+def test_batched_positions():
+    print("Testing batched position writes...")
+
+    config_path = os.path.join(tempfile.mkdtemp(), "app_config.json")
+    cs = ConfigService(config_path)
+    cs.POSITION_WRITE_INTERVAL = 0.5
+    writes = []
+    original_write = cs._write
+    cs._write = lambda config: writes.append(dict(config["last_positions"])) or original_write(config)
+
+    # A position per sentence: the first is written, the rest wait for the interval
+    for position in range(0, 1000, 10):
+        cs.set_last_position("/books/a.txt", position)
+    assert len(writes) == 1 and writes[0]["/books/a.txt"] == 0, writes
+    assert cs.get_last_position("/books/a.txt") == 990
+    assert cs.load_config()["last_positions"]["/books/a.txt"] == 990
+    other = ConfigService(config_path)
+    assert other.get_last_position("/books/a.txt") == 0
+
+    # The pending position is written once the interval is up
+    time.sleep(0.8)
+    assert len(writes) == 2 and other.get_last_position("/books/a.txt") == 990
+
+    # Any other write, or an explicit flush, takes pending positions along
+    cs.set_last_position("/books/a.txt", 1000)
+    cs.save_config({"tts_params": {"rate": 1.25}})
+    assert other.get_last_position("/books/a.txt") == 1000
+    cs.set_last_position("/books/b.txt", 5)
+    cs.flush_positions()
+    assert other.get_last_position("/books/b.txt") == 5
+    count = len(writes)
+    time.sleep(0.8)
+    assert len(writes) == count  # Nothing left for the timer
+
+    # A stale copy of the configuration saved back does not undo newer positions
+    stale = cs.load_config()
+    cs.set_last_position("/books/a.txt", 2000)
+    other.set_last_position("/books/c.txt", 7)
+    other.flush_positions()
+    stale["tts_params"]["rate"] = 1.5
+    cs.save_config(stale)
+    assert cs.get_last_position("/books/a.txt") == 2000 and other.get_last_position("/books/a.txt") == 2000
+    assert cs.get_last_position("/books/c.txt") == 7 and cs.get_tts_params()["rate"] == 1.5
+
+    # A removed position stays removed
+    cs.set_last_position("/books/b.txt", 50)
+    cs.remove_last_position("/books/b.txt")
+    assert cs.get_last_position("/books/b.txt") is None and other.get_last_position("/books/b.txt") is None
+    print("Batched positions test completed.\n")
+
+
+def main():
+    print("Running ConfigService Tests\n")
+
+    test_concurrent_writers()
+    test_cached_reads()
+    test_batched_positions()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
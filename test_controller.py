@@ -26,7 +26,7 @@ def test_controller():
     
     # Mock the TTS service to avoid actual audio synthesis during test
     original_speak_text = tts_service.speak_text
-    def mock_speak_text(text):
+    def mock_speak_text(text, **kwargs):
         print(f"TTS would speak: '{text[:50]}...'")
         time.sleep(0.1)  # Simulate some processing time
     
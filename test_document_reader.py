@@ -0,0 +1,104 @@
+# Test script for reading EPUB, HTML and Markdown documents as plain text
+import sys
+import os
+import tempfile
+import zipfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+
+
+CHAPTER = """<?xml version="1.0" encoding="utf-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml"><head><title>Ignored</title>
+<style>p {{ color: red; }}</style></head>
+<body><h1>Chapter {number}</h1>
+<p>First paragraph of chapter {number} &amp; more.</p>
+<p>Second   paragraph<br/>with a <em>line</em> break.</p>
+<script>var skipped = true;</script></body></html>
+"""
+
+
+def write_epub(path):
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('mimetype', 'application/epub+zip')
+        archive.writestr('META-INF/container.xml', """<?xml version="1.0"?>
+<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container" version="1.0">
+<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>
+</container>""")
+        archive.writestr('OEBPS/content.opf', """<?xml version="1.0"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0">
+<manifest>
+<item id="c2" href="text/ch2.xhtml" media-type="application/xhtml+xml"/>
+<item id="c1" href="text/ch1.xhtml" media-type="application/xhtml+xml"/>
+<item id="css" href="style.css" media-type="text/css"/>
+</manifest>
+<spine><itemref idref="c1"/><itemref idref="c2"/></spine>
+</package>""")
+        archive.writestr('OEBPS/text/ch1.xhtml', CHAPTER.format(number=1))
+        archive.writestr('OEBPS/text/ch2.xhtml', CHAPTER.format(number=2))
+
+
+def test_epub():
+    print("Testing EPUB extraction...")
+
+    index_dir = tempfile.mkdtemp()
+    path = os.path.join(index_dir, "book.epub")
+    write_epub(path)
+
+    fs = FileService(index_dir=index_dir)
+    fs.load_file(path)
+    text = fs.read_bytes(0, fs.get_file_size()).decode('utf-8')
+    print(text)
+    assert text.startswith("Chapter 1\n\nFirst paragraph of chapter 1 & more.")
+    assert "Second paragraph\nwith a line break." in text
+    assert text.index("Chapter 1") < text.index("Chapter 2")  # spine order, not manifest order
+    assert "Ignored" not in text and "skipped" not in text and "color" not in text
+
+    # Positions map back to the EPUB member they came from
+    position = len(text[:text.index("Chapter 2")].encode('utf-8'))
+    location = fs.source_location(position)
+    assert location["part"] == "OEBPS/text/ch2.xhtml"
+    fs.close_file()
+    print("EPUB test completed.\n")
+
+
+def test_markdown():
+    print("Testing Markdown extraction...")
+
+    markdown = (
+        "# Title\n\n"
+        "Some **bold** and *emphasis* with a [link](http://example.com).\n"
+        "Continued line.\n\n"
+        "```\ncode = 'not read'\n```\n\n"
+        "- first item\n- second item\n\n"
+        "| a | b |\n|---|---|\n| 1 | 2 |\n"
+    )
+    with tempfile.NamedTemporaryFile('w', suffix='.md', delete=False, encoding='utf-8') as f:
+        f.write(markdown)
+        path = f.name
+
+    fs = FileService(index_dir=tempfile.mkdtemp())
+    fs.load_file(path)
+    text = fs.read_bytes(0, fs.get_file_size()).decode('utf-8')
+    print(text)
+    assert text.startswith("Title\n\nSome bold and emphasis with a link. Continued line.")
+    assert "code" not in text and "*" not in text and "#" not in text
+    assert "first item\nsecond item" in text
+    assert "a, b\n1, 2" in text
+    assert fs.source_location(0)["line"] == 1
+    fs.close_file()
+    os.remove(path)
+    print("Markdown test completed.\n")
+
+
+def main():
+    print("Running Document Reader Tests\n")
+
+    test_epub()
+    test_markdown()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Test script for exporting ranges of a file to audio clips
+import sys
+import os
+import tempfile
+import wave
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+from services.tts_service import TTSService
+from services.export_service import ExportService, ExportError
+
+
+TEXT = "First sentence here. Second one follows. Third is next. Fourth ends it. "
+
+
+def cache_sentence(tts_service, sentence, frames):
+    """Put fake audio for a sentence into the synthesis cache, as speak_text would"""
+    for chunk in tts_service._speech_chunks(sentence):
+        buffer = tts_service.buffer_pool.acquire(frames * 2, 22050, 1)
+        buffer.data[:] = b'\x01\x00' * frames
+        buffer.speech_rate = 1.0
+        tts_service.synthesis_cache.put(tts_service.cache_key(chunk), buffer).release()
+
+
+def test_snap_to_sentences():
+    print("Testing range snapping to sentence boundaries...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        book = os.path.join(work_dir, "book.txt")
+        with open(book, 'w', encoding='utf-8') as f:
+            f.write(TEXT)
+
+        file_service = FileService(index_dir=os.path.join(work_dir, "indexes"))
+        file_service.load_file(book)
+        # "cond one fol" lies inside the second sentence
+        assert file_service.snap_to_sentences(24, 35) == (21, 41)
+        assert file_service.snap_to_sentences(21, 41) == (21, 41)
+        assert file_service.snap_to_sentences(24, 45) == (21, 56)
+        assert file_service.snap_to_sentences(60, 10 ** 6) == (56, len(TEXT))
+        file_service.close_file()
+
+    print("Snapping test completed.\n")
+
+
+def test_export_wav():
+    print("Testing WAV export of a byte range and a search hit...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        book = os.path.join(work_dir, "book.txt")
+        with open(book, 'w', encoding='utf-8') as f:
+            f.write(TEXT)
+
+        tts_service = TTSService(init_audio=False)
+        tts_service.set_parameters(voice_model="voice.onnx")
+        tts_service.configure_audio(trim_silence=False)
+        for index, sentence in enumerate(["First sentence here. ", "Second one follows. ",
+                                          "Third is next. ", "Fourth ends it. "]):
+            cache_sentence(tts_service, sentence, 1000 * (index + 1))
+
+        export_service = ExportService(tts_service, index_dir=os.path.join(work_dir, "indexes"),
+                                       lookahead_chunks=2)
+        clip = os.path.join(work_dir, "clip.wav")
+        progress = []
+        result = export_service.export_range(book, 24, 45, clip, on_progress=lambda pos, end: progress.append(pos))
+        print(f"Result: {result}")
+        assert (result.start, result.end, result.chunks) == (21, 56, 2)
+        assert progress == [41, 56]
+        with wave.open(clip, 'rb') as f:
+            # Second and third sentences, with the header sizes patched on close
+            assert f.getframerate() == 22050 and f.getnchannels() == 1
+            assert f.getnframes() == 2000 + 3000
+        assert not os.path.exists(clip + ".part")
+
+        result = export_service.export_search_hit(book, "FOURTH", clip)
+        assert (result.start, result.end) == (56, len(TEXT))
+        with wave.open(clip, 'rb') as f:
+            assert f.getnframes() == 4000
+
+        try:
+            export_service.export_search_hit(book, "missing", clip)
+            assert False, "Expected ExportError"
+        except ExportError:
+            pass
+
+    print("WAV export test completed.\n")
+
+
+def main():
+    print("Running Export Service Tests\n")
+
+    test_snap_to_sentences()
+    test_export_wav()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# Test script for following a file that keeps growing
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+from services.file_watcher import FileWatcher
+
+
+def append(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+
+def follow(file_service, start, stop_after, idle_flush_s=5.0):
+    """Collect followed spans (and when they arrived) on a thread until stop_after spans"""
+    spans = []
+    done = threading.Event()
+
+    def reader():
+        for sentence, span_start, span_end in file_service.follow_sentence_spans(
+                start, should_stop=done.is_set, poll_interval=0.05, idle_flush_s=idle_flush_s):
+            spans.append((sentence, span_start, span_end, time.monotonic()))
+            if len(spans) >= stop_after:
+                done.set()
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    return spans, done, thread
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_watcher_modes():
+    print("Testing the file watcher...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        log = os.path.join(work_dir, "live.log")
+        append(log, "start\n")
+        for use_inotify in (True, False):
+            watcher = FileWatcher(log, poll_interval=0.02, use_inotify=use_inotify)
+            print(f"  mode: {watcher.mode}")
+            if not use_inotify:
+                assert watcher.mode == "polling"
+            assert not watcher.wait(0.05)
+            append(log, "more\n")
+            assert watcher.wait(2.0)
+            watcher.close()
+
+    print("File watcher test completed.\n")
+
+
+def check_follow_appends(use_inotify):
+    print(f"Testing follow mode (inotify={use_inotify})...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        log = os.path.join(work_dir, "live.txt")
+        append(log, "Already here. ")
+
+        file_service = FileService(index_dir=os.path.join(work_dir, "indexes"))
+        file_service.load_file(log)
+        assert file_service.can_follow()
+
+        if not use_inotify:
+            import services.file_service as file_service_module
+            original = file_service_module.FileWatcher
+            file_service_module.FileWatcher = lambda path, poll_interval: original(path, poll_interval, False)
+
+        try:
+            spans, done, thread = follow(file_service, 0, stop_after=4)
+            assert wait_for(lambda: len(spans) == 1)
+            assert spans[0][:3] == ("Already here. ", 0, 14)
+
+            # An unfinished sentence is held back until the rest arrives
+            append(log, "Half a sen")
+            time.sleep(0.3)
+            assert len(spans) == 1, spans
+            appended_at = time.monotonic()
+            append(log, "tence. Next line\n")
+            assert wait_for(lambda: len(spans) == 3)
+            assert spans[1][:3] == ("Half a sentence. ", 14, 31)
+            assert spans[2][0] == "Next line\n"
+            print(f"  latency: {(spans[1][3] - appended_at) * 1000:.0f} ms")
+
+            # Spans continue exactly where the previous one ended
+            append(log, "Last one! ")
+            assert wait_for(lambda: len(spans) == 4)
+            thread.join(2.0)
+            assert not thread.is_alive()
+            for previous, current in zip(spans, spans[1:]):
+                assert previous[2] == current[1]
+            assert spans[-1][2] == file_service.get_file_size() == os.path.getsize(log)
+        finally:
+            if not use_inotify:
+                file_service_module.FileWatcher = original
+            file_service.close_file()
+
+    print("Follow mode test completed.\n")
+
+
+def test_follow_with_inotify():
+    check_follow_appends(use_inotify=True)
+
+
+def test_follow_with_polling():
+    check_follow_appends(use_inotify=False)
+
+
+def test_follow_idle_flush_and_truncation():
+    print("Testing idle flush and truncation...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        log = os.path.join(work_dir, "live.txt")
+        append(log, "")
+
+        file_service = FileService(index_dir=os.path.join(work_dir, "indexes"))
+        file_service.load_file(log)
+        spans, done, thread = follow(file_service, 0, stop_after=2, idle_flush_s=0.3)
+
+        # No terminator ever comes: read once the file has been idle long enough
+        append(log, "a prompt without an end")
+        assert wait_for(lambda: len(spans) == 1)
+        assert spans[0][:3] == ("a prompt without an end", 0, 23)
+
+        # A truncated file is read again from the start
+        with open(log, 'w', encoding='utf-8') as f:
+            f.write("New. ")
+        assert wait_for(lambda: len(spans) == 2)
+        assert spans[1][:3] == ("New. ", 0, 5)
+        thread.join(2.0)
+        assert not thread.is_alive()
+        file_service.close_file()
+
+    print("Idle flush and truncation test completed.\n")
+
+
+def test_growing_beyond_the_map():
+    print("Testing reads past the memory map...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        log = os.path.join(work_dir, "live.txt")
+        append(log, "One. ")
+
+        file_service = FileService(index_dir=os.path.join(work_dir, "indexes"))
+        file_service.load_file(log)
+        append(log, "Two. ")
+        assert file_service.refresh_size() == 5
+        assert file_service.read_bytes(0, 100) == b"One. Two. "
+        assert file_service.read_bytes(3, 4) == b". Tw"
+
+        # Far enough past the map, the file is mapped again
+        file_service.REMAP_BYTES = 8
+        append(log, "Three. ")
+        assert file_service.refresh_size() == 7
+        assert len(file_service.file_mmap) == 17
+        assert file_service.read_bytes(0, 100) == b"One. Two. Three. "
+        assert file_service.refresh_size() == 0
+        file_service.close_file()
+
+    print("Memory map test completed.\n")
+
+
+def main():
+    print("Running File Follow Tests\n")
+
+    test_watcher_modes()
+    test_follow_with_inotify()
+    test_follow_with_polling()
+    test_follow_idle_flush_and_truncation()
+    test_growing_beyond_the_map()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# Test script for the library catalog
+import sys
+import os
+import gzip
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.config_service import ConfigService
+from services.library_service import LibraryService, file_statistics
+from utils.text_processing import estimate_reading_time
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def test_estimate_reading_time():
+    print("Testing reading time estimates...")
+
+    text = "one two three " * 50  # 150 words
+    assert estimate_reading_time(text) == 60
+    assert estimate_reading_time(None, word_count=150) == 60
+    assert estimate_reading_time("", word_count=300, words_per_minute=300) == 60
+    assert estimate_reading_time("") == 0
+
+    print("Reading time test completed.\n")
+
+
+def test_file_statistics():
+    print("Testing per-file statistics...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        index_dir = os.path.join(work_dir, "indexes")
+        plain = os.path.join(work_dir, "plain.txt")
+        write(plain, b"Hello world.\nSecond line here")
+        assert file_statistics(plain, index_dir) == {
+            "encoding": "ascii", "text_bytes": 29, "lines": 2, "words": 5}
+
+        accented = os.path.join(work_dir, "accented.txt")
+        write(accented, b"\xef\xbb\xbf" + "Café naïve\n".encode('utf-8'))
+        stats = file_statistics(accented, index_dir)
+        assert stats["encoding"] == "utf-8-sig" and stats["words"] == 2 and stats["lines"] == 1
+
+        legacy = os.path.join(work_dir, "legacy.txt")
+        write(legacy, "Café\n".encode('latin-1'))
+        assert file_statistics(legacy, index_dir)["encoding"] == "unknown"
+
+        # Words that straddle the blocks the file is read in are counted once
+        import services.library_service as library_module
+        original_block = library_module.READ_BLOCK
+        library_module.READ_BLOCK = 7
+        try:
+            stats = file_statistics(plain, index_dir)
+            assert stats["words"] == 5, stats
+        finally:
+            library_module.READ_BLOCK = original_block
+
+        # Compressed files are counted by their text
+        packed = os.path.join(work_dir, "packed.txt.gz")
+        write(packed, gzip.compress(b"Packed words in here.\n"))
+        stats = file_statistics(packed, index_dir)
+        assert stats["words"] == 4 and stats["text_bytes"] == 22
+
+    print("Per-file statistics test completed.\n")
+
+
+def test_incremental_scan():
+    print("Testing incremental catalog scans...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        library_dir = os.path.join(work_dir, "library")
+        first = os.path.join(library_dir, "first.txt")
+        second = os.path.join(library_dir, "shelf", "second.txt")
+        write(first, b"One two three four.\n")
+        write(second, b"Five six.\n")
+        write(os.path.join(library_dir, "cover.jpg"), b"\xff\xd8")
+
+        config_service = ConfigService(os.path.join(work_dir, "config", "app_config.json"))
+        db_path = os.path.join(work_dir, "config", "library.sqlite3")
+        library = LibraryService(config_service, db_path=db_path, index_dir=os.path.join(work_dir, "indexes"),
+                                 workers=2, words_per_minute=2)
+
+        result = library.scan([library_dir])
+        assert result["files"] == 2 and result["read"] == 2, result
+        entries = library.entries()
+        assert [os.path.basename(entry["path"]) for entry in entries] == ["first.txt", "second.txt"]
+        assert entries[0]["words"] == 4 and entries[0]["reading_seconds"] == 120
+        assert entries[0]["progress"] == 0.0
+
+        # Nothing changed: nothing is read again
+        assert library.scan([library_dir])["read"] == 0
+
+        # A changed file is read again; a new reading position is picked up without reading
+        time.sleep(0.01)
+        write(second, b"Five six seven eight nine.\n")
+        config_service.set_last_position(first, 10)
+        result = library.scan([library_dir])
+        assert result["read"] == 1 and result["positions_updated"] == 1, result
+        assert library.entry(second)["words"] == 5
+        assert library.entry(first)["progress"] == 0.5
+
+        # Deleted files leave the catalog, and it survives a restart
+        os.remove(first)
+        assert library.scan([library_dir])["removed"] == 1
+        reopened = LibraryService(config_service, db_path=db_path)
+        assert [entry["path"] for entry in reopened.entries(library_dir)] == [os.path.realpath(second)]
+        assert reopened.entries(os.path.join(library_dir, "shelf"))[0]["words"] == 5
+        assert reopened.entries(os.path.join(work_dir, "elsewhere")) == []
+        assert reopened.totals()["files"] == 1
+
+    print("Incremental scan test completed.\n")
+
+
+def main():
+    print("Running Library Service Tests\n")
+
+    test_estimate_reading_time()
+    test_file_statistics()
+    test_incremental_scan()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
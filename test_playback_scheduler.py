@@ -0,0 +1,84 @@
+# Test script for the playback scheduler state machine
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.playback_scheduler import PlaybackScheduler, IDLE, BUFFERING, PLAYING, PAUSED, SEEKING
+
+
+def test_state_transitions():
+    print("Testing playback state transitions...")
+
+    scheduler = PlaybackScheduler()
+    transitions = []
+    scheduler.add_listener(lambda old, new: transitions.append((old, new)))
+    audio_ready = threading.Event()
+
+    def job(session):
+        scheduler.buffering()
+        audio_ready.wait(2)
+        scheduler.playing()
+        session.wait(0.05)
+
+    scheduler.play(job)
+    assert scheduler.state == BUFFERING and scheduler.is_active()
+    audio_ready.set()
+    assert scheduler.wait(2)
+    print(f"Transitions: {transitions}")
+    assert transitions == [(IDLE, BUFFERING), (BUFFERING, PLAYING), (PLAYING, IDLE)]
+
+    # Seeking lasts until audio plays, even if the job reports buffering first
+    scheduler.seek(job)
+    assert scheduler.state == SEEKING
+    assert scheduler.pause(timeout=2)
+    assert scheduler.state == PAUSED and not scheduler.is_active()
+
+    scheduler.stop()
+    assert scheduler.state == IDLE
+    scheduler.close()
+
+    print("State transition test completed.\n")
+
+
+def test_jobs_never_overlap():
+    print("Testing that restarted jobs never overlap...")
+
+    scheduler = PlaybackScheduler()
+    running = []
+    overlaps = []
+
+    def job(session):
+        running.append(session)
+        if len(running) > 1:
+            overlaps.append(len(running))
+        time.sleep(0.02)  # Ignores cancellation for a moment, like a chunk being synthesized
+        session.wait(1)
+        running.remove(session)
+
+    for _ in range(20):
+        scheduler.seek(job)
+    # A pause that gives up waiting still can't let the next job start early
+    scheduler.pause(timeout=0.001)
+    scheduler.play(job)
+    scheduler.stop(timeout=None)
+
+    assert not overlaps, overlaps
+    assert scheduler.state == IDLE
+    scheduler.close()
+
+    print("Overlap test completed.\n")
+
+
+def main():
+    print("Running Playback Scheduler Tests\n")
+
+    test_state_transitions()
+    test_jobs_never_overlap()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
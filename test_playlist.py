@@ -0,0 +1,226 @@
+# Test script for playlists: preloading the next file and moving on to it
+import sys
+import os
+import tempfile
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+from services.tts_service import TTSService
+from services.config_service import ConfigService
+from services.search_service import SearchService
+from services.tts_engines import ToneEngine
+from controllers.main_controller import MainController
+
+
+FIRST = ["The first file opens here. ", "It goes on a little. ", "And then it ends. "]
+SECOND = ["The second file begins. ", "Its middle sentence. ", "Its last sentence. "]
+
+
+class SlowToneEngine(ToneEngine):
+    """Tone engine that takes delay seconds per run and counts its runs"""
+
+    def __init__(self, resource_policy=None, delay=0.0):
+        super().__init__(resource_policy)
+        self.delay = delay
+        self.runs = 0
+
+    def synthesize(self, text, voice_model=None, length_scale=1.0):
+        self.runs += 1
+        time.sleep(self.delay)
+        yield from super().synthesize(text, voice_model, length_scale)
+
+
+def write(path, sentences):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("".join(sentences))
+    return path
+
+
+def make_controller(work_dir, delay=0.0):
+    """Controller over two playlist files; speak_text only records what it is asked to read"""
+    first = write(os.path.join(work_dir, "first.txt"), FIRST)
+    second = write(os.path.join(work_dir, "second.txt"), SECOND)
+    tts_service = TTSService(init_audio=False)
+    tts_service.set_engine(SlowToneEngine(delay=delay))
+    config_service = ConfigService(os.path.join(work_dir, "config", "app_config.json"))
+    controller = MainController(FileService(index_dir=os.path.join(work_dir, "indexes")), tts_service, config_service)
+
+    controller.spoken = []
+    def mock_speak_text(text, source_file_path=None, byte_span=None, **kwargs):
+        controller.spoken.append((os.path.basename(source_file_path), byte_span[0]))
+        time.sleep(0.01)
+    tts_service.speak_text = mock_speak_text
+
+    controller.file_changes = []
+    controller.on_file_changed = lambda path, position: controller.file_changes.append(
+        (os.path.basename(path), position))
+    controller.set_playlist([first, second])
+    return controller, first, second
+
+
+def offset(sentences, index):
+    return len("".join(sentences[:index]).encode('utf-8'))
+
+
+def pinned(tts_service):
+    """Cached chunks someone still holds a pin on"""
+    cache = tts_service.synthesis_cache
+    with cache._lock:
+        return sum(entry.pins for entry in cache._entries.values())
+
+
+def play_through(saved_position):
+    """Read the playlist with the second file's saved position set; returns where the second file started"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller, first, second = make_controller(work_dir)
+        if saved_position is not None:
+            controller.config_service.set_last_position(second, saved_position)
+
+        assert controller.start_playlist(0) == 0
+        assert controller.wait_until_done(10)
+
+        first_spans = [start for name, start in controller.spoken if name == "first.txt"]
+        second_spans = [start for name, start in controller.spoken if name == "second.txt"]
+        assert first_spans == [offset(FIRST, index) for index in range(len(FIRST))], controller.spoken
+        assert controller.playlist_index == 1 and controller.file_service.file_path == second
+        assert controller.file_changes == [("first.txt", 0), ("second.txt", second_spans[0])]
+        # Everything the preload pinned was let go once the second file started
+        assert controller._preload is None and pinned(controller.tts_service) == 0
+        controller.file_service.close_file()
+        return second_spans
+
+
+def test_advance_to_saved_position():
+    print("Testing moving on to the next file at its saved position...")
+
+    second_spans = play_through(offset(SECOND, 1))
+    print(f"Second file read from {second_spans}")
+    assert second_spans == [offset(SECOND, 1), offset(SECOND, 2)]
+
+    print("Saved position test completed.\n")
+
+
+def test_finished_file_starts_over():
+    print("Testing a finished next file...")
+
+    second_spans = play_through(offset(SECOND, len(SECOND)))
+    assert second_spans == [offset(SECOND, index) for index in range(len(SECOND))], second_spans
+
+    print("Finished file test completed.\n")
+
+
+def test_discard_inflight_preload():
+    print("Testing discarding a preload that is still synthesizing...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller, first, second = make_controller(work_dir, delay=0.3)
+        controller.load_file(first)
+        controller._start_preload()
+        preload = controller._preload
+        time.sleep(0.1)  # The first sentence of the next file is being synthesized
+
+        controller._discard_preload()
+        assert controller._preload is None
+        preload["thread"].join(5)
+        assert not preload["thread"].is_alive()
+        # The preload stopped after the sentence under way and released what it had made
+        assert controller.tts_service.engine.runs == 1
+        assert preload["audio"] == [] and pinned(controller.tts_service) == 0
+        controller.file_service.close_file()
+
+    print("Discard test completed.\n")
+
+
+def test_stop_while_waiting_for_preload():
+    print("Testing a stop while playback waits for the next file...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        controller, first, second = make_controller(work_dir, delay=0.5)
+        controller.start_playlist(0)
+        # The first file is read at once; playback then waits on the slow preload
+        deadline = time.monotonic() + 5
+        while len(controller.spoken) < len(FIRST):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        time.sleep(0.1)
+        preload = controller._preload
+        assert preload is not None and preload["thread"].is_alive()
+
+        started = time.perf_counter()
+        controller.pause()
+        # The stop does not wait for the preload to finish
+        assert time.perf_counter() - started < 0.4
+        assert controller.wait_until_done(1)
+        assert controller.playlist_index == 0 and controller.file_service.file_path == first
+        assert controller.file_changes == [("first.txt", 0)]
+
+        preload["thread"].join(5)
+        assert pinned(controller.tts_service) == 0
+        controller.file_service.close_file()
+
+    print("Stop while waiting test completed.\n")
+
+
+def test_readers_during_file_swap():
+    print("Testing UI readers while the playback thread swaps files...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        texts = {}
+        for name, sentences in (("first.txt", FIRST * 200), ("second.txt", SECOND * 60)):
+            path = write(os.path.join(work_dir, name), sentences)
+            texts[path] = "".join(sentences)
+        paths = list(texts)
+        file_service = FileService(index_dir=os.path.join(work_dir, "indexes"))
+        file_service.load_file(paths[0])
+        search_service = SearchService(file_service, chunk_size=4096, max_match_bytes=64)
+
+        done = threading.Event()
+        errors = []
+
+        def swap():
+            try:
+                for index in range(300):
+                    file_service.load_file(paths[index % 2])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+        swapper = threading.Thread(target=swap)
+        swapper.start()
+        windows = 0
+        while not done.is_set():
+            with file_service.lock:
+                file_path = file_service.file_path
+                text, window_start, _ = file_service.read_text_window(1000, 2000)
+            # A window always comes whole from the file that was loaded
+            expected = texts[file_path].encode('utf-8')[window_start:window_start + len(text.encode('utf-8'))]
+            assert text.encode('utf-8') == expected
+            # A search never mixes files either: it stops when the file changes
+            for hit in search_service.iter_search("file", max_hits=20):
+                assert hit.snippet
+            windows += 1
+        swapper.join()
+        assert not errors, errors
+        print(f"Read {windows} windows during 300 swaps")
+        file_service.close_file()
+
+    print("Readers during swap test completed.\n")
+
+
+def main():
+    print("Running Playlist Tests\n")
+
+    test_advance_to_saved_position()
+    test_finished_file_starts_over()
+    test_discard_inflight_preload()
+    test_stop_while_waiting_for_preload()
+    test_readers_during_file_swap()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# Test script for the opt-in playback profiler
+import sys
+import os
+import json
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+from services.tts_service import TTSService
+from services.config_service import ConfigService
+from controllers.main_controller import MainController
+from utils.profiling import PlaybackProfiler, profiling_enabled, PROFILE_ENV_VAR, PROFILE_DIR_ENV_VAR
+
+
+def sessions(output_dir):
+    """Session base names in output_dir, oldest first, and whether each has all three files"""
+    names = sorted(name[:-len(".json")] for name in os.listdir(output_dir) if name.endswith(".json"))
+    complete = all(os.path.exists(os.path.join(output_dir, name + suffix))
+                   for name in names for suffix in (".prof", ".txt"))
+    return names, complete
+
+
+def test_profiling_enabled():
+    print("Testing when profiling is on...")
+
+    saved = os.environ.pop(PROFILE_ENV_VAR, None)
+    try:
+        assert not profiling_enabled() and not profiling_enabled({"enabled": False})
+        assert profiling_enabled({"enabled": True})
+        # The environment wins over the config in both directions
+        os.environ[PROFILE_ENV_VAR] = "0"
+        assert not profiling_enabled({"enabled": True})
+        os.environ[PROFILE_ENV_VAR] = "yes"
+        assert profiling_enabled({"enabled": False})
+    finally:
+        os.environ.pop(PROFILE_ENV_VAR, None)
+        if saved is not None:
+            os.environ[PROFILE_ENV_VAR] = saved
+
+    print("Profiling switch test completed.\n")
+
+
+def test_sessions_written_and_pruned():
+    print("Testing profile files and pruning...")
+
+    saved = os.environ.pop(PROFILE_DIR_ENV_VAR, None)
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            output_dir = os.path.join(work_dir, "profiles")
+            profiler = PlaybackProfiler(output_dir=output_dir, max_sessions=2)
+            for index in range(4):
+                with profiler.session(f"run{index}"):
+                    with profiler.synthesis():
+                        sum(range(10000))
+                time.sleep(0.01)
+
+            names, complete = sessions(output_dir)
+            print(f"Kept: {names}")
+            # Only the newest two sessions are left, each with its .prof, .txt and .json
+            assert [name.rsplit("-", 1)[1] for name in names] == ["run2", "run3"], names
+            assert complete and len(os.listdir(output_dir)) == 6
+            with open(os.path.join(output_dir, names[-1] + ".json"), 'r', encoding='utf-8') as f:
+                report = json.load(f)
+            assert report["session"] == "run3" and report["synthesis"]["chunks"] == 1
+            assert report["traced_memory"]["peak_bytes"] > 0
+
+            # The environment can redirect the profiles
+            os.environ[PROFILE_DIR_ENV_VAR] = os.path.join(work_dir, "elsewhere")
+            with PlaybackProfiler(output_dir=output_dir, trace_allocations=False).session():
+                pass
+            assert len(sessions(os.path.join(work_dir, "elsewhere"))[0]) == 1
+    finally:
+        os.environ.pop(PROFILE_DIR_ENV_VAR, None)
+        if saved is not None:
+            os.environ[PROFILE_DIR_ENV_VAR] = saved
+
+    print("Profile files test completed.\n")
+
+
+def test_controller_playback_session():
+    print("Testing a profiled playback session...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "book.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("A profiled sentence. And another one. The last.")
+        output_dir = os.path.join(work_dir, "profiles")
+        profiler = PlaybackProfiler(output_dir=output_dir, max_sessions=3, trace_allocations=False)
+
+        # No cache, so every session synthesizes its sentences
+        tts_service = TTSService(init_audio=False, cache_mb=0)
+        tts_service.configure_voices(engine="tone")
+        tts_service.profiler = profiler
+        # Synthesize as speak_text would, without an audio device
+        tts_service.speak_text = lambda text, **kwargs: tts_service.prepare_audio(text).release()
+        config_service = ConfigService(os.path.join(work_dir, "config", "app_config.json"))
+        controller = MainController(FileService(index_dir=os.path.join(work_dir, "indexes")), tts_service,
+                                    config_service, profiler=profiler)
+        controller.load_file(path)
+
+        for _ in range(5):
+            controller.start_playback(0)
+            assert controller.wait_until_done(10)
+        controller.file_service.close_file()
+
+        names, complete = sessions(output_dir)
+        assert len(names) == 3 and complete, names
+        with open(os.path.join(output_dir, names[-1] + ".json"), 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        print(f"Last session: {report['synthesis']}")
+        assert report["session"] == "playback"
+        assert report["synthesis"]["chunks"] == 3 and report["synthesis"]["seconds"] > 0
+        assert "playback" in report["threads_cpu_seconds"]
+
+    print("Profiled playback test completed.\n")
+
+
+def main():
+    print("Running Profiling Tests\n")
+
+    test_profiling_enabled()
+    test_sessions_written_and_pruned()
+    test_controller_playback_session()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
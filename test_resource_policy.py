@@ -0,0 +1,120 @@
+# Test script for the synthesis resource policy
+import sys
+import os
+import stat
+import tempfile
+import threading
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.resource_policy import ResourcePolicy
+
+
+def test_concurrency_limit():
+    print("Testing the concurrent synthesis job limit...")
+
+    policy = ResourcePolicy(max_concurrent_jobs=2)
+    running = []
+    most = []
+    lock = threading.Lock()
+
+    def job():
+        with policy.job_slot():
+            with lock:
+                running.append(1)
+                most.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+    threads = [threading.Thread(target=job) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"Most jobs at once: {max(most)}")
+    assert max(most) == 2
+
+    policy.configure(max_concurrent_jobs=0)
+    with policy.job_slot():
+        pass  # Unlimited: nothing to wait for
+
+    print("Concurrency limit test completed.\n")
+
+
+def test_just_in_time_lookahead():
+    print("Testing just-in-time look-ahead...")
+
+    policy = ResourcePolicy()
+    assert policy.lookahead(4) == 4  # Off: as configured
+
+    policy.configure(just_in_time=True)
+    assert policy.lookahead(4) == 4  # Nothing measured yet
+    policy.record_synthesis(0.3, 3.0)  # Ten times faster than real time
+    assert policy.lookahead(4) == 1
+    for _ in range(30):
+        policy.record_synthesis(3.6, 3.0)  # Slower than real time: keep more going
+    assert policy.lookahead(4) == 2
+    assert policy.lookahead(1) == 1
+
+    print("Just-in-time look-ahead test completed.\n")
+
+
+def test_cpu_report():
+    print("Testing the CPU report...")
+
+    policy = ResourcePolicy()
+    assert policy.report()["cpu_seconds_per_audio_minute"] is None
+    deadline = time.process_time() + 0.05
+    while time.process_time() < deadline:
+        pass
+    policy.record_synthesis(1.0, 30.0)
+    report = policy.report(worker_cpu_seconds=1.0)
+    print(f"Report: {report}")
+    assert report["audio_seconds"] == 30.0 and report["chunks"] == 1
+    assert report["cpu_seconds"] >= 1.04  # The busy loop plus the worker CPU
+    assert abs(report["cpu_seconds_per_audio_minute"] - report["cpu_seconds"] * 2) < 0.01
+
+    print("CPU report test completed.\n")
+
+
+def test_piper_command():
+    print("Testing the Piper command and environment...")
+
+    policy = ResourcePolicy(nice=10, onnx_threads=2)
+    # A missing Piper is not wrapped, so it still raises FileNotFoundError
+    assert policy.wrap_command(['no-such-piper-binary', '--model', 'x']) == ['no-such-piper-binary', '--model', 'x']
+    assert policy.popen_kwargs()["env"]["OMP_NUM_THREADS"] == "2"
+
+    with tempfile.TemporaryDirectory() as bin_dir:
+        piper = os.path.join(bin_dir, "piper")
+        with open(piper, 'w') as f:
+            f.write("#!/bin/sh\n")
+        os.chmod(piper, os.stat(piper).st_mode | stat.S_IXUSR)
+        old_path = os.environ.get("PATH", "")
+        os.environ["PATH"] = bin_dir + os.pathsep + old_path
+        try:
+            cmd = policy.wrap_command(['piper', '--model', 'x'])
+        finally:
+            os.environ["PATH"] = old_path
+    print(f"Command: {cmd}")
+    assert cmd[-3:] == ['piper', '--model', 'x']
+    if os.name != "nt" and "nice" in " ".join(cmd[:-3]):
+        assert cmd[1:3] == ["-n", "10"]
+
+    print("Piper command test completed.\n")
+
+
+def main():
+    print("Running Resource Policy Tests\n")
+
+    test_concurrency_limit()
+    test_just_in_time_lookahead()
+    test_cpu_report()
+    test_piper_command()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
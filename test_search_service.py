@@ -0,0 +1,50 @@
+# Test script for chunked full-text search
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+from services.search_service import SearchService
+
+
+def test_search_across_chunks():
+    print("Testing search across chunk boundaries...")
+
+    text = "Alpha beta. " * 50 + "The hidden needle sits here. " + "Gamma delta. " * 50 + "needle again."
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False, encoding='utf-8') as f:
+        f.write(text)
+        path = f.name
+
+    fs = FileService()
+    fs.load_file(path)
+
+    # Tiny chunks force matches to straddle chunk edges
+    search = SearchService(fs, chunk_size=7, max_match_bytes=16)
+    hits = list(search.iter_search("NEEDLE"))
+    expected = [i for i in range(len(text)) if text.lower().startswith("needle", i)]
+    print(f"Hits: {[hit.offset for hit in hits]}, expected: {expected}")
+    assert [hit.offset for hit in hits] == expected
+
+    # Reading from a hit starts at the beginning of its sentence
+    sentence_start = fs.find_sentence_start(hits[0].offset)
+    assert text[sentence_start:].startswith("The hidden needle")
+
+    regex_hits = list(search.iter_search(r"g\w+a", regex=True))
+    assert len(regex_hits) == 50
+
+    fs.close_file()
+    os.remove(path)
+    print("Search test completed.\n")
+
+
+def main():
+    print("Running SearchService Tests\n")
+
+    test_search_across_chunks()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
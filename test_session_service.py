@@ -0,0 +1,89 @@
+# Test script for session snapshots (warm restarts)
+import sys
+import os
+import tempfile
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+from services.tts_service import TTSService
+from services.config_service import ConfigService
+from services.session_service import SessionService
+from controllers.main_controller import MainController
+
+
+def make_controller(work_dir):
+    config_service = ConfigService(os.path.join(work_dir, "config", "app_config.json"))
+    tts_service = TTSService(init_audio=False)
+    tts_service.set_parameters(voice_model="voice.onnx")
+    file_service = FileService(index_dir=os.path.join(work_dir, "config", "indexes"))
+    return MainController(file_service, tts_service, config_service)
+
+
+def cache_sentence(tts_service, sentence, fill):
+    """Put fake audio for a sentence into the synthesis cache, as speak_text would"""
+    for chunk in tts_service._speech_chunks(sentence):
+        buffer = tts_service.buffer_pool.acquire(2000, 22050, 1)
+        buffer.data[:] = bytes([fill]) * 2000
+        buffer.speech_rate = 1.0
+        tts_service.synthesis_cache.put(tts_service.cache_key(chunk), buffer).release()
+
+
+def test_snapshot_round_trip():
+    print("Testing session snapshot save and restore...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        book = os.path.join(work_dir, "book.txt")
+        with open(book, 'w', encoding='utf-8') as f:
+            f.write("First sentence here. Second one follows. Third is next. Fourth ends it. ")
+
+        controller = make_controller(work_dir)
+        controller.load_file(book)
+        controller.config_service.set_last_position(book, 21)  # After the first sentence
+        controller.set_playlist([book])
+
+        upcoming = controller.upcoming_sentences(21, 3)
+        print(f"Upcoming: {upcoming}")
+        assert upcoming == ["Second one follows. ", "Third is next. ", "Fourth ends it. "]
+        cache_sentence(controller.tts_service, upcoming[0], 1)
+        cache_sentence(controller.tts_service, upcoming[1], 2)
+
+        sessions = SessionService(os.path.join(work_dir, "config", "session"), max_chunks=3)
+        snapshot = sessions.save(controller, playing=True)
+        # Saving stops at the first sentence that has no audio yet
+        assert len(snapshot["chunks"]) == 2
+
+        # A "relaunch": fresh services restore the position and the audio
+        relaunched = make_controller(work_dir)
+        loaded = sessions.load()
+        assert loaded["file_path"] == book and loaded["position"] == 21 and loaded["playing"]
+        assert loaded["playlist"] == [book] and loaded["playlist_index"] == 0
+        assert sessions.restore_audio(relaunched.tts_service, loaded) == 2
+        tts_service = relaunched.tts_service
+        key = tts_service.cache_key(tts_service._speech_chunks(upcoming[1])[0])
+        with tts_service.synthesis_cache.get(key) as audio:
+            assert bytes(audio.data) == bytes([2]) * 2000
+
+        # Audio made with other voice settings is not restored
+        other = make_controller(work_dir)
+        other.tts_service.set_parameters(voice_model="other-voice.onnx")
+        assert sessions.restore_audio(other.tts_service, sessions.load()) == 0
+
+        # A changed file keeps the position but drops the audio
+        with open(book, 'a', encoding='utf-8') as f:
+            f.write("Appended. ")
+        assert sessions.load()["chunks"] == []
+
+    print("Session snapshot test completed.\n")
+
+
+def main():
+    print("Running Session Service Tests\n")
+
+    test_snapshot_round_trip()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
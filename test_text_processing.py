@@ -0,0 +1,69 @@
+# Test script for sentence segmentation and per-script chunk sizes
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from utils.text_processing import (split_text_into_spans, split_text_by_sentences, detect_script, chunk_size_for,
+                                   CHUNK_SIZE_TARGETS)
+
+
+def test_cjk_spans():
+    print("Testing CJK sentence spans...")
+
+    text = "他说：「今天天气很好。」我们去公园吧！" + "这是一个没有句号的长句，" * 60 + "结束。"
+    spans = split_text_into_spans(text)
+    print(f"Span sizes: {[end - start for _, start, end in spans]}")
+
+    # Full-width terminators end sentences and closing quotes stay with them
+    assert spans[0][0] == "他说：「今天天气很好。」"
+    assert spans[1][0] == "我们去公园吧！"
+    assert spans[-1][2] == len(text.encode('utf-8'))
+    for (_, _, end), (_, start, _) in zip(spans, spans[1:]):
+        assert end == start
+    # The long sentence is cut after clause punctuation into short chunks
+    assert all(end - start <= 360 for _, start, end in spans)
+    assert all(sentence.endswith("，") for sentence, _, _ in spans[2:-1])
+
+    chunks = split_text_by_sentences(text)
+    assert "".join(chunks) == text
+    assert max(len(chunk.encode('utf-8')) for chunk in chunks) <= 360
+
+    print("CJK span test completed.\n")
+
+
+def test_chunk_size_targets():
+    print("Testing chunk size targets per script...")
+
+    chinese = "这是一个没有句号的长句，" * 60
+    japanese = "今日はとても良い天気ですね。" * 40
+    english = "This sentence goes on for a while, " * 120
+    assert detect_script(chinese) == "cjk" and detect_script(japanese) == "cjk"
+    assert detect_script(english) == "latin" and detect_script("") == "latin"
+    # A few CJK names in English text leave it Latin
+    assert detect_script("Mr. Wang (王) met Ms. Sato (佐藤) in Tokyo for lunch. " * 5) == "latin"
+    assert chunk_size_for(chinese) == CHUNK_SIZE_TARGETS["cjk"]
+    assert chunk_size_for(english) == CHUNK_SIZE_TARGETS["latin"]
+
+    # The default chunk size follows the script; an explicit one wins
+    for text, script in ((japanese, "cjk"), (english, "latin")):
+        chunks = split_text_by_sentences(text)
+        sizes = [len(chunk.encode('utf-8')) for chunk in chunks]
+        print(f"{script}: {len(chunks)} chunks, largest {max(sizes)} bytes")
+        assert max(sizes) <= CHUNK_SIZE_TARGETS[script]
+        assert all(len(chunk.encode('utf-8')) <= 120 for chunk in split_text_by_sentences(text, max_chunk_size=120))
+    assert all(end - start <= 120 for _, start, end in split_text_into_spans(english, max_chunk_size=120))
+
+    print("Chunk size test completed.\n")
+
+
+def main():
+    print("Running Text Processing Tests\n")
+
+    test_cjk_spans()
+    test_chunk_size_targets()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
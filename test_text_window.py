@@ -0,0 +1,104 @@
+# Test script for the text viewer's window: byte <-> character offsets, re-reads and scrollbar fractions
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.file_service import FileService
+from utils.text_window import TextWindow, scroll_fractions
+
+
+def test_multibyte_offsets():
+    print("Testing offsets in a window of multi-byte text...")
+
+    text = "Ünïcödé — 漢字 and 😀 emoji.\nSecond line."
+    data = text.encode('utf-8')
+    window = TextWindow(text, 1000, 1000 + len(data))
+    assert window.display_text == text
+
+    # Every character boundary maps both ways
+    for chars in range(len(text) + 1):
+        byte_offset = 1000 + len(text[:chars].encode('utf-8'))
+        assert window.char_to_byte(chars) == byte_offset
+        assert window.byte_to_char(byte_offset) == chars, chars
+    # An offset inside a character maps to the start of that character
+    kanji = 1000 + data.index("漢".encode('utf-8'))
+    assert window.byte_to_char(kanji + 1) == window.byte_to_char(kanji + 2) == text.index("漢")
+    emoji = 1000 + data.index("😀".encode('utf-8'))
+    assert all(window.byte_to_char(emoji + step) == text.index("😀") for step in range(4))
+    # Offsets outside the window are clamped to it
+    assert window.byte_to_char(0) == 0 and window.byte_to_char(10 ** 9) == len(text)
+    assert window.contains(1000, 1000 + len(data)) and not window.contains(999, 1010)
+
+    print("Multi-byte offset test completed.\n")
+
+
+def test_undecodable_offsets():
+    print("Testing offsets in a window with undecodable bytes...")
+
+    data = b"Caf\xe9 au lait. Ein sch\xf6ner Tag \xe2\x82 hier. \xc3\xbcber \x80."
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "legacy.txt")
+        with open(path, 'wb') as f:
+            f.write(data)
+        file_service = FileService(index_dir=os.path.join(work_dir, "indexes"))
+        file_service.load_file(path)
+        text, start, end = file_service.read_text_window(4, len(data))
+        file_service.close_file()
+
+    window = TextWindow(text, start, end)
+    shown = window.display_text
+    print(f"Shown: {shown!r}")
+    # One replacement character per undecodable byte, so offsets agree with what is shown
+    assert len(shown) == len(text) and "�� hier" in shown and shown.isprintable()
+    assert window
+    for chars in range(len(text) + 1):
+        byte_offset = window.char_to_byte(chars)
+        assert window.byte_to_char(byte_offset) == chars, chars
+    # Each character lines up with the bytes of the file
+    for chars, char in enumerate(shown):
+        byte_offset = window.char_to_byte(chars)
+        if char == "�":
+            assert data[byte_offset] >= 0x80
+        else:
+            assert data[byte_offset:].startswith(char.encode('utf-8')), (chars, char)
+    # The middle of "ü" maps to its start
+    u = data.index(b"\xc3\xbc")
+    assert window.byte_to_char(u + 1) == window.byte_to_char(u) == shown.index("ü")
+    assert window.char_to_byte(len(text)) == end == len(data)
+
+    print("Undecodable offset test completed.\n")
+
+
+def test_reread_and_scrollbar():
+    print("Testing window re-reads and scrollbar fractions...")
+
+    middle = TextWindow("x" * 100, 1000, 1100)
+    assert not middle.needs_reread(0.4, 0.6, 5000, 0.15)
+    assert middle.needs_reread(0.1, 0.3, 5000, 0.15) and middle.needs_reread(0.7, 0.9, 5000, 0.15)
+    # Nothing to re-read past either end of the file
+    whole = TextWindow("x" * 100, 0, 100)
+    assert not whole.needs_reread(0.0, 0.2, 100, 0.15) and not whole.needs_reread(0.8, 1.0, 100, 0.15)
+    assert TextWindow("x" * 100, 0, 100).needs_reread(0.8, 1.0, 200, 0.15)
+
+    assert scroll_fractions(0, 0, 0) == (0.0, 1.0)
+    assert scroll_fractions(250, 500, 1000) == (0.25, 0.5)
+    # Never an empty thumb, and never past the end
+    assert scroll_fractions(500, 500, 1000) == (0.5, 0.501)
+    assert scroll_fractions(900, 1200, 1000) == (0.9, 1.0)
+
+    print("Re-read and scrollbar test completed.\n")
+
+
+def main():
+    print("Running Text Window Tests\n")
+
+    test_multibyte_offsets()
+    test_undecodable_offsets()
+    test_reread_and_scrollbar()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
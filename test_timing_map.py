@@ -0,0 +1,100 @@
+# Test script for sentence byte spans and the synthesis timing map
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from utils.text_processing import split_text_into_spans
+from services.file_service import FileService
+from utils.timing_map import TimingMap
+
+
+def test_sentence_spans():
+    print("Testing sentence byte spans...")
+
+    text = "Hello world. Ünïcödé text is fine! Does it work? Yes."
+    spans = split_text_into_spans(text, base_offset=100)
+    print(f"Spans: {spans}")
+
+    # Spans must cover the text exactly, so positions never drift
+    assert spans[0][1] == 100
+    assert spans[-1][2] == 100 + len(text.encode('utf-8'))
+    for (_, _, end), (_, start, _) in zip(spans, spans[1:]):
+        assert end == start
+
+    print("Sentence span test completed.\n")
+
+
+def test_timing_lookup():
+    print("Testing timing map lookups...")
+
+    timing_map = TimingMap(sample_rate=22050)
+    first = timing_map.add_unit(0, 13, 22050)
+    timing_map.add_gap(2205)
+    second = timing_map.add_unit(13, 40, 44100)
+
+    assert timing_map.lookup(0) == first
+    assert timing_map.lookup(22049) == first
+    assert timing_map.lookup(22050 + 100) is None  # inside the gap
+    assert timing_map.lookup(22050 + 2205) == second
+    assert timing_map.lookup(timing_map.total_samples) is None
+    print(f"Units: {len(timing_map)}, timeline: {timing_map.total_samples} samples")
+
+    timing_map.clear()
+    assert timing_map.lookup(0) is None
+
+    print("Timing map test completed.\n")
+
+
+def test_invalid_utf8_spans():
+    print("Testing spans in a file that is not valid UTF-8...")
+
+    # Latin-1 bytes, a truncated sequence and a stray continuation byte among valid text
+    sentences = [b"Caf\xe9 au lait. ", b"Ein sch\xf6ner Tag \xe2\x82 hier. ", b"Stray \x80 byte. ",
+                 "Ünïcödé is fine. ".encode('utf-8'), b"The end."]
+    data = b"".join(sentences)
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "legacy.txt")
+        with open(path, 'wb') as f:
+            f.write(data)
+        file_service = FileService(index_dir=os.path.join(work_dir, "indexes"))
+        file_service.load_file(path)
+
+        # Spans are exact byte ranges of the file
+        spans = list(file_service.iter_sentence_spans(0))
+        assert [(start, end) for _, start, end in spans] == [
+            (data.index(sentence), data.index(sentence) + len(sentence)) for sentence in sentences], spans
+        # and cover it without gaps however small the read chunks (and from any offset)
+        for chunk_size in (16, 7, 5):
+            for start in range(0, 40):
+                pieces = list(file_service.iter_sentence_spans(start, chunk_size=chunk_size))
+                assert pieces[-1][2] == len(data), (chunk_size, start, pieces)
+                for (_, _, end), (_, next_start, _) in zip(pieces, pieces[1:]):
+                    assert end == next_start, (chunk_size, start, pieces)
+        # Undecodable bytes read as U+FFFD, one per byte, and never as escapes
+        assert spans[0][0] == "Caf\ufffd au lait. " and spans[1][0] == "Ein sch\ufffdner Tag \ufffd\ufffd hier. "
+        assert all(sentence.isprintable() for sentence, _, _ in spans)
+
+        # Positions found from a later offset agree with the spans
+        last_start = data.index(sentences[-1])
+        assert file_service.find_sentence_start(last_start + 4) == last_start
+        text, window_start, window_end = file_service.read_text_window(0, len(data))
+        assert (window_start, window_end) == (0, len(data))
+        assert split_text_into_spans(text)[-1][2] == len(data)
+        file_service.close_file()
+
+    print("Invalid UTF-8 span test completed.\n")
+
+
+def main():
+    print("Running Timing Map Tests\n")
+
+    test_sentence_spans()
+    test_invalid_utf8_spans()
+    test_timing_lookup()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# Test script for the pluggable synthesis engines
+import sys
+import os
+import asyncio
+import tempfile
+import threading
+import time
+import wave
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.tts_engines import create_engine, SynthesisCancelled, ToneEngine
+from services.tts_service import TTSService
+from services.export_service import ExportService
+
+
+def test_tone_engine_stream():
+    print("Testing the tone engine stream...")
+
+    engine = create_engine("tone")
+    blocks = list(engine.synthesize("Hello quiet world", None, 1.0))
+    # Leading silence, one block per word, trailing silence
+    assert len(blocks) == 5
+    assert all(block.sample_rate == ToneEngine.SAMPLE_RATE and block.channels == 1 for block in blocks)
+    assert blocks[0].pcm == bytes(len(blocks[0].pcm))
+
+    # Deterministic, and slower speech is longer
+    again = list(engine.synthesize("Hello quiet world", None, 1.0))
+    assert [block.pcm for block in again] == [block.pcm for block in blocks]
+    slow = sum(len(block.pcm) for block in engine.synthesize("Hello quiet world", None, 2.0))
+    assert slow > sum(len(block.pcm) for block in blocks) * 1.9
+
+    # Cancelling stops a stream that is under way
+    stream = engine.synthesize("one two three four", None, 1.0)
+    next(stream)
+    engine.cancel()
+    try:
+        list(stream)
+        assert False, "Expected SynthesisCancelled"
+    except SynthesisCancelled:
+        pass
+
+    try:
+        create_engine("no-such-engine")
+        assert False, "Expected ValueError"
+    except ValueError:
+        pass
+
+    print("Tone engine stream test completed.\n")
+
+
+def test_service_with_engine():
+    print("Testing TTSService on a non-Piper engine...")
+
+    tts_service = TTSService(init_audio=False)
+    tts_service.configure_voices(engine="tone")
+    assert tts_service.engine.name == "tone"
+
+    text = "Synthesized without any voice model."
+    audio = tts_service.prepare_audio(text)
+    try:
+        print(f"Audio: {audio.duration:.2f} s at {audio.sample_rate} Hz")
+        assert audio.sample_rate == ToneEngine.SAMPLE_RATE and audio.duration > 1.0
+        expected = sum(len(block.pcm) for block in tts_service.engine.synthesize(text, None, 1.0))
+        # Edge silence is trimmed by the service
+        assert 0 < audio.nbytes < expected
+    finally:
+        audio.release()
+
+    # The engine is part of the cache key, so switching engines never reuses audio
+    key = tts_service.cache_key(text)
+    assert key in tts_service.synthesis_cache
+    tts_service.set_engine("piper")
+    assert tts_service.cache_key(text) not in tts_service.synthesis_cache
+
+    report = tts_service.get_cpu_report()
+    assert report["chunks"] == 1 and report["audio_seconds"] > 1.0
+
+    # Concurrent syntheses share the engine
+    tts_service.set_engine("tone")
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(tts_service.synthesize_text_to_pcm(f"Line {i}")))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4
+    for buffer in results:
+        buffer.release()
+    tts_service.close_voices()
+
+    print("Engine service test completed.\n")
+
+
+class SlowWarmingToneEngine(ToneEngine):
+    """Tone engine whose voices take a while to load"""
+
+    def __init__(self, resource_policy=None, load_seconds=0.5):
+        super().__init__(resource_policy)
+        self.load_seconds = load_seconds
+        self.warmed = []
+
+    def warm_up(self, voice_model=None, length_scale=1.0):
+        time.sleep(self.load_seconds)
+        self.warmed.append((voice_model, length_scale))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.01)
+
+
+def cached_rate(tts_service, text):
+    """Rate the cached audio for text was synthesized at"""
+    cached = tts_service.synthesis_cache.get(tts_service.cache_key(text))
+    try:
+        return cached.speech_rate
+    finally:
+        cached.release()
+
+
+def test_rate_changes():
+    print("Testing rate changes on the sync and async paths...")
+
+    tts_service = TTSService(init_audio=False)
+    engine = SlowWarmingToneEngine()
+    tts_service.set_engine(engine)
+    tts_service.RATE_SETTLE_SECONDS = 0.0
+
+    # Loading a voice never holds up the caller (the UI thread, for a slider)
+    started = time.perf_counter()
+    tts_service.set_parameters(rate=1.0, voice_model="voice.onnx")
+    for rate in (1.1, 1.2, 1.3):
+        tts_service.set_parameters(rate=rate, voice_model="voice.onnx")
+    assert time.perf_counter() - started < engine.load_seconds
+    wait_for(lambda: tts_service._warm_up_thread is None)
+    # Requests made while a voice was loading collapse into the latest
+    assert [voice for voice, _ in engine.warmed].count("voice.onnx") == 1, engine.warmed
+    tts_service.set_parameters(rate=1.0, voice_model="voice.onnx")
+    wait_for(lambda: tts_service._warm_up_thread is None)
+
+    sync_text, async_text = "Read on the playback thread.", "Read by the streaming server."
+    for buffer in (tts_service.prepare_audio(sync_text), asyncio.run(tts_service.prepare_audio_async(async_text))):
+        assert buffer.speech_rate == 1.0
+        buffer.release()
+
+    # Cached audio from before a change is stretched at once and resynthesized
+    # at the settled rate in the background, whichever path asked for it
+    tts_service.set_parameters(rate=1.5, voice_model="voice.onnx")
+    for text, buffer in ((sync_text, tts_service.prepare_audio(sync_text)),
+                         (async_text, asyncio.run(tts_service.prepare_audio_async(async_text)))):
+        assert buffer.speech_rate == 1.5
+        buffer.release()
+    for text in (sync_text, async_text):
+        wait_for(lambda: cached_rate(tts_service, text) == 1.5)
+
+    # Without resynthesis the stretched audio is all there is
+    tts_service.configure_audio(resynthesize_after_rate_change=False)
+    tts_service.set_parameters(rate=0.8, voice_model="voice.onnx")
+    buffer = asyncio.run(tts_service.prepare_audio_async(async_text))
+    buffer.release()
+    time.sleep(0.2)
+    assert cached_rate(tts_service, async_text) == 1.5
+    tts_service.close_voices()
+
+    print("Rate change test completed.\n")
+
+
+class PaddedToneEngine(ToneEngine):
+    """Tone engine with half a second of silence at each edge, as Piper leaves"""
+    EDGE_SILENCE_S = 0.5
+
+
+def test_silence_report():
+    print("Testing edge silence trimming and its report...")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        sentences = ["One quiet sentence. ", "And another one. "]
+        book = os.path.join(work_dir, "book.txt")
+        with open(book, 'w', encoding='utf-8') as f:
+            f.write("".join(sentences))
+
+        tts_service = TTSService(init_audio=False)
+        tts_service.set_engine(PaddedToneEngine())
+        tts_service.configure_audio(sentence_gap_ms=100, resynthesize_after_rate_change=False)
+        rate = ToneEngine.SAMPLE_RATE
+        # Both edges go, less the 20 ms of padding trim_silence keeps (the tail includes a word gap)
+        edges = 2 * PaddedToneEngine.EDGE_SILENCE_S + ToneEngine.WORD_GAP_S - 0.04
+
+        # Synthesized as speak_text would, so an export finds them in the cache
+        chunks = [chunk for sentence in sentences for chunk in tts_service._speech_chunks(sentence)]
+        assert len(chunks) == 2, chunks
+        durations = []
+        for chunk in chunks:
+            raw = sum(len(block.pcm) for block in tts_service.engine.synthesize(chunk)) // 2 / rate
+            audio = tts_service.prepare_audio(chunk, book)
+            print(f"  {raw:.3f}s synthesized, {audio.trimmed_seconds:.3f}s trimmed")
+            assert abs(audio.trimmed_seconds - edges) < 0.02, audio.trimmed_seconds
+            assert abs(audio.duration - (raw - audio.trimmed_seconds)) < 1e-6
+            durations.append(audio.duration)
+            audio.release()
+
+        report = tts_service.get_silence_report(book)
+        assert report["chunks"] == 2 and abs(report["trimmed_seconds"] - 2 * edges) < 0.04, report
+        assert abs(report["gap_seconds"] - 0.2) < 1e-9
+        assert abs(report["saved_seconds"] - (report["trimmed_seconds"] - 0.2)) < 1e-9
+
+        # An export reads the sentences from the cache: the gap follows each one, and they count again
+        clip = os.path.join(work_dir, "clip.wav")
+        ExportService(tts_service, index_dir=os.path.join(work_dir, "indexes")).export_range(
+            book, 0, len("".join(sentences)), clip)
+        with wave.open(clip, 'rb') as f:
+            clip_seconds = f.getnframes() / f.getframerate()
+        assert abs(clip_seconds - (sum(durations) + 2 * 0.1)) < 0.001, clip_seconds
+        again = tts_service.get_silence_report(book)
+        assert again["chunks"] == 4 and abs(again["trimmed_seconds"] - 2 * report["trimmed_seconds"]) < 1e-6
+
+        # Played twice as fast, cached audio saves half as much
+        tts_service.set_parameters(rate=2.0)
+        tts_service.prepare_audio(chunks[0], book).release()
+        faster = tts_service.get_silence_report(book)
+        assert abs(faster["trimmed_seconds"] - again["trimmed_seconds"] - edges / 2) < 0.01, faster
+        # Nothing is counted against the file with trimming off
+        tts_service.configure_audio(trim_silence=False)
+        tts_service.prepare_audio(chunks[0], book).release()
+        assert tts_service.get_silence_report(book)["chunks"] == 5
+
+    print("Silence report test completed.\n")
+
+
+def main():
+    print("Running TTS Engine Tests\n")
+
+    test_tone_engine_stream()
+    test_service_with_engine()
+    test_rate_changes()
+    test_silence_report()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# Test script for the warm voice model manager
+import sys
+import os
+import tempfile
+import threading
+import time
+import wave
+from contextlib import contextmanager
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from soak_playback import install_stub_piper
+from services.voice_manager import VoiceManager, PiperWorker
+from services.tts_engines import PiperEngine
+from services.tts_service import TTSService
+from utils.text_processing import split_quoted_segments
+
+
+@contextmanager
+def stub_piper(delay=0.0):
+    """The soak test's stub Piper on PATH for the duration"""
+    saved = {name: os.environ.get(name) for name in ("PATH", "STUB_PIPER_DELAY")}
+    with tempfile.TemporaryDirectory() as bin_dir:
+        install_stub_piper(bin_dir)
+        os.environ["STUB_PIPER_DELAY"] = str(delay)
+        try:
+            yield bin_dir
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def wav_seconds(path):
+    with wave.open(path, 'rb') as f:
+        return f.getnframes() / f.getframerate()
+
+
+class FakeWorker:
+    def __init__(self, voice_model, length_scale=1.0):
+        self.voice_model = voice_model
+        self.length_scale = length_scale
+        self.closed = False
+
+    def is_alive(self):
+        return not self.closed
+
+    def memory_bytes(self):
+        return 100 * 1024 * 1024
+
+    def close(self):
+        self.closed = True
+
+
+def test_lru_eviction():
+    print("Testing warm model LRU eviction...")
+
+    manager = VoiceManager(max_models=2, memory_budget_mb=1024, worker_factory=FakeWorker)
+    a = manager.get_worker("a.onnx")
+    b = manager.get_worker("b.onnx")
+    assert manager.get_worker("a.onnx") is a  # a is now most recently used
+    manager.get_worker("c.onnx")
+    assert b.closed and not a.closed
+    assert manager.is_warm("a.onnx") and not manager.is_warm("b.onnx")
+
+    # The memory budget evicts before the model count does
+    tight = VoiceManager(max_models=4, memory_budget_mb=250, worker_factory=FakeWorker)
+    first = tight.get_worker("a.onnx")
+    tight.get_worker("b.onnx")
+    tight.get_worker("c.onnx")
+    assert first.closed and len(tight.stats()["models"]) == 2
+    print("LRU eviction test completed.\n")
+
+
+def test_prediction():
+    print("Testing next voice prediction...")
+
+    manager = VoiceManager(max_models=3, worker_factory=FakeWorker)
+    for _ in range(3):
+        manager.get_worker("narrator.onnx")
+        manager.get_worker("dialogue.onnx")
+    assert manager.predict_next("narrator.onnx") == "dialogue.onnx"
+
+    cold = VoiceManager(max_models=3, worker_factory=FakeWorker)
+    cold.prewarm("dialogue.onnx").join()
+    assert cold.is_warm("dialogue.onnx")
+    print("Prediction test completed.\n")
+
+
+def test_eviction_waits_for_request():
+    print("Testing eviction of a worker that is mid-request...")
+
+    with stub_piper(delay=0.5) as work_dir:
+        manager = VoiceManager(max_models=1, worker_factory=PiperWorker)
+        busy = manager.get_worker("a.onnx")
+        output = os.path.join(work_dir, "a.wav")
+        errors = []
+        request = threading.Thread(target=lambda: _capture(errors, busy.synthesize, "Still talking.", output))
+        request.start()
+        time.sleep(0.2)
+
+        # Starting another voice evicts the busy one without breaking its request
+        started = time.monotonic()
+        manager.get_worker("b.onnx")
+        assert time.monotonic() - started < 0.5, "eviction waited for the request"
+        assert not manager.is_warm("a.onnx")
+        request.join()
+        assert errors == [] and os.path.exists(output), errors
+        # ...and it shuts down once the request is done
+        busy.process.wait(timeout=5)
+        assert not busy.is_alive() and not os.path.exists(busy.output_dir)
+        manager.close()
+
+    print("Eviction test completed.\n")
+
+
+def _capture(errors, function, *args):
+    try:
+        function(*args)
+    except Exception as e:
+        errors.append(e)
+
+
+def test_rate_changes_on_warm_workers():
+    print("Testing rate changes with warm workers...")
+
+    with stub_piper() as work_dir:
+        # The stub, like Piper, only takes the rate from its command line
+        manager = VoiceManager(max_models=2, worker_factory=PiperWorker)
+        normal = os.path.join(work_dir, "normal.wav")
+        slow = os.path.join(work_dir, "slow.wav")
+        worker = manager.get_worker("voice.onnx", 1.0)
+        worker.synthesize("The same sentence twice.", normal)
+        assert manager.get_worker("voice.onnx", 2.0) is not worker
+        manager.get_worker("voice.onnx", 2.0).synthesize("The same sentence twice.", slow)
+        assert wav_seconds(slow) > wav_seconds(normal) * 1.5
+        assert sorted(model["length_scale"] for model in manager.stats()["models"]) == [1.0, 2.0]
+        manager.close()
+
+        # Through the service: once a new rate settles, warm audio is made at it
+        tts_service = TTSService(init_audio=False, cache_mb=0)
+        tts_service.RATE_SETTLE_SECONDS = 0.0
+        tts_service.configure_voices(engine="piper", warm_models=2)
+        tts_service.set_parameters(rate=1.0, voice_model="voice.onnx")
+        text = "A sentence read at two speeds."
+        audio = tts_service.prepare_audio(text)
+        normal_seconds = audio.duration
+        audio.release()
+
+        tts_service.set_parameters(rate=2.0, voice_model="voice.onnx")
+        audio = tts_service.prepare_audio(text)
+        print(f"Rate 1.0: {normal_seconds:.2f}s, rate 2.0: {audio.duration:.2f}s")
+        assert audio.speech_rate == 2.0
+        assert abs(audio.duration / normal_seconds - 0.5) < 0.1, (normal_seconds, audio.duration)
+        audio.release()
+        tts_service.close_voices()
+
+    print("Rate change test completed.\n")
+
+
+def test_engine_retries_on_a_fresh_worker():
+    print("Testing recovery from a worker that died...")
+
+    with stub_piper():
+        engine = PiperEngine(warm_models=2)
+        first = b"".join(block.pcm for block in engine.synthesize("Before the crash.", "voice.onnx"))
+        worker = engine.voice_manager.get_worker("voice.onnx")
+        worker.process.kill()
+        worker.process.wait()
+
+        # The dead worker is replaced and warm models stay on
+        again = b"".join(block.pcm for block in engine.synthesize("Before the crash.", "voice.onnx"))
+        assert again == first
+        assert engine.voice_manager is not None
+        assert engine.voice_manager.get_worker("voice.onnx") is not worker
+        engine.close()
+
+    print("Worker recovery test completed.\n")
+
+
+def test_quoted_segments():
+    print("Testing quoted text segmentation...")
+
+    segments = split_quoted_segments('He said, “Hello there.” Then he left.')
+    assert segments == [('He said, ', False), ('“Hello there.”', True), (' Then he left.', False)]
+    # Dialogue continuing from the previous sentence
+    assert split_quoted_segments('she cried.” And ran.')[0] == ('she cried.”', True)
+    assert split_quoted_segments('No quotes here.') == [('No quotes here.', False)]
+    print("Quoted segments test completed.\n")
+
+
+def main():
+    print("Running VoiceManager Tests\n")
+
+    test_lru_eviction()
+    test_prediction()
+    test_eviction_waits_for_request()
+    test_rate_changes_on_warm_workers()
+    test_engine_retries_on_a_fresh_worker()
+    test_quoted_segments()
+
+    print("All tests completed!")
+
+
+if __name__ == "__main__":
+    main()